@@ -0,0 +1,247 @@
+import collections
+import contextlib
+import functools
+import json
+import math
+import os
+import threading
+import time
+from datetime import (
+    datetime,
+    timezone,
+)
+from typing import (
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+from urllib.parse import urlsplit
+
+import requests
+
+from pullbug.adapters import WrappedAdapter
+
+ACCOUNTING_FILENAME = "api_accounting.json"
+# Requests made outside of any of the phases of a run (eg: while setting up the GitHub client)
+UNTRACKED_PHASE = "other"
+LATENCY_PERCENTILES = (50, 90, 99)
+DISCORD_ENDPOINT = "/api/webhooks/{id}/{token}"
+SLACK_ENDPOINT = "chat.postMessage"
+
+T = TypeVar("T")
+
+
+class EndpointStats:
+    """The requests made to a single endpoint during a single phase of a run."""
+
+    __slots__ = ("requests", "cache_hits", "memo_hits", "status_codes", "latencies", "bytes_sent", "bytes_received")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.cache_hits = 0
+        # Requests answered by a response from earlier in the run without being sent, see `pullbug.memo`
+        self.memo_hits = 0
+        self.status_codes: Counter[str] = collections.Counter()
+        self.latencies: List[float] = []
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+class ApiAccounting:
+    """Counts every request Pullbug sends to GitHub, Discord, and Slack, grouped by phase and endpoint.
+
+    The phase is tracked per thread: code running on worker threads has to be given its phase explicitly,
+    see `in_phase`.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = datetime.now(timezone.utc)
+        self._endpoints: Dict[Tuple[str, str, str, str], EndpointStats] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def current_phase(self) -> str:
+        return getattr(self._local, "phase", UNTRACKED_PHASE)
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Attribute the requests made by this thread to a phase of the run until the block ends."""
+        previous_phase = self.current_phase
+        self._local.phase = name
+        try:
+            yield
+        finally:
+            self._local.phase = previous_phase
+
+    def in_phase(self, name: str, function: Callable[..., T]) -> Callable[..., T]:
+        """Wrap a function so the requests it makes are attributed to a phase, whichever thread it runs on."""
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            with self.phase(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def record(
+        self,
+        service: str,
+        method: str,
+        endpoint: str,
+        status_code: Optional[int],
+        latency: float,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        cache_hit: bool = False,
+    ):
+        """Record a single request, a `status_code` of `None` means no response came back."""
+        with self._lock:
+            stats = self._endpoints.setdefault((self.current_phase, service, method, endpoint), EndpointStats())
+            stats.requests += 1
+            stats.cache_hits += cache_hit
+            stats.status_codes[str(status_code) if status_code is not None else "error"] += 1
+            stats.latencies.append(latency)
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+
+    def record_memo_hit(self, service: str, method: str, endpoint: str):
+        """Record a request that was answered from earlier in the run rather than sent."""
+        with self._lock:
+            stats = self._endpoints.setdefault((self.current_phase, service, method, endpoint), EndpointStats())
+            stats.memo_hits += 1
+
+    def reset(self):
+        """Start counting a new run."""
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._endpoints = {}
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize the requests of the run so far, each phase lists its endpoints with the most requests first."""
+        with self._lock:
+            endpoints = list(self._endpoints.items())
+
+        phases: Dict[str, Dict[str, Any]] = {}
+        for (phase, service, method, endpoint), stats in sorted(endpoints, key=lambda item: -item[1].requests):
+            phase_summary = phases.setdefault(phase, {"requests": 0, "cache_hits": 0, "memo_hits": 0, "endpoints": []})
+            phase_summary["requests"] += stats.requests
+            phase_summary["cache_hits"] += stats.cache_hits
+            phase_summary["memo_hits"] += stats.memo_hits
+            phase_summary["endpoints"].append(
+                {
+                    "service": service,
+                    "method": method,
+                    "endpoint": endpoint,
+                    "requests": stats.requests,
+                    "cache_hits": stats.cache_hits,
+                    "memo_hits": stats.memo_hits,
+                    "status_codes": dict(stats.status_codes),
+                    "bytes_sent": stats.bytes_sent,
+                    "bytes_received": stats.bytes_received,
+                    "latency_ms": _latency_percentiles(stats.latencies),
+                }
+            )
+
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "requests": sum(phase_summary["requests"] for phase_summary in phases.values()),
+            "cache_hits": sum(phase_summary["cache_hits"] for phase_summary in phases.values()),
+            "memo_hits": sum(phase_summary["memo_hits"] for phase_summary in phases.values()),
+            "phases": phases,
+        }
+
+    def save(self, location: str) -> Dict[str, Any]:
+        """Write the summary of the run to `location`, returning it."""
+        summary = self.summary()
+        path = os.path.join(location, ACCOUNTING_FILENAME)
+        os.makedirs(location, exist_ok=True)
+
+        # Write to a temporary file first so the last complete summary is never left half written, jobs sharing a
+        # location write theirs at the same time
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as accounting_file:
+            json.dump(summary, accounting_file, indent=2)
+        os.replace(temporary_path, path)
+
+        return summary
+
+
+class AccountingAdapter(WrappedAdapter):
+    """Records every GitHub request sent through it with `ApiAccounting`.
+
+    Mounted closest to the connection so retries are counted individually and latencies don't include pacing.
+    A `304 Not Modified` answered from the cache counts as a cache hit.
+    """
+
+    def __init__(self, adapter: requests.adapters.BaseAdapter, accounting: ApiAccounting):
+        super().__init__(adapter)
+        self.accounting = accounting
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        endpoint = github_endpoint(request.url or "")
+        # Bodies can also be streamed from a file, those aren't counted
+        bytes_sent = len(request.body) if isinstance(request.body, (bytes, str)) else 0
+        started_at = time.monotonic()
+
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            self.accounting.record("github", request.method or "", endpoint, None, time.monotonic() - started_at)
+            raise
+
+        # Reading a streamed body here would leave nothing for the caller
+        bytes_received = (
+            int(response.headers.get("Content-Length", 0)) if kwargs.get("stream") else len(response.content or b"")
+        )
+        self.accounting.record(
+            "github",
+            request.method or "",
+            endpoint,
+            response.status_code,
+            time.monotonic() - started_at,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+            cache_hit=response.status_code == 304,
+        )
+
+        return response
+
+
+def github_endpoint(url: str) -> str:
+    """Reduce a GitHub API URL to its endpoint template (eg: `/repos/{owner}/{repo}/pulls/{number}/reviews`)."""
+    segments = urlsplit(url).path.strip("/").split("/")
+
+    # GitHub Enterprise serves the API under a prefix
+    if segments[:2] == ["api", "v3"]:
+        segments = segments[2:]
+
+    if segments[0] == "repos" and len(segments) >= 3:
+        segments[1:3] = ["{owner}", "{repo}"]
+    elif segments[0] in ("users", "orgs") and len(segments) >= 2:
+        segments[1] = "{owner}"
+
+    return "/" + "/".join("{number}" if segment.isdigit() else segment for segment in segments)
+
+
+def _latency_percentiles(latencies: List[float]) -> Dict[str, float]:
+    """The nearest-rank percentiles of a list of latencies, in milliseconds."""
+    if not latencies:
+        # Eg: an endpoint whose every request was answered from earlier in the run
+        return {}
+
+    ordered_latencies = sorted(latencies)
+    percentiles = {
+        f"p{percentile}": ordered_latencies[max(math.ceil(percentile / 100 * len(ordered_latencies)) - 1, 0)]
+        for percentile in LATENCY_PERCENTILES
+    }
+    percentiles["max"] = ordered_latencies[-1]
+
+    return {name: round(latency * 1000, 1) for name, latency in percentiles.items()}
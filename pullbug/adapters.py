@@ -0,0 +1,38 @@
+from typing import (
+    Any,
+    Callable,
+    TypeVar,
+)
+
+import requests
+from github import Github
+
+T = TypeVar("T", bound=requests.adapters.BaseAdapter)
+
+
+class WrappedAdapter(requests.adapters.BaseAdapter):
+    """A `requests` transport adapter that adds behaviour around another adapter.
+
+    Wrapping (rather than replacing) the adapter PyGithub mounts keeps its connection pooling and retries intact.
+    """
+
+    def __init__(self, adapter: requests.adapters.BaseAdapter):
+        super().__init__()
+        self.adapter = adapter
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        return self.adapter.send(request, **kwargs)
+
+    def close(self):
+        self.adapter.close()
+
+
+def mount_github_adapter(github_instance: Github, wrap: Callable[[requests.adapters.BaseAdapter], T]) -> T:
+    """Wrap the adapter of the session that PyGithub sends every GitHub request through, returning the wrapper."""
+    # PyGithub keeps a single persistent connection per `Requester` but doesn't expose it publicly
+    connection = github_instance.requester._Requester__createConnection()  # type: ignore[attr-defined]
+    prefix = f"{connection.protocol}://"
+    adapter = wrap(connection.session.get_adapter(prefix))
+    connection.session.mount(prefix, adapter)
+
+    return adapter
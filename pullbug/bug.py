@@ -1,11 +1,34 @@
+import collections
+import itertools
+import math
 import os
+import queue
+import signal
+import sys
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from datetime import (
+    datetime,
+    timezone,
+)
 from typing import (
     Any,
+    Callable,
     Dict,
+    Hashable,
+    Iterable,
+    Iterator,
     List,
     Literal,
+    NoReturn,
     Optional,
     Tuple,
+    TypeVar,
 )
 
 import woodchips
@@ -16,13 +39,73 @@ from github import (
     NamedUser,
     PaginatedList,
     PullRequest,
+    Repository,
+    Team,
+    UnknownObjectException,
 )
+from urllib3.util.retry import Retry
 
+from pullbug import (
+    graphql,
+    pagination,
+    records,
+    search,
+    state,
+)
+from pullbug.accounting import (
+    AccountingAdapter,
+    ApiAccounting,
+)
+from pullbug.adapters import mount_github_adapter
+from pullbug.cache import (
+    CachingAdapter,
+    ResponseCache,
+)
+from pullbug.fetches import SharedFetches
+from pullbug.identities import IdentityCache
+from pullbug.memo import (
+    MemoizingAdapter,
+    RunMemo,
+)
 from pullbug.messages import (
+    DeliveryError,
+    DiscordSender,
+    MessageDelivery,
+    MessageSender,
+    SlackSender,
     prepare_issues_message,
     prepare_pulls_message,
-    send_discord_message,
-    send_slack_message,
+)
+from pullbug.rate_limit import (
+    CallBudget,
+    RateLimitAdapter,
+    RateLimiter,
+)
+from pullbug.records import (
+    IssueRecord,
+    PullRequestRecord,
+    PullRequestWithReviews,
+    Reviewer,
+    TeamRecord,
+    UserRecord,
+)
+from pullbug.routing import Route
+from pullbug.schedule import (
+    DEFAULT_SCHEDULE,
+    CronSchedule,
+)
+from pullbug.state import SyncState
+from pullbug.transport import (
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+    MessageTransport,
+)
+from pullbug.webhooks import (
+    DEFAULT_RECONCILE_EVERY,
+    DEFAULT_WEBHOOK_HOST,
+    WebhookIndex,
+    WebhookServer,
 )
 
 GITHUB_STATE_CHOICES = Literal[
@@ -35,6 +118,18 @@ GITHUB_CONTEXT_CHOICES = Literal[
     "orgs",
 ]
 
+FETCH_ENGINE_CHOICES = Literal[
+    "rest",
+    "graphql",
+    "search",
+]
+DEFAULT_FETCH_ENGINE: FETCH_ENGINE_CHOICES = "rest"
+
+OUTPUT_FORMAT_CHOICES = Literal[
+    "text",
+    "json",
+]
+
 DEFAULT_LOG_LEVEL = "info"
 LOG_LEVEL_CHOICES = Literal[
     "notset",
@@ -47,9 +142,31 @@ LOG_LEVEL_CHOICES = Literal[
 
 DEFAULT_BASE_URL = "https://api.github.com"
 DEFAULT_LOCATION = os.path.join("~", "pullbug")
+DEFAULT_WORKERS = 10
+# How many items per worker are fetched ahead of what's been consumed, see `_stream_concurrently`
+FETCH_AHEAD_FACTOR = 2
 
 LOGGER_NAME = "pullbug"
 
+# Rate limits are retried by the `RateLimitAdapter`, PyGithub only needs to retry server errors
+GITHUB_RETRY = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=[500, 502, 503, 504],
+    allowed_methods=["GET", "POST"],
+    raise_on_status=False,
+)
+# Requesting review requests (the users and teams share a response, see `RunMemo`) and reviews
+REST_CALLS_PER_PULL_REQUEST = 2
+# Marks the end of the items iterated on a background thread
+ITERATION_DONE = object()
+# How often, in seconds, a background iteration waiting for room checks whether it should stop
+BACKGROUND_STOP_INTERVAL = 0.1
+# The messages of a pull request or issue by format, and the names of the routes it matched
+RoutedMessage = Tuple[Dict[str, str], Tuple[str, ...]]
+
+T = TypeVar("T")
+
 
 class Pullbug:
     def __init__(  # nosec hardcoded_password_default
@@ -72,6 +189,18 @@ class Pullbug:
         log_level: str = DEFAULT_LOG_LEVEL,
         disable_descriptions: bool = False,
         quiet: bool = False,
+        workers: int = DEFAULT_WORKERS,
+        fetch_engine: FETCH_ENGINE_CHOICES = DEFAULT_FETCH_ENGINE,
+        no_cache: bool = False,
+        rate_limit_budget: Optional[int] = None,
+        incremental: bool = False,
+        include_forks: bool = False,
+        include_archived: bool = False,
+        routes: Optional[List[Route]] = None,
+        message_pool_size: int = DEFAULT_POOL_SIZE,
+        message_timeout: float = DEFAULT_TIMEOUT,
+        message_retries: int = DEFAULT_RETRIES,
+        output_format: Optional[OUTPUT_FORMAT_CHOICES] = None,
     ):
         # Parameter variables
         self.github_owner = github_owner
@@ -85,75 +214,333 @@ class Pullbug:
         self.slack = slack
         self.slack_token = slack_token
         self.slack_channel = slack_channel
-        self.repos = [repo.strip() for repo in repos.lower().split(",")]
+        # Repo names are matched exactly, empty names (eg: no `--repos` or a trailing comma) are ignored
+        self.repos = list(dict.fromkeys(repo.strip() for repo in repos.lower().split(",") if repo.strip()))
         self.drafts = drafts
         self.location = os.path.expanduser(location)
         self.base_url = base_url
         self.log_level = log_level
         self.disable_descriptions = disable_descriptions
         self.quiet = quiet
+        self.workers = workers
+        self.fetch_engine = fetch_engine
+        self.no_cache = no_cache
+        self.rate_limit_budget = rate_limit_budget
+        self.incremental = incremental
+        self.include_forks = include_forks
+        self.include_archived = include_archived
+        # Each route gets its own digest of what matched it alongside the digests of `discord` and `slack`
+        self.routes = routes or []
+        self.message_pool_size = message_pool_size
+        self.message_timeout = message_timeout
+        self.message_retries = message_retries
+        # Every pull request and issue is also written to `output` in this format, eg: for other tools to consume
+        self.output_format = output_format
 
         # Internal variables
+        self._logger_ready = False
+        # Kept up to date by GitHub webhooks while serving, see `serve`
+        self.webhook_index: Optional[WebhookIndex] = None
+        self.reconcile_every = DEFAULT_RECONCILE_EVERY
+        self._runs_since_reconcile = 0
+        self._use_webhook_index = False
+        # What a run that reconciles the webhook index found, `None` for other runs
+        self._reconciliation: Optional[Dict[str, Any]] = None
+        # Review data that was fetched alongside its pull request (eg: via GraphQL), keyed by the pull request URL
+        self._prefetched_reviews: Dict[str, PullRequestWithReviews] = {}
+        # Every digest of a run is delivered through the same senders, see `run`
+        self._delivery: Optional[MessageDelivery] = None
+        # GitHub data shared with other Pullbugs reading with the same token and base URL, see `pullbug.jobs`
+        self.shared_fetches: Optional[SharedFetches] = None
+        # Pacing is left to the `RateLimiter` so that PyGithub doesn't also throttle concurrent requests
+        github_options: Dict[str, Any] = {
+            "base_url": self.base_url,
+            "per_page": pagination.PAGE_SIZE,
+            "pool_size": self.workers,
+            "retry": GITHUB_RETRY,
+            "seconds_between_requests": None,
+            "seconds_between_writes": None,
+        }
         if github_token:
-            self.github_instance = Github(auth=Auth.Token(github_token), base_url=self.base_url)
+            self.github_instance = Github(auth=Auth.Token(github_token), **github_options)
         else:
-            self.github_instance = Github(base_url=self.base_url)
+            self.github_instance = Github(**github_options)
+
+        # Mounted first so that it sits closest to the connection, see `AccountingAdapter`
+        self.accounting = ApiAccounting()
+        mount_github_adapter(self.github_instance, lambda adapter: AccountingAdapter(adapter, self.accounting))
+
+        self.rate_limiter = RateLimiter()
+        # How many calls each run may make, see `run`
+        self.call_budget = CallBudget(self.rate_limit_budget) if self.rate_limit_budget is not None else None
+        self._rate_limit_adapter = mount_github_adapter(
+            self.github_instance,
+            lambda adapter: RateLimitAdapter(adapter, self.rate_limiter, self.call_budget),
+        )
+
+        self._caching_adapter: Optional[CachingAdapter] = None
+        if not self.no_cache:
+            # Every GitHub request is made conditionally so unchanged responses don't count against the rate limit
+            self.response_cache = ResponseCache(os.path.join(self.location, "cache"))
+            self._caching_adapter = mount_github_adapter(
+                self.github_instance, lambda adapter: CachingAdapter(adapter, self.response_cache)
+            )
+
+        # Mounted last so that it sits furthest from the connection, see `MemoizingAdapter`
+        self.run_memo = RunMemo()
+        mount_github_adapter(
+            self.github_instance, lambda adapter: MemoizingAdapter(adapter, self.run_memo, self.accounting)
+        )
+
+        # What the last run found, so that only what changed since then needs to be requested
+        self.sync_state = SyncState(self.location)
+        # The users and teams seen in earlier runs, so that messages never need a request per user or team
+        self.identities = IdentityCache(self.location)
+        # Whether the state above is shared with other Pullbugs, which then save it rather than `run`, see `share_state`
+        self._shared_state = False
+
+        # The pages of lists after their first are requested on their own pool, see `_iterate_pages`
+        self._page_executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pullbug-pages")
+
+        # Where pull requests and issues are written in the `output_format`, replace it to write them elsewhere
+        self.output = sys.stdout
+
+        # Messages of every run are delivered over the same connections
+        self.transport = MessageTransport(
+            pool_size=self.message_pool_size,
+            timeout=self.message_timeout,
+            retries=self.message_retries,
+        )
+
+    def share_state(
+        self,
+        sync_state: SyncState,
+        identities: IdentityCache,
+        rate_limiter: RateLimiter,
+        response_cache: Optional[ResponseCache],
+    ):
+        """Use state shared with other Pullbugs, eg: the jobs of a batch with the same `location` or token.
+
+        Shared state isn't saved by `run`, whatever shares it saves it once every Pullbug sharing it has run (see
+        `pullbug.jobs.run_jobs`). The `response_cache` is only used if caching is enabled.
+        """
+        self.sync_state = sync_state
+        self.identities = identities
+        self.rate_limiter = self._rate_limit_adapter.rate_limiter = rate_limiter
+        if self._caching_adapter is not None and response_cache is not None:
+            self.response_cache = self._caching_adapter.cache = response_cache
+        self._shared_state = True
 
     def run(self):
-        """Run the logic to get PR's from GitHub and send that data via message."""
+        """Run the logic to get PR's from GitHub and send that data via message.
+
+        Every messaging platform is sent to at the same time, and the issues are fetched alongside the pull
+        requests. A platform that fails doesn't stop the others, the run raises a `DeliveryError` once it's done.
+        """
         self.setup_logger()
         logger = woodchips.get(LOGGER_NAME)
         logger.info("Running Pullbug...")
         self._run_missing_checks()
+        self._start_webhook_run()
+        self.accounting.reset()
+        if self.call_budget is not None:
+            self.call_budget.start_run()
+        # No URL is requested more than once per run, identical requests are answered from the first
+        self.run_memo.start()
+        self._delivery = self._open_delivery()
+        # Stops fetching in the background once the run is over, however it ended
+        run_finished = threading.Event()
 
-        repos = self.get_repos()
+        try:
+            # The search API and webhook index find pull requests and issues of the owner without listing its repos
+            with self.accounting.phase("get_repos"):
+                repos = self.filter_repos(self.get_repos()) if self._needs_repos() else []
+            self.log_estimated_calls(repos)
 
-        if self.pulls:
-            pull_requests = self.get_pull_requests(repos)
-            slack_pull_messages, discord_pull_messages = self.iterate_pull_requests(pull_requests)
-
-            # Check if there are pull requests and available messages to send (eg: filtering for drafts)
-            if pull_requests != [] and slack_pull_messages:
-                found_pull_requests = True
-                pull_message_preamble = "\n:bug: *The following GitHub pull requests still need your help!*\n"
-                slack_pull_messages.insert(0, pull_message_preamble)
-                discord_pull_messages.insert(0, pull_message_preamble)
-            else:
-                found_pull_requests = False
-                slack_pull_messages = discord_pull_messages = ["\n:bug: *Pullbug found no ready pull requests!*\n"]
-                logger.info(slack_pull_messages[0])
+            if self.issues:
+                issue_messages = self.iterate_routed_issues(self.get_issues(repos))
+                if self.pulls:
+                    # Issues are fetched alongside the pull requests, and sent as soon as the pull requests have been
+                    issue_messages = self._iterate_in_background(issue_messages, run_finished)
 
-            if found_pull_requests is False and self.quiet:
-                # The user doesn't want messages sent when there are no pull requests
-                pass
-            else:
-                self.send_messages(slack_pull_messages, discord_pull_messages)
+            if self.pulls:
+                self.send_digest(
+                    self.iterate_routed_pull_requests(self.get_pull_requests(repos)),
+                    "\n:bug: *The following GitHub pull requests still need your help!*\n",
+                    "\n:bug: *Pullbug found no ready pull requests!*\n",
+                )
 
-        if self.issues:
-            issues = self.get_issues(repos)
-            slack_issue_messages, discord_issue_messages = self.iterate_issues(issues)
-
-            # Check if there are issues and available messages to send
-            if issues != [] and slack_issue_messages:
-                found_issues = True
-                issue_message_preamble = "\n:bug: *The following GitHub issues still need your help!*\n"
-                slack_issue_messages.insert(0, issue_message_preamble)
-                discord_issue_messages.insert(0, issue_message_preamble)
-            else:
-                found_issues = False
-                slack_issue_messages = discord_issue_messages = ["\n:bug: *Pullbug found no open issues!*\n"]
-                logger.info(slack_issue_messages[0])
+            if self.issues:
+                self.send_digest(
+                    issue_messages,
+                    "\n:bug: *The following GitHub issues still need your help!*\n",
+                    "\n:bug: *Pullbug found no open issues!*\n",
+                )
+        finally:
+            run_finished.set()
+            self.run_memo.finish()
+            # Review data of pull requests a failed run never got to
+            self._prefetched_reviews.clear()
+            delivery_errors = self._finish_delivery()
 
-            if found_issues is False and self.quiet:
-                # The user doesn't want messages sent when there are no issues
-                pass
-            else:
-                self.send_messages(slack_issue_messages, discord_issue_messages)
+        self._finish_webhook_run()
+        if not self._shared_state:
+            if self.incremental:
+                self.sync_state.save()
+            self.identities.save()
+        self.report_api_usage()
+        if delivery_errors:
+            raise DeliveryError(delivery_errors)
 
         logger.info("Pullbug finished bugging!")
 
+    def serve(
+        self,
+        schedule: str = DEFAULT_SCHEDULE,
+        stop_event: Optional[threading.Event] = None,
+        webhook_port: Optional[int] = None,
+        webhook_host: str = DEFAULT_WEBHOOK_HOST,
+        webhook_secret: Optional[str] = None,
+        reconcile_every: int = DEFAULT_RECONCILE_EVERY,
+    ):
+        """Keep running Pullbug on a cron schedule until told to stop via SIGTERM or SIGINT.
+
+        The same GitHub client, and with it its connections, response cache, and sync state, is reused between
+        runs. A run that's in progress when the signal arrives is allowed to finish before stopping. A run that
+        fails is logged and retried on the next scheduled run.
+
+        With a `webhook_port`, GitHub webhook deliveries are received on it to keep an index of open pull requests
+        and issues. Runs then render from the index without any GitHub requests, only every `reconcile_every`
+        runs (and the first) polls GitHub as usual to catch anything the webhooks missed.
+        """
+        self.setup_logger()
+        logger = woodchips.get(LOGGER_NAME)
+        cron_schedule = CronSchedule(schedule)
+        self._run_missing_checks()
+
+        webhook_server = None
+        if webhook_port is not None:
+            if not webhook_secret:
+                self._throw_missing_error("webhook_secret")
+            if self.github_state != "open":
+                message = "The webhook index only keeps open pull requests and issues, use the open GitHub state."
+                logger.critical(message)
+                raise ValueError(message)
+
+            self.webhook_index = WebhookIndex(self._is_bugged_repo)
+            self.reconcile_every = reconcile_every
+            webhook_server = WebhookServer((webhook_host, webhook_port), self.webhook_index, webhook_secret)
+            threading.Thread(target=webhook_server.serve_forever, daemon=True).start()
+            logger.info(f"Pullbug is receiving GitHub webhooks on {webhook_host}:{webhook_server.server_port}...")
+
+        stop_event = stop_event or threading.Event()
+        previous_signal_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            # Signal handlers can only be installed from the main thread
+            for stop_signal in (signal.SIGTERM, signal.SIGINT):
+                previous_signal_handlers[stop_signal] = signal.signal(
+                    stop_signal, lambda signal_number, frame: stop_event.set()
+                )
+
+        logger.info(f"Pullbug is serving on the schedule {schedule}...")
+
+        try:
+            while not stop_event.is_set():
+                next_run = cron_schedule.next_run(datetime.now())
+                logger.info(f"Next Pullbug run at {next_run.isoformat()}.")
+                if stop_event.wait((next_run - datetime.now()).total_seconds()):
+                    break
+
+                try:
+                    self.run()
+                except Exception as error:
+                    logger.error(f"Pullbug run failed, retrying on the next scheduled run: {error}")
+        finally:
+            for stop_signal, previous_signal_handler in previous_signal_handlers.items():
+                signal.signal(stop_signal, previous_signal_handler)
+            if webhook_server:
+                webhook_server.shutdown()
+                webhook_server.server_close()
+            self.transport.close()
+
+        logger.info("Pullbug stopped serving!")
+
+    def report_api_usage(self):
+        """Write the API accounting of the run to the `location` and log where its requests went."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        summary = self.accounting.save(self.location)
+        logger.info(
+            f"Pullbug made {summary['requests']} requests ({summary['cache_hits']} answered from the cache),"
+            f" {summary['memo_hits']} more were answered from earlier in the run."
+        )
+        for phase, phase_summary in summary["phases"].items():
+            endpoints = ", ".join(
+                f"{endpoint['method']} {endpoint['endpoint']} x{endpoint['requests']}"
+                + (f" (p50 {endpoint['latency_ms']['p50']}ms)" if endpoint["latency_ms"] else "")
+                + (f" (+{endpoint['memo_hits']} memoised)" if endpoint["memo_hits"] else "")
+                for endpoint in phase_summary["endpoints"]
+            )
+            logger.info(f"{phase}: {phase_summary['requests']} requests, {endpoints}")
+
+    def _is_bugged_repo(self, repository: Dict[str, Any]) -> bool:
+        """Whether the repo of a webhook delivery is one Pullbug bugs about, filtered like `filter_repos`."""
+        owner, _, name = repository["full_name"].lower().partition("/")
+
+        return (
+            owner == self.github_owner.lower()
+            and (not self.repos or name in self.repos)
+            and not self._is_excluded_repo(
+                repository.get("disabled", False),
+                repository.get("archived", False),
+                repository.get("fork", False),
+            )
+        )
+
+    def _needs_repos(self) -> bool:
+        """Whether this run needs the owner's repos to find pull requests and issues."""
+        return self.fetch_engine != "search" and not self._use_webhook_index
+
+    def _start_webhook_run(self):
+        """Decide whether this run renders from the webhook index or reconciles it by polling GitHub as usual."""
+        self._use_webhook_index = False
+        self._reconciliation = None
+
+        if self.webhook_index is None:
+            return
+
+        if self.webhook_index.reconciled and self._runs_since_reconcile < self.reconcile_every:
+            self._use_webhook_index = True
+            self._runs_since_reconcile += 1
+        else:
+            self._reconciliation = {
+                "started_at": datetime.now(timezone.utc),
+                "pull_requests": [],
+                "issues": [],
+            }
+
+    def _finish_webhook_run(self):
+        """Replace the webhook index with what this run found if it was reconciling it."""
+        if self.webhook_index is None or self._reconciliation is None:
+            return
+
+        self.webhook_index.reconcile(
+            self._reconciliation["pull_requests"] if self.pulls else None,
+            self._reconciliation["issues"] if self.issues else None,
+            self._reconciliation["started_at"],
+        )
+        self._runs_since_reconcile = 0
+        self._reconciliation = None
+
     def setup_logger(self):
-        """Setup a `woodchips` logger for the project."""
+        """Setup a `woodchips` logger for the project.
+
+        Handlers are only added once so that long running processes (eg: `serve`) don't log each message repeatedly.
+        """
+        if self._logger_ready:
+            return
+        self._logger_ready = True
+
         logger = woodchips.Logger(
             name=LOGGER_NAME,
             level=self.log_level,
@@ -171,9 +558,22 @@ class Pullbug:
             self._throw_missing_error("slack_token")
         if self.slack and not self.slack_channel:
             self._throw_missing_error("slack_channel")
+        if any(route.slack_channel for route in self.routes) and not self.slack_token:
+            # Routes post to their Slack channel with the same token
+            self._throw_missing_error("slack_token")
+        if self.workers < 1:
+            self._throw_missing_error("workers")
+        if self.fetch_engine == "graphql" and not self.github_token:
+            # GitHub's GraphQL API cannot be used anonymously
+            self._throw_missing_error("github_token")
+        if self.incremental and self.fetch_engine != "rest":
+            woodchips.get(LOGGER_NAME).warning(
+                f"Incremental syncing is only supported by the REST fetch engine, ignoring it for {self.fetch_engine}."
+            )
+            self.incremental = False
 
     @staticmethod
-    def _throw_missing_error(missing_flag: str):
+    def _throw_missing_error(missing_flag: str) -> NoReturn:
         """Raise an error based on what env variables are missing."""
         logger = woodchips.get(LOGGER_NAME)
         message = f"No {missing_flag} set. Please correct and try again."
@@ -181,70 +581,363 @@ class Pullbug:
 
         raise ValueError(message)
 
+    def log_estimated_calls(self, repos: PaginatedList.PaginatedList):
+        """Log how many GitHub calls the rest of the run is expected to need against what the rate limit allows."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        estimated_calls = self.estimate_calls(repos)
+        calls_allowed = self.rate_limiter.calls_allowed()
+        budget_left = self.call_budget.calls_left() if self.call_budget is not None else None
+
+        logger.info(
+            f"Pullbug expects to need ~{estimated_calls} GitHub calls"
+            f" ({calls_allowed if calls_allowed is not None else 'unknown'} allowed before the rate limit resets"
+            f"{f', {budget_left} left in the budget of this run' if budget_left is not None else ''})."
+        )
+        if budget_left is not None and estimated_calls > budget_left:
+            logger.warning(
+                "Pullbug expects to use up its budget of GitHub calls, the run will wait for the rate limit to reset"
+                " once it has."
+            )
+        elif calls_allowed is not None and estimated_calls > calls_allowed:
+            logger.warning("Pullbug will need to wait for the GitHub rate limit to reset to finish this run.")
+
+    def estimate_calls(self, repos: PaginatedList.PaginatedList) -> int:
+        """Estimate the GitHub calls needed to fetch the pull requests and issues of `repos`.
+
+        A repo's `open_issues_count` includes its pull requests so it's used as the upper bound of both,
+        the estimate is only as good as that count (eg: closed pull requests aren't accounted for).
+        """
+        per_page = self.github_instance.per_page
+        open_counts = [repo.open_issues_count for repo in repos]
+        estimated_calls = 0
+
+        if self.pulls:
+            if self.fetch_engine == "search":
+                estimated_calls += 1
+            elif self.fetch_engine == "graphql":
+                estimated_calls += math.ceil(len(open_counts) / graphql.REPOS_PER_QUERY)
+                estimated_calls += sum(count // graphql.PULL_REQUESTS_PER_PAGE for count in open_counts)
+            else:
+                estimated_calls += sum(max(math.ceil(count / per_page), 1) for count in open_counts)
+                estimated_calls += sum(open_counts) * REST_CALLS_PER_PULL_REQUEST
+
+        if self.issues:
+            if self.fetch_engine == "search":
+                estimated_calls += 1
+            else:
+                estimated_calls += sum(max(math.ceil(count / per_page), 1) for count in open_counts)
+
+        return estimated_calls
+
     def get_repos(self) -> PaginatedList.PaginatedList:
-        """Get all repos of the `github_owner`."""
+        """Get all repos of the `github_owner`.
+
+        If the user specified a list of repos, each of them is requested directly (concurrently) rather than
+        listing every repo of the owner.
+        """
         logger = woodchips.get(LOGGER_NAME)
 
         logger.info("Bugging GitHub for repos...")
 
         repos: Any  # Fixes `mypy` type checking, repos are either a Python list or a GitHub PaginatedList
 
-        if self.github_context == "orgs":
-            repos = self.github_instance.get_organization(self.github_owner).get_repos()
-        elif self.github_context == "users":
-            repos = self.github_instance.get_user(self.github_owner).get_repos()
-
-        # If the user specified a list of repos, let's filter them here
         if self.repos:
-            filtered_repos = filter(lambda repo: repo.name.lower() in self.repos, repos)
-            repos = list(filtered_repos)
+            repos = self._fetch_concurrently(self._get_repo, self.repos)
+        elif self.shared_fetches:
+            # A shared listing is read by several Pullbugs at once, so it's listed in full up front
+            repos = self._fetch_shared(
+                ("repos", self.github_context, self.github_owner.lower()), lambda: list(self._list_repos())
+            )
+        else:
+            repos = self._list_repos()
 
         logger.info("GitHub repos retrieved!")
 
         return repos
 
-    def get_pull_requests(self, repos: PaginatedList.PaginatedList) -> List[PullRequest.PullRequest]:
-        """Grab all pull requests from each repo and return a flat list of pull requests."""
+    def _list_repos(self) -> Iterator[Repository.Repository]:
+        """List every repo of the `github_owner`, lazily."""
+        if self.github_context == "orgs":
+            return self._iterate_pages(self.github_instance.get_organization(self.github_owner).get_repos())
+
+        return self._iterate_pages(self.github_instance.get_user(self.github_owner).get_repos())
+
+    def filter_repos(self, repos: PaginatedList.PaginatedList) -> List[Repository.Repository]:
+        """Drop repos that can't have anything to bug about using only the fields returned when listing them.
+
+        Disabled repos are always dropped. Archived repos and forks are dropped unless included by the user,
+        as are repos without any open pull requests or issues when only open ones are wanted.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        filtered_repos = []
+        calls_saved = 0
+
+        for repo in repos:
+            if (
+                self._is_excluded_repo(repo.disabled, repo.archived, repo.fork)
+                # A repo's `open_issues_count` includes its open pull requests
+                or (self.github_state == "open" and repo.open_issues_count == 0)
+            ):
+                calls_saved += self.pulls + self.issues
+                continue
+            if self.issues and not repo.has_issues:
+                # Only the issues of this repo are skipped, see `_get_repo_issues`
+                calls_saved += 1
+
+            filtered_repos.append(repo)
+
+        if calls_saved:
+            logger.info(f"Skipped repos without anything to bug about, saving {calls_saved} GitHub calls.")
+
+        return filtered_repos
+
+    def _is_excluded_repo(self, disabled: bool, archived: bool, fork: bool) -> bool:
+        """Whether a repo is never bugged about, disabled ones always and archived ones and forks unless included."""
+        return disabled or (archived and not self.include_archived) or (fork and not self.include_forks)
+
+    def _get_repo(self, repo_name: str) -> Repository.Repository:
+        """Get a single repo of the `github_owner` by name."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        try:
+            with self.accounting.phase("get_repos"):
+                return self._fetch_shared(
+                    ("repo", f"{self.github_owner}/{repo_name}".lower()),
+                    lambda: self.github_instance.get_repo(f"{self.github_owner}/{repo_name}"),
+                )
+        except UnknownObjectException:
+            message = f"Repo {self.github_owner}/{repo_name} does not exist. Please correct and try again."
+            logger.critical(message)
+
+            raise ValueError(message)
+
+    def get_pull_requests(self, repos: PaginatedList.PaginatedList) -> Iterator[PullRequestRecord]:
+        """Grab all pull requests from each repo, yielding them as soon as their repo has been fetched.
+
+        Repos are fetched concurrently, pull requests are yielded in the order of `repos`. When using the search
+        fetch engine, `repos` is unused as the pull requests are found across the owner in one search.
+        """
         logger = woodchips.get(LOGGER_NAME)
 
         logger.info("Bugging GitHub for pull requests...")
+
+        pull_requests: Iterable[List[PullRequestRecord]]
+        if self._use_webhook_index:
+            pull_requests = [self._get_indexed_pull_requests()]
+        elif self.fetch_engine == "search":
+            with self.accounting.phase("get_pull_requests"):
+                pull_requests = [
+                    search.get_pull_requests(self.github_instance.requester, self._build_search_query("pr"))
+                ]
+        elif self.fetch_engine == "graphql":
+            pull_requests = self._get_graphql_pull_requests(repos)
+        else:
+            pull_requests = self._stream_concurrently(self._get_repo_pull_requests, repos)
+
+        for repo_pull_requests in pull_requests:
+            yield from repo_pull_requests
+
+        logger.info("Pull requests retrieved!")
+
+    def _get_indexed_pull_requests(self) -> List[PullRequestRecord]:
+        """Grab every pull request of the webhook index, keeping their review data aside like the GraphQL engine."""
         pull_requests = []
 
-        for repo in repos:
-            repo_pull_requests = repo.get_pulls(state=self.github_state)
-            if repo_pull_requests:
-                pull_requests.append(repo_pull_requests)
+        for indexed_pull_request in self.webhook_index.pull_requests():  # type: ignore[union-attr]
+            self._keep_prefetched_reviews(indexed_pull_request)
+            pull_requests.append(indexed_pull_request.pull_request)
+
+        return pull_requests
+
+    def _get_repo_pull_requests(self, repo: Repository.Repository) -> List[PullRequestRecord]:
+        """Grab every pull request of a single repo.
+
+        The list is materialized here so that all of the repo's pages are requested from the worker thread.
+        """
+        with self.accounting.phase("get_pull_requests"):
+            if self.incremental:
+                return self._fetch_shared(
+                    ("pulls", repo.full_name.lower(), self.github_state, self.sync_state.path),
+                    lambda: self._sync_repo_pull_requests(repo),
+                )
+
+            return self._fetch_shared(
+                ("pulls", repo.full_name.lower(), self.github_state),
+                lambda: [
+                    records.from_pull_request(pull_request)
+                    for pull_request in self._iterate_pages(repo.get_pulls(state=self.github_state))
+                ],
+            )
+
+    def _sync_repo_pull_requests(self, repo: Repository.Repository) -> List[PullRequestRecord]:
+        """Bring the stored pull requests of a repo up to date and rebuild them from the sync state.
+
+        Pull requests are requested most recently updated first, stopping at the first one that hasn't changed
+        since the last run. Changed pull requests lose their stored review data so it's requested again.
+        """
+        section = self.sync_state.get_section(repo.full_name, "pulls")
+
+        if section is None or section["github_state"] != self.github_state or section["watermark"] is None:
+            # Nothing usable from the last run, start over from every pull request
+            watermark = None
+            items: Dict[str, Dict[str, Any]] = {}
+            changed_pull_requests: Iterable[PullRequest.PullRequest] = self._iterate_pages(
+                repo.get_pulls(state=self.github_state)
+            )
+        else:
+            watermark = section["watermark"]
+            items = dict(section["items"])
+            # Usually stopped within the first page, so the pages after it are only requested as they're needed
+            changed_pull_requests = itertools.takewhile(
+                lambda pull_request: state.is_newer(pull_request.updated_at, section["watermark"]),
+                repo.get_pulls(state="all", sort="updated", direction="desc"),
+            )
+
+        for pull_request in changed_pull_requests:
+            watermark = state.advance_watermark(watermark, pull_request.updated_at)
+            if self.github_state in ("all", pull_request.state):
+                items[str(pull_request.number)] = {
+                    "attributes": state.pull_request_attributes(records.from_pull_request(pull_request))
+                }
             else:
-                # Repo has no pull requests
-                continue
+                # Eg: a pull request that was open on the last run has since been closed
+                items.pop(str(pull_request.number), None)
 
-        flat_pull_requests_list: List = [
-            pull_request for pull_request in pull_requests for pull_request in pull_request
+        self.sync_state.set_section(
+            repo.full_name,
+            "pulls",
+            {"github_state": self.github_state, "watermark": watermark, "items": items},
+        )
+
+        # Newest first, like GitHub lists them
+        return [state.to_pull_request(items[number]["attributes"]) for number in sorted(items, key=int, reverse=True)]
+
+    def _get_graphql_pull_requests(self, repos: PaginatedList.PaginatedList) -> Iterator[List[PullRequestRecord]]:
+        """Grab every pull request of each repo along with their review requests and reviews via GraphQL.
+
+        Repos are queried in batches, the review data is kept aside for `iterate_routed_pull_requests` so that
+        building messages doesn't need any further requests.
+        """
+        repo_full_names = [repo.full_name for repo in repos]
+        batches = [
+            repo_full_names[index : index + graphql.REPOS_PER_QUERY]
+            for index in range(0, len(repo_full_names), graphql.REPOS_PER_QUERY)
         ]
 
-        logger.info("Pull requests retrieved!")
+        batch_results = self._stream_concurrently(
+            self.accounting.in_phase(
+                "get_pull_requests",
+                lambda batch: graphql.get_pull_requests(self.github_instance.requester, batch, self.github_state),
+            ),
+            batches,
+        )
+
+        for batch_result in batch_results:
+            for repo_graphql_pull_requests in batch_result:
+                for graphql_pull_request in repo_graphql_pull_requests:
+                    self._keep_prefetched_reviews(graphql_pull_request)
+                yield [graphql_pull_request.pull_request for graphql_pull_request in repo_graphql_pull_requests]
+
+    def _keep_prefetched_reviews(self, pull_request_with_reviews: PullRequestWithReviews):
+        """Keep the review data of a pull request aside until its messages are built.
+
+        Drafts that are excluded never have their messages built, which is what lets go of the review data, so
+        theirs isn't kept at all.
+        """
+        if self._is_bugged_pull_request(pull_request_with_reviews.pull_request):
+            self._prefetched_reviews[pull_request_with_reviews.pull_request.html_url] = pull_request_with_reviews
+
+    def _is_bugged_pull_request(self, pull_request: PullRequestRecord) -> bool:
+        """Whether a pull request is bugged about, drafts are excluded unless the user wants them included."""
+        return self.drafts or not pull_request.draft
+
+    def get_review_requests(self, pull_request: PullRequestRecord) -> List[Reviewer]:
+        """Grab the users and teams whose review has been requested on a single pull request.
+
+        Only reviewers requested who haven't approved, requested changes, or been dismissed will be returned here.
+        """
+        prefetched_pull_request = self._prefetched_reviews.get(pull_request.html_url)
+        if prefetched_pull_request:
+            return prefetched_pull_request.reviewers
+
+        stored_pull_request = self.sync_state.get_pull_request_item(pull_request) if self.incremental else None
+        if stored_pull_request and "reviewers" in stored_pull_request:
+            return state.to_reviewers(stored_pull_request["reviewers"])
+
+        reviewers_requested = self._fetch_shared(
+            ("review_requests", pull_request.url),
+            lambda: self._request_review_requests(pull_request),
+        )
 
-        return flat_pull_requests_list
+        if stored_pull_request is not None:
+            stored_pull_request["reviewers"] = [state.reviewer_attributes(reviewer) for reviewer in reviewers_requested]
 
-    def get_pull_request_reviews(self, pull_request: PullRequest.PullRequest) -> Dict[str, List[NamedUser.NamedUser]]:
+        return reviewers_requested
+
+    def _request_review_requests(self, pull_request: PullRequestRecord) -> List[Reviewer]:
+        """Request the users and teams whose review has been requested on a single pull request from GitHub."""
+        reviewers = self._get_github_pull_request(pull_request).get_review_requests()
+        # GitHub lists every review request in one response rather than paging through them, so the first page of
+        # each list is all of it (iterating the lists would request them again, see PyGithub/PyGithub#2053)
+        user_reviewers_requested: Iterable[NamedUser.NamedUser] = reviewers[0].get_page(0)
+        team_reviewers_requested: Iterable[Team.Team] = reviewers[1].get_page(0)
+
+        reviewers_requested: List[Reviewer] = []
+        for user in user_reviewers_requested:
+            reviewers_requested.append(records.from_user(user))
+        for team in team_reviewers_requested:
+            reviewers_requested.append(records.from_reviewer(team))
+
+        return reviewers_requested
+
+    def get_pull_request_reviews(self, pull_request: PullRequestRecord) -> Dict[str, List[UserRecord]]:
         """Grab all pull request reviews of a single pull request.
 
         We then break down these reviews into `APPROVED`, `CHANGES_REQUESTED`, or `DISMISSED` as the `state`.
         """
+        # Reviews are the last thing needed of a pull request, its prefetched data is let go of here
+        prefetched_pull_request = self._prefetched_reviews.pop(pull_request.html_url, None)
+        if prefetched_pull_request:
+            return prefetched_pull_request.reviews_by_category
+
+        stored_pull_request = self.sync_state.get_pull_request_item(pull_request) if self.incremental else None
+        if stored_pull_request and "reviews_by_category" in stored_pull_request:
+            return {
+                category: [state.to_user(user) for user in users]
+                for category, users in stored_pull_request["reviews_by_category"].items()
+            }
+
+        pull_request_reviews_by_category = self._fetch_shared(
+            ("reviews", pull_request.url),
+            lambda: self._request_pull_request_reviews(pull_request),
+        )
+
+        if stored_pull_request is not None:
+            stored_pull_request["reviews_by_category"] = {
+                category: [state.user_attributes(user) for user in users]
+                for category, users in pull_request_reviews_by_category.items()
+            }
+
+        return pull_request_reviews_by_category
+
+    def _request_pull_request_reviews(self, pull_request: PullRequestRecord) -> Dict[str, List[UserRecord]]:
+        """Request all pull request reviews of a single pull request from GitHub, broken down by `state`."""
         logger = woodchips.get(LOGGER_NAME)
 
         logger.debug(f"Bugging GitHub for pull request reviews of {pull_request.title}...")
 
-        pull_request_reviews_by_category: Dict[str, List[NamedUser.NamedUser]] = {
+        pull_request_reviews_by_category: Dict[str, List[UserRecord]] = {
             "users_who_approved": [],
             "users_who_requested_changes": [],
             "users_who_were_dismissed": [],
         }
 
-        pull_request_reviews = pull_request.get_reviews()
+        pull_request_reviews = self._iterate_pages(self._get_github_pull_request(pull_request).get_reviews())
 
         for pull_request_review in pull_request_reviews:
-            pull_request_review_user = pull_request_review.user
+            pull_request_review_user = records.from_user(pull_request_review.user)
             if pull_request_review and pull_request_review.state == "APPROVED":
                 pull_request_reviews_by_category["users_who_approved"].append(pull_request_review_user)
             elif pull_request_review and pull_request_review.state == "CHANGES_REQUESTED":
@@ -256,91 +949,483 @@ class Pullbug:
 
         return pull_request_reviews_by_category
 
-    def get_issues(self, repos: PaginatedList.PaginatedList) -> List[Issue.Issue]:
-        """Grab all issues from each repo and return a flat list of issues."""
+    def _get_github_pull_request(self, pull_request: PullRequestRecord) -> PullRequest.PullRequest:
+        """Wrap a pull request record in a PyGithub pull request to request its review data with.
+
+        Only its URL is needed for that, it's marked as complete so it never loads the rest of the pull request.
+        """
+        return PullRequest.PullRequest(
+            self.github_instance.requester,
+            {},
+            {"number": pull_request.number, "url": pull_request.url},
+            completed=True,
+        )
+
+    def get_issues(self, repos: PaginatedList.PaginatedList) -> Iterator[IssueRecord]:
+        """Grab all issues from each repo, yielding them as soon as their repo has been fetched.
+
+        Repos are fetched concurrently, issues are yielded in the order of `repos`. When using the search
+        fetch engine, `repos` is unused as the issues are found across the owner in one search.
+        """
         logger = woodchips.get(LOGGER_NAME)
 
         logger.info("Bugging GitHub for issues...")
-        issues = []
 
-        for repo in repos:
-            repo_issues = repo.get_issues(state=self.github_state)
-            if repo_issues:
-                issues.append(repo_issues)
-            else:
-                # Repo has no issues
-                continue
+        issues: Iterable[List[IssueRecord]]
+        if self._use_webhook_index:
+            issues = [self.webhook_index.issues()]  # type: ignore[union-attr]
+        elif self.fetch_engine == "search":
+            with self.accounting.phase("get_issues"):
+                issues = [search.get_issues(self.github_instance.requester, self._build_search_query("issue"))]
+        else:
+            issues = self._stream_concurrently(self._get_repo_issues, repos)
 
-        # GitHub's v3 API apparently treats pull requests as issues, filter them out here
-        # Docs: https://docs.github.com/en/rest/reference/issues#list-repository-issues
-        flat_issues_list = [issue for issue in issues for issue in issue if not issue.pull_request]
+        for repo_issues in issues:
+            yield from repo_issues
 
         logger.info("Issues retrieved!")
 
-        return flat_issues_list
+    def _get_repo_issues(self, repo: Repository.Repository) -> List[IssueRecord]:
+        """Grab every issue of a single repo.
 
-    def iterate_pull_requests(self, pull_requests: PaginatedList.PaginatedList) -> Tuple[List[str], List[str]]:
-        """Iterate through each pull request of a repo and build the message array."""
-        slack_message_array = []
-        discord_message_array = []
+        The list is materialized here so that all of the repo's pages are requested from the worker thread.
+        """
+        if not repo.has_issues:
+            return []
 
-        for pull_request in pull_requests:
-            if pull_request.draft and not self.drafts:
-                # Exclude drafts if the user doesn't want them included
-                continue
-            else:
-                # Only reviewers requested who haven't approved, requested changes, or been dismissed will
-                # be returned here.
-                reviewers = pull_request.get_review_requests()
-                # This is a hack to get around this bug: https://github.com/PyGithub/PyGithub/issues/2053
-                # TODO: Change this from `.get_page(0) != []` to `.totalCount != 0` once `PyGithub > 1.55` is out
-                user_reviewers_requested = reviewers[0] if reviewers[0].get_page(0) != [] else []
-                team_reviewers_requested = reviewers[1] if reviewers[1].get_page(0) != [] else []
-
-                reviewers_requested = []
-                for user in user_reviewers_requested:
-                    reviewers_requested.append(user)
-                for team in team_reviewers_requested:
-                    reviewers_requested.append(team)
-
-                # We need to separately get reviewers who approved, requested changes, or got dismissed
-                pull_request_reviews_by_category = self.get_pull_request_reviews(pull_request)
-                users_who_approved = pull_request_reviews_by_category["users_who_approved"]
-                users_who_requested_changes = pull_request_reviews_by_category["users_who_requested_changes"]
-                users_who_were_dismissed = pull_request_reviews_by_category["users_who_were_dismissed"]
-
-                message, discord_message = prepare_pulls_message(
-                    pull_request=pull_request,
-                    reviewers=reviewers_requested,
-                    users_who_approved=users_who_approved,
-                    users_who_requested_changes=users_who_requested_changes,
-                    users_who_were_dismissed=users_who_were_dismissed,
-                    disable_descriptions=self.disable_descriptions,
+        with self.accounting.phase("get_issues"):
+            if self.incremental:
+                return self._fetch_shared(
+                    ("issues", repo.full_name.lower(), self.github_state, self.sync_state.path),
+                    lambda: self._sync_repo_issues(repo),
+                )
+
+            # GitHub's v3 API apparently treats pull requests as issues, filter them out here
+            # Docs: https://docs.github.com/en/rest/reference/issues#list-repository-issues
+            return self._fetch_shared(
+                ("issues", repo.full_name.lower(), self.github_state),
+                lambda: [
+                    records.from_issue(issue)
+                    for issue in self._iterate_pages(repo.get_issues(state=self.github_state))
+                    if not records.is_pull_request(issue)
+                ],
+            )
+
+    def _sync_repo_issues(self, repo: Repository.Repository) -> List[IssueRecord]:
+        """Bring the stored issues of a repo up to date and rebuild them from the sync state.
+
+        Only issues updated since the last run are requested, via `since`. Pull requests listed alongside them
+        aren't stored, so the issues returned here never need another request to find out whether they are one.
+        """
+        section = self.sync_state.get_section(repo.full_name, "issues")
+
+        if section is None or section["github_state"] != self.github_state or section["watermark"] is None:
+            # Nothing usable from the last run, start over from every issue
+            watermark = None
+            items: Dict[str, Dict[str, Any]] = {}
+            changed_issues: Iterable[Issue.Issue] = self._iterate_pages(repo.get_issues(state=self.github_state))
+        else:
+            watermark = section["watermark"]
+            items = dict(section["items"])
+            changed_issues = self._iterate_pages(
+                repo.get_issues(
+                    state="all",
+                    since=datetime.fromisoformat(watermark),
+                    sort="updated",
+                    direction="desc",
                 )
-                slack_message_array.append(message)
-                discord_message_array.append(discord_message)
+            )
+
+        for issue in changed_issues:
+            watermark = state.advance_watermark(watermark, issue.updated_at)
+            if not records.is_pull_request(issue) and self.github_state in ("all", issue.state):
+                items[str(issue.number)] = {"attributes": state.issue_attributes(records.from_issue(issue))}
+            else:
+                items.pop(str(issue.number), None)
+
+        self.sync_state.set_section(
+            repo.full_name,
+            "issues",
+            {"github_state": self.github_state, "watermark": watermark, "items": items},
+        )
 
-        return slack_message_array, discord_message_array
+        # Newest first, like GitHub lists them
+        return [state.to_issue(items[number]["attributes"]) for number in sorted(items, key=int, reverse=True)]
+
+    def _build_search_query(self, kind: search.SEARCH_KIND_CHOICES) -> str:
+        """Build the search query for the pull requests or issues of the `github_owner`."""
+        return search.build_query(
+            github_owner=self.github_owner,
+            github_context=self.github_context,
+            kind=kind,
+            github_state=self.github_state,
+            drafts=self.drafts,
+            repos=self.repos,
+            include_archived=self.include_archived,
+        )
+
+    def _fetch_shared(self, key: Tuple[Hashable, ...], fetch: Callable[[], T]) -> T:
+        """Fetch something from GitHub once for every Pullbug sharing the `shared_fetches`, or just fetch it."""
+        if self.shared_fetches is None:
+            return fetch()
+
+        return self.shared_fetches.get(key, fetch)
+
+    def _iterate_pages(self, items: Iterable[T]) -> Iterator[T]:
+        """Iterate over a list from GitHub with the pages after its first requested concurrently, see
+        `pagination.iterate_pages`.
+        """
+        return pagination.iterate_pages(items, self._submit_page)
+
+    def _submit_page(self, fetch: Callable[[], T]) -> "Future[T]":
+        """Request a page of a list on the page pool, attributed to the phase of the thread walking the list."""
+        return self._page_executor.submit(self.accounting.in_phase(self.accounting.current_phase, fetch))
+
+    def _fetch_concurrently(self, fetch: Callable[[Any], T], items: Iterable[Any]) -> List[T]:
+        """Run `fetch` against each item concurrently and return every result, see `_stream_concurrently`."""
+        return list(self._stream_concurrently(fetch, items))
+
+    def _stream_concurrently(self, fetch: Callable[[Any], T], items: Iterable[Any]) -> Iterator[T]:
+        """Run `fetch` against each item on a bounded pool of `workers` threads, yielding results as they are ready.
+
+        Results are yielded in the same order as `items`. Only a bounded number of items are fetched ahead of
+        the caller so memory doesn't grow with the number of items. The first error raised by any worker cancels
+        everything that hasn't started yet and is then re-raised once in-flight work has wrapped up.
+        """
+        items_iterator = iter(items)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = collections.deque(
+                executor.submit(fetch, item)
+                for item in itertools.islice(items_iterator, self.workers * FETCH_AHEAD_FACTOR)
+            )
+
+            try:
+                while pending:
+                    # Wait for the next result in order, unless something else fails first
+                    while not pending[0].done():
+                        done, _ = wait([future for future in pending if not future.done()], return_when=FIRST_COMPLETED)
+                        if any(future.exception() for future in done):
+                            break
+
+                    failed_futures = [future for future in pending if future.done() and future.exception()]
+                    if failed_futures:
+                        raise failed_futures[0].exception()  # type: ignore[misc]
+
+                    result = pending.popleft().result()
+                    # Start on the next item before handing over the result so the pool stays busy
+                    for item in itertools.islice(items_iterator, 1):
+                        pending.append(executor.submit(fetch, item))
+
+                    yield result
+            finally:
+                # Something failed or the caller stopped early, don't start any more requests
+                for future in pending:
+                    future.cancel()
+
+    def iterate_routed_pull_requests(self, pull_requests: Iterable[PullRequestRecord]) -> Iterator[RoutedMessage]:
+        """Iterate through each pull request and yield its messages by format with the routes it matched."""
+        for pull_request in pull_requests:
+            if self._is_bugged_pull_request(pull_request):
+                yield self._prepare_routed_pull_request(pull_request)
 
-    def iterate_issues(self, issues: PaginatedList.PaginatedList) -> Tuple[List[str], List[str]]:
-        """Iterate through each issue of a repo and build the message array."""
-        slack_message_array = []
-        discord_message_array = []
+    def _prepare_routed_pull_request(self, pull_request: PullRequestRecord) -> RoutedMessage:
+        """Build the messages of a single pull request and find the routes it matched.
 
+        The review requests the routes are matched against are the ones the messages are built from, routing
+        never requests anything more of GitHub.
+        """
+        if not self.routes:
+            return self._prepare_pull_request_message(pull_request), ()
+
+        with self.accounting.phase("iterate_pull_requests"):
+            reviewers_requested = self.get_review_requests(pull_request)
+        route_names = tuple(
+            route.name for route in self.routes if route.matches_pull_request(pull_request, reviewers_requested)
+        )
+
+        return self._prepare_pull_request_message(pull_request, reviewers_requested), route_names
+
+    def _prepare_pull_request_message(
+        self,
+        pull_request: PullRequestRecord,
+        reviewers_requested: Optional[List[Reviewer]] = None,
+    ) -> Dict[str, str]:
+        """Grab the review data of a single pull request (unless its review requests have been already) and build
+        its messages in each of the `_message_formats`.
+        """
+        with self.accounting.phase("iterate_pull_requests"):
+            if reviewers_requested is None:
+                reviewers_requested = self.get_review_requests(pull_request)
+
+            # We need to separately get reviewers who approved, requested changes, or got dismissed
+            pull_request_reviews_by_category = self.get_pull_request_reviews(pull_request)
+            reviewers_requested = self._resolve_reviewers(pull_request, reviewers_requested)
+        users_who_approved = pull_request_reviews_by_category["users_who_approved"]
+        users_who_requested_changes = pull_request_reviews_by_category["users_who_requested_changes"]
+        users_who_were_dismissed = pull_request_reviews_by_category["users_who_were_dismissed"]
+
+        if self._reconciliation is not None:
+            self._reconciliation["pull_requests"].append(
+                PullRequestWithReviews(pull_request, reviewers_requested, pull_request_reviews_by_category)
+            )
+
+        return prepare_pulls_message(
+            pull_request=pull_request,
+            reviewers=reviewers_requested,
+            users_who_approved=users_who_approved,
+            users_who_requested_changes=users_who_requested_changes,
+            users_who_were_dismissed=users_who_were_dismissed,
+            disable_descriptions=self.disable_descriptions,
+            formats=self._message_formats(),
+        )
+
+    def _resolve_reviewers(self, pull_request: PullRequestRecord, reviewers: List[Reviewer]) -> List[Reviewer]:
+        """Fill in the URLs of the teams whose review has been requested from the identity cache.
+
+        Teams the cache doesn't know yet are looked up along with every other team of the owner, once per TTL.
+        """
+        owner = pull_request.repo.full_name.split("/")[0]
+        resolved_reviewers = self.identities.resolve(owner, reviewers)
+        if self.identities.needs_team_lookup(owner, resolved_reviewers):
+            self.identities.look_up_teams(
+                owner,
+                lambda: self._fetch_shared(("teams", owner.lower()), lambda: self._request_teams(owner)),
+            )
+            resolved_reviewers = self.identities.resolve(owner, resolved_reviewers)
+
+        return list(resolved_reviewers)
+
+    def _request_teams(self, owner: str) -> List[TeamRecord]:
+        """Request every team of an organization from GitHub, a page per request rather than a request per team."""
+        teams: PaginatedList.PaginatedList[Team.Team] = PaginatedList.PaginatedList(
+            Team.Team,
+            self.github_instance.requester,
+            f"/orgs/{owner}/teams",
+            None,
+        )
+
+        return [records.from_team(team) for team in self._iterate_pages(teams)]
+
+    def iterate_routed_issues(self, issues: Iterable[IssueRecord]) -> Iterator[RoutedMessage]:
+        """Iterate through each issue and yield its messages by format with the routes it matched."""
         for issue in issues:
-            slack_message, discord_message = prepare_issues_message(issue, self.disable_descriptions)
-            slack_message_array.append(slack_message)
-            discord_message_array.append(discord_message)
+            route_names = tuple(route.name for route in self.routes if route.matches_issue(issue))
+            yield self._prepare_issue_message(issue), route_names
+
+    def _prepare_issue_message(self, issue: IssueRecord) -> Dict[str, str]:
+        """Build the messages of a single issue in each of the `_message_formats`."""
+        if self._reconciliation is not None:
+            self._reconciliation["issues"].append(issue)
+
+        return prepare_issues_message(issue, self.disable_descriptions, self._message_formats())
 
-        return slack_message_array, discord_message_array
+    def send_digest(self, messages: Iterable[RoutedMessage], preamble: str, nothing_found_message: str):
+        """Send a digest of messages led by the preamble, or a message saying nothing was found.
 
-    def send_messages(self, slack_messages: List[str], discord_messages: List[str]):
-        """Sends a message to the messaging platforms requested (can be multiple at once)."""
+        Every destination gets its own digest: `discord` and `slack` get every message, each route only gets the
+        messages that matched it. A destination that nothing matched is sent the `nothing_found_message` unless
+        the user wants to stay quiet.
+        """
         logger = woodchips.get(LOGGER_NAME)
 
+        if not self.routes:
+            messages = iter(messages)
+            first_message = next(messages, None)
+            if first_message:
+                self.send_messages(
+                    itertools.chain(
+                        [(preamble, preamble), self._output_messages(first_message[0])],
+                        (self._output_messages(message) for message, _ in messages),
+                    )
+                )
+            else:
+                logger.info(nothing_found_message)
+
+                # Unless the user doesn't want messages sent when there is nothing found
+                if not self.quiet:
+                    self.send_messages([(nothing_found_message, nothing_found_message)])
+
+            return
+
+        delivery = self._delivery or self._open_delivery()
+
+        route_names: List[Optional[str]] = [None, *(route.name for route in self.routes)]
+        routes_found = set()
+        # Building the messages can still request review data, that's attributed to its own phase
+        with self.accounting.phase("send_messages"):
+            delivery.start_digest()
+            for message, matched_route_names in messages:
+                slack_message, discord_message = self._output_messages(message)
+                for route_name in (None, *matched_route_names):
+                    if route_name not in routes_found:
+                        routes_found.add(route_name)
+                        self._add_message(delivery, route_name, preamble, preamble)
+                    self._add_message(delivery, route_name, slack_message, discord_message)
+                logger.info(slack_message or discord_message)
+
+            for route_name in route_names:
+                if route_name in routes_found:
+                    continue
+
+                logger.info(f"{route_name}: {nothing_found_message}" if route_name else nothing_found_message)
+                # Unless the user doesn't want messages sent when there is nothing found
+                if not self.quiet:
+                    self._add_message(delivery, route_name, nothing_found_message, nothing_found_message)
+            delivery.flush()
+
+        if delivery is not self._delivery:
+            delivery_errors = self._finish_delivery(delivery)
+            if delivery_errors:
+                raise DeliveryError(delivery_errors)
+
+    @staticmethod
+    def _add_message(delivery: MessageDelivery, route_name: Optional[str], slack_message: str, discord_message: str):
+        """Queue a pair of messages for the Discord and Slack destinations of a route, or of `discord` and `slack`."""
+        delivery.add(_destination(route_name, "discord"), discord_message)
+        delivery.add(_destination(route_name, "slack"), slack_message)
+
+    def send_messages(self, messages: Iterable[Tuple[str, str]]):
+        """Sends each pair of Slack and Discord messages to the messaging platforms requested (can be multiple at once).
+
+        Messages are sent as they are built, each platform sends a batch as soon as it fills up. During a run,
+        the messages are sent as a digest of the run's delivery, which is waited on once the run is done.
+        Otherwise, the messages are delivered before returning, raising a `DeliveryError` if any platform failed.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        delivery = self._delivery or self._open_delivery()
+
+        # Building the messages can still request review data, that's attributed to its own phase
+        with self.accounting.phase("send_messages"):
+            delivery.start_digest()
+            for slack_message, discord_message in messages:
+                delivery.add("discord", discord_message)
+                delivery.add("slack", slack_message)
+                logger.info(slack_message or discord_message)
+            delivery.flush()
+
+        if delivery is not self._delivery:
+            delivery_errors = self._finish_delivery(delivery)
+            if delivery_errors:
+                raise DeliveryError(delivery_errors)
+
+    def _output_messages(self, messages: Dict[str, str]) -> Tuple[str, str]:
+        """Write the message of a pull request or issue in the `output_format` (if any), returning its Slack and
+        Discord messages to send.
+        """
+        if self.output_format:
+            # A single write per message, so those of jobs sharing the `output` don't interleave
+            self.output.write(f"{messages[self.output_format]}\n")
+
+        return messages.get("slack", ""), messages.get("discord", "")
+
+    def _message_formats(self) -> Tuple[str, ...]:
+        """The formats messages are rendered in, only those of the messaging platforms that are sent to and the
+        `output_format`.
+
+        Slack's is also what's logged, so it's rendered unless only Discord is sent to.
+        """
+        discord = self.discord or any(route.discord_url for route in self.routes)
+        slack = self.slack or any(route.slack_channel for route in self.routes)
+
+        return (
+            *(["discord"] if discord else []),
+            *(["slack"] if slack or not discord else []),
+            *([self.output_format] if self.output_format else []),
+        )
+
+    def _open_delivery(self) -> MessageDelivery:
+        """Set up a sender for each of the messaging platforms requested."""
+        senders: Dict[str, MessageSender] = {}
         if self.discord:
-            send_discord_message(discord_messages, self.discord_url)
+            senders["discord"] = DiscordSender(self.discord_url, self.accounting, self.transport)
         if self.slack:
-            send_slack_message(slack_messages, self.slack_token, self.slack_channel)
+            senders["slack"] = SlackSender(self.slack_token, self.slack_channel, self.accounting, self.transport)
+        for route in self.routes:
+            if route.discord_url:
+                senders[_destination(route.name, "discord")] = DiscordSender(
+                    route.discord_url, self.accounting, self.transport
+                )
+            if route.slack_channel:
+                senders[_destination(route.name, "slack")] = SlackSender(
+                    self.slack_token, route.slack_channel, self.accounting, self.transport
+                )
+
+        return MessageDelivery(senders)
+
+    def _finish_delivery(self, delivery: Optional[MessageDelivery] = None) -> Dict[str, Exception]:
+        """Wait for a delivery (by default the run's) to be sent and log how each platform fared, returning the
+        errors of those that failed.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        if delivery is None:
+            delivery, self._delivery = self._delivery, None
+        if delivery is None:
+            return {}
+
+        with self.accounting.phase("send_messages"):
+            delivery_errors = delivery.close()
+        for destination, sender in delivery.senders.items():
+            route_name = destination.rpartition(":")[0]
+            label = f"{sender.platform} ({route_name})" if route_name else sender.platform
+            if destination in delivery_errors:
+                logger.error(f"{label}: {sender.posts_sent} posts sent before failing: {delivery_errors[destination]}")
+            else:
+                logger.info(f"{label}: {sender.posts_sent} posts sent.")
+
+        return delivery_errors
+
+    def _iterate_in_background(self, items: Iterable[T], stop: threading.Event) -> Iterator[T]:
+        """Iterate over `items` on a background thread from now on, yielding the items as they become available.
+
+        Only a bounded number of items are iterated ahead of what's been yielded, like `_stream_concurrently`.
+        An error raised while iterating is re-raised once the items before it have been yielded. Iterating stops
+        once `stop` is set, eg: when the run failed before getting to these items.
+        """
+        results: queue.Queue = queue.Queue(maxsize=self.workers * FETCH_AHEAD_FACTOR)
+
+        def put(result: Tuple[Any, Optional[Exception]]) -> bool:
+            while not stop.is_set():
+                try:
+                    results.put(result, timeout=BACKGROUND_STOP_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+
+            return False
+
+        def iterate():
+            try:
+                for item in items:
+                    if not put((item, None)):
+                        return
+            except Exception as error:
+                put((None, error))
+            else:
+                put((ITERATION_DONE, None))
+            finally:
+                # Stop any fetches the items were waiting on (eg: those of `_stream_concurrently`)
+                close = getattr(items, "close", None)
+                if close is not None:
+                    close()
+
+        def iterate_results() -> Iterator[T]:
+            while True:
+                item, error = results.get()
+                if error:
+                    raise error
+                if item is ITERATION_DONE:
+                    return
+
+                yield item
+
+        threading.Thread(target=iterate, daemon=True).start()
+
+        return iterate_results()
+
 
-        logger.info(slack_messages)
+def _destination(route_name: Optional[str], platform: str) -> str:
+    """The key of a route's destination on a platform in a `MessageDelivery`, the platform itself without a route."""
+    return f"{route_name}:{platform}" if route_name else platform
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    Dict,
+    Optional,
+)
+
+import requests
+import woodchips
+from requests.structures import CaseInsensitiveDict
+
+from pullbug.adapters import WrappedAdapter
+
+LOGGER_NAME = "pullbug"
+DEFAULT_CACHE_MAX_BYTES = 50 * 1024 * 1024
+CACHE_HIT_HEADER = "X-Pullbug-Cache"
+# These describe the encoded body on the wire, cached bodies are stored decoded
+WIRE_HEADERS = {
+    "content-encoding",
+    "content-length",
+    "transfer-encoding",
+}
+
+
+class ResponseCache:
+    """An on-disk cache of GitHub responses that carry an `ETag` or `Last-Modified` header.
+
+    Each response is stored in its own file, the total size of the cache is bounded by evicting the
+    least recently used responses. File modification times record usage so the order survives between runs.
+    """
+
+    def __init__(self, location: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.location = location
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Maps each cache key to the size of its file, ordered from least to most recently used
+        self._entries: Optional[OrderedDict[str, int]] = None
+
+    @staticmethod
+    def key(request: requests.PreparedRequest) -> str:
+        """Build the cache key of a request.
+
+        Responses differ between tokens and media types so those are part of the key, the token is
+        only ever stored hashed.
+        """
+        key_parts = [
+            request.method or "",
+            request.url or "",
+            str(request.headers.get("Accept", "")),
+            str(request.headers.get("Authorization", "")),
+        ]
+
+        return hashlib.sha256("\n".join(key_parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retrieve a cached response, marking it as the most recently used."""
+        with self._lock:
+            entries = self._load_entries()
+            if key not in entries:
+                return None
+
+            try:
+                with open(self._path(key), "r") as cache_file:
+                    cached_response = json.load(cache_file)
+                os.utime(self._path(key))
+            except (OSError, ValueError):
+                # The file was removed or is corrupt, treat it as a miss so it gets replaced
+                del entries[key]
+                return None
+
+            entries.move_to_end(key)
+
+            return cached_response
+
+    def set(self, key: str, cached_response: Dict[str, Any]):
+        """Store a response, evicting the least recently used responses once over `max_bytes`."""
+        data = json.dumps(cached_response)
+
+        with self._lock:
+            entries = self._load_entries()
+            os.makedirs(self.location, exist_ok=True)
+
+            # Write to a temporary file first so concurrent readers never see a partial response
+            temporary_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            with open(temporary_path, "w") as cache_file:
+                cache_file.write(data)
+            os.replace(temporary_path, self._path(key))
+
+            entries[key] = len(data)
+            entries.move_to_end(key)
+            self._evict(entries)
+
+    def _evict(self, entries: OrderedDict[str, int]):
+        """Remove the least recently used responses until the cache fits in `max_bytes`."""
+        total_bytes = sum(entries.values())
+
+        while entries and total_bytes > self.max_bytes:
+            key, size = entries.popitem(last=False)
+            total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _load_entries(self) -> OrderedDict[str, int]:
+        """Index the responses already on disk, oldest used first. Must be called while holding the lock."""
+        if self._entries is None:
+            self._entries = OrderedDict()
+
+            if os.path.isdir(self.location):
+                cache_files = []
+                for entry in os.scandir(self.location):
+                    if entry.name.endswith(".json") and entry.is_file():
+                        stat = entry.stat()
+                        cache_files.append((stat.st_mtime, entry.name[: -len(".json")], stat.st_size))
+
+                for _, key, size in sorted(cache_files):
+                    self._entries[key] = size
+
+        return self._entries
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.location, f"{key}.json")
+
+
+class CachingAdapter(WrappedAdapter):
+    """Sends GitHub `GET` requests conditionally, answering `304 Not Modified` responses from the cache.
+
+    GitHub doesn't count `304` responses against the rate limit, so unchanged data is free to re-request.
+    """
+
+    def __init__(self, adapter: requests.adapters.BaseAdapter, cache: ResponseCache):
+        super().__init__(adapter)
+        self.cache = cache
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        # Leave requests that are already conditional to the caller (eg: PyGithub's `update()`)
+        if (
+            request.method != "GET"
+            or "If-None-Match" in request.headers
+            or "If-Modified-Since" in request.headers
+            or kwargs.get("stream")
+        ):
+            return super().send(request, **kwargs)
+
+        key = self.cache.key(request)
+        cached_response = self.cache.get(key)
+
+        if cached_response:
+            if cached_response.get("etag"):
+                request.headers["If-None-Match"] = cached_response["etag"]
+            if cached_response.get("last_modified"):
+                request.headers["If-Modified-Since"] = cached_response["last_modified"]
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and cached_response:
+            return self._build_cached_response(request, response, cached_response)
+        elif response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            self.cache.set(
+                key,
+                {
+                    "url": request.url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "headers": _entity_headers(response.headers),
+                    "body": response.content.decode(response.encoding or "utf-8"),
+                },
+            )
+
+        return response
+
+    def _build_cached_response(
+        self,
+        request: requests.PreparedRequest,
+        not_modified_response: requests.Response,
+        cached_response: Dict[str, Any],
+    ) -> requests.Response:
+        """Rebuild the cached `200` response, keeping the fresh headers (eg: rate limits) of the `304`."""
+        logger = woodchips.get(LOGGER_NAME)
+        logger.debug(f"Using cached response for {request.url}")
+
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(cached_response["headers"])
+        response.headers.update(_entity_headers(not_modified_response.headers))
+        response.headers[CACHE_HIT_HEADER] = "HIT"
+        response.encoding = "utf-8"
+        response._content = cached_response["body"].encode("utf-8")
+        response.url = not_modified_response.url
+        response.request = request
+        response.connection = self  # type: ignore[assignment]
+        not_modified_response.close()
+
+        return response
+
+
+def _entity_headers(headers: CaseInsensitiveDict) -> Dict[str, str]:
+    """Drop the headers that only apply to the encoded body on the wire."""
+    return {name: value for name, value in headers.items() if name.lower() not in WIRE_HEADERS}
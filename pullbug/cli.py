@@ -4,13 +4,28 @@ from typing import get_args
 from pullbug._version import __version__
 from pullbug.bug import (
     DEFAULT_BASE_URL,
+    DEFAULT_FETCH_ENGINE,
     DEFAULT_LOCATION,
     DEFAULT_LOG_LEVEL,
+    DEFAULT_WORKERS,
+    FETCH_ENGINE_CHOICES,
     GITHUB_CONTEXT_CHOICES,
     GITHUB_STATE_CHOICES,
     LOG_LEVEL_CHOICES,
+    OUTPUT_FORMAT_CHOICES,
     Pullbug,
 )
+from pullbug.jobs import run_config
+from pullbug.schedule import DEFAULT_SCHEDULE
+from pullbug.transport import (
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+)
+from pullbug.webhooks import (
+    DEFAULT_RECONCILE_EVERY,
+    DEFAULT_WEBHOOK_HOST,
+)
 
 
 class PullBugCli:
@@ -18,6 +33,13 @@ class PullBugCli:
         parser = argparse.ArgumentParser(
             description="Get bugged via Discord or Slack to merge your GitHub pull requests."
         )
+        parser.add_argument(
+            "command",
+            nargs="?",
+            choices=["serve"],
+            default=None,
+            help="Use `serve` to keep Pullbug running, bugging on the `--schedule` until stopped.",
+        )
         parser.add_argument(
             "-p",
             "--pulls",
@@ -161,6 +183,128 @@ class PullBugCli:
             default=False,
             help="Does not output when there is nothing to bug about.",
         )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            required=False,
+            type=int,
+            default=DEFAULT_WORKERS,
+            help="The number of repos to bug GitHub about concurrently.",
+        )
+        parser.add_argument(
+            "--fetch_engine",
+            required=False,
+            type=str,
+            default=DEFAULT_FETCH_ENGINE,
+            choices=set(get_args(FETCH_ENGINE_CHOICES)),
+            help="The GitHub API used to retrieve pull requests and issues.",
+        )
+        parser.add_argument(
+            "--no_cache",
+            required=False,
+            action="store_true",
+            default=False,
+            help="Disables caching GitHub responses between runs.",
+        )
+        parser.add_argument(
+            "--rate_limit_budget",
+            required=False,
+            type=int,
+            default=None,
+            help="The most GitHub calls a run may make before the rate limit resets, then it waits for the reset.",
+        )
+        parser.add_argument(
+            "--incremental",
+            required=False,
+            action="store_true",
+            default=False,
+            help="Only request the pull requests and issues that changed since the last run (REST fetch engine only).",
+        )
+        parser.add_argument(
+            "--include_forks",
+            required=False,
+            action="store_true",
+            default=False,
+            help="Include forked repos.",
+        )
+        parser.add_argument(
+            "--include_archived",
+            required=False,
+            action="store_true",
+            default=False,
+            help="Include archived repos.",
+        )
+        parser.add_argument(
+            "--message_pool_size",
+            required=False,
+            type=int,
+            default=DEFAULT_POOL_SIZE,
+            help="The number of connections kept open to Discord and Slack each.",
+        )
+        parser.add_argument(
+            "--message_timeout",
+            required=False,
+            type=float,
+            default=DEFAULT_TIMEOUT,
+            help="The number of seconds to wait on Discord or Slack before a message fails.",
+        )
+        parser.add_argument(
+            "--message_retries",
+            required=False,
+            type=int,
+            default=DEFAULT_RETRIES,
+            help="The number of times a message is retried while Discord or Slack is unavailable or rate limiting.",
+        )
+        parser.add_argument(
+            "--output_format",
+            required=False,
+            type=str,
+            default=None,
+            choices=set(get_args(OUTPUT_FORMAT_CHOICES)),
+            help="Also write every pull request and issue to stdout in this format, eg: for other tools to consume.",
+        )
+        parser.add_argument(
+            "--schedule",
+            required=False,
+            type=str,
+            default=DEFAULT_SCHEDULE,
+            help="The cron schedule to bug on when using `serve`.",
+        )
+        parser.add_argument(
+            "--webhook_port",
+            required=False,
+            type=int,
+            default=None,
+            help="Receive GitHub webhooks on this port when using `serve`, to bug without polling GitHub.",
+        )
+        parser.add_argument(
+            "--webhook_host",
+            required=False,
+            type=str,
+            default=DEFAULT_WEBHOOK_HOST,
+            help="The host to receive GitHub webhooks on.",
+        )
+        parser.add_argument(
+            "--webhook_secret",
+            required=False,
+            type=str,
+            default=None,
+            help="The secret GitHub webhooks are signed with.",
+        )
+        parser.add_argument(
+            "--reconcile_every",
+            required=False,
+            type=int,
+            default=DEFAULT_RECONCILE_EVERY,
+            help="How many scheduled runs bug from GitHub webhooks before polling GitHub for anything they missed.",
+        )
+        parser.add_argument(
+            "--config",
+            required=False,
+            type=str,
+            default=None,
+            help="Run every job of a TOML config file in one process, sharing what they fetch from GitHub.",
+        )
         parser.add_argument(
             "--version",
             action="version",
@@ -168,7 +312,14 @@ class PullBugCli:
         )
         parser.parse_args(namespace=self)
 
+        if self.config and self.command == "serve":
+            parser.error("`serve` does not support --config, schedule `pullbug --config` instead.")
+
     def run(self):
+        if self.config:
+            run_config(self.config)
+            return
+
         bug = Pullbug(
             self.github_owner,
             self.github_token,
@@ -188,8 +339,29 @@ class PullBugCli:
             self.log_level,
             self.disable_descriptions,
             self.quiet,
+            self.workers,
+            self.fetch_engine,
+            self.no_cache,
+            self.rate_limit_budget,
+            self.incremental,
+            self.include_forks,
+            self.include_archived,
+            message_pool_size=self.message_pool_size,
+            message_timeout=self.message_timeout,
+            message_retries=self.message_retries,
+            output_format=self.output_format,
         )
-        bug.run()
+
+        if self.command == "serve":
+            bug.serve(
+                self.schedule,
+                webhook_port=self.webhook_port,
+                webhook_host=self.webhook_host,
+                webhook_secret=self.webhook_secret,
+                reconcile_every=self.reconcile_every,
+            )
+        else:
+            bug.run()
 
 
 def main():
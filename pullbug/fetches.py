@@ -0,0 +1,39 @@
+import threading
+from concurrent.futures import Future
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class SharedFetches:
+    """GitHub data fetched at most once and shared by everything that asks for it by the same key.
+
+    Asking for a key that's already being fetched waits for that fetch rather than starting another, so
+    concurrent jobs never request the same data twice. A fetch that fails fails for everyone waiting on it.
+    """
+
+    def __init__(self) -> None:
+        self._results: Dict[Tuple[Hashable, ...], Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[Hashable, ...], fetch: Callable[[], T]) -> T:
+        """The result of `fetch` for `key`, calling it only if nothing has fetched `key` yet."""
+        with self._lock:
+            result = self._results.get(key)
+            fetching = result is None
+            if result is None:
+                result = self._results[key] = Future()
+
+        if fetching:
+            try:
+                result.set_result(fetch())
+            except Exception as error:
+                result.set_exception(error)
+
+        return result.result()
@@ -0,0 +1,349 @@
+import abc
+import functools
+import json
+import threading
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from pullbug.records import (
+    IssueRecord,
+    PullRequestRecord,
+    RepoRecord,
+    Reviewer,
+    TeamRecord,
+    UserRecord,
+)
+
+DESCRIPTION_CONTINUATION = "..."
+DESCRIPTION_MAX_LENGTH = 120
+
+ITEM_KIND_CHOICES = Literal[
+    "pull_request",
+    "issue",
+]
+# How many rendered links a formatter keeps before starting over
+RENDER_CACHE_SIZE = 10000
+
+T = TypeVar("T", UserRecord, Reviewer)
+
+
+@dataclass(slots=True)
+class MessageItem:
+    """A pull request or issue normalised for rendering, built once however many formats it's rendered in.
+
+    Reviewers are grouped into `approved`, `requested_changes`, `dismissed`, and `requested` (in the order they're
+    listed in messages), each group deduplicated and only included if it has anyone in it.
+    The description is already truncated, it's `None` when descriptions are disabled. Items are built for every
+    message, so unlike records they aren't frozen (which makes them several times slower to build).
+    """
+
+    kind: ITEM_KIND_CHOICES
+    title: str
+    html_url: str
+    repo: RepoRecord
+    description: Optional[str]
+    author: Optional[UserRecord] = None
+    reviews: Sequence[Tuple[str, Sequence[Reviewer]]] = ()
+    assignees: Sequence[UserRecord] = ()
+
+
+def pull_request_item(
+    pull_request: PullRequestRecord,
+    reviewers: Sequence[Reviewer],
+    users_who_approved: Sequence[UserRecord],
+    users_who_requested_changes: Sequence[UserRecord],
+    users_who_were_dismissed: Sequence[UserRecord],
+    disable_descriptions: bool = False,
+) -> MessageItem:
+    """Normalise a pull request and its review data for rendering.
+
+    Reviewers who approved are left out of those who requested changes or were dismissed.
+    """
+    approved = _unique(users_who_approved)
+    requested_changes = _unique(users_who_requested_changes)
+    dismissed = _unique(users_who_were_dismissed)
+    if approved and (requested_changes or dismissed):
+        approved_users = {(user.login, user.html_url) for user in approved}
+        requested_changes = [user for user in requested_changes if (user.login, user.html_url) not in approved_users]
+        dismissed = [user for user in dismissed if (user.login, user.html_url) not in approved_users]
+    requested = _unique(reviewers)
+
+    reviews: List[Tuple[str, Sequence[Reviewer]]] = []
+    if approved:
+        reviews.append(("approved", approved))
+    if requested_changes:
+        reviews.append(("requested_changes", requested_changes))
+    if dismissed:
+        reviews.append(("dismissed", dismissed))
+    if requested:
+        reviews.append(("requested", requested))
+
+    return MessageItem(
+        "pull_request",
+        pull_request.title,
+        pull_request.html_url,
+        pull_request.repo,
+        _description(pull_request.body, disable_descriptions),
+        pull_request.user,
+        reviews,
+    )
+
+
+def issue_item(issue: IssueRecord, disable_descriptions: bool = False) -> MessageItem:
+    """Normalise an issue for rendering."""
+    return MessageItem(
+        "issue",
+        issue.title,
+        issue.html_url,
+        issue.repo,
+        _description(issue.body, disable_descriptions),
+        issue.user,
+        assignees=issue.assignees,
+    )
+
+
+class Formatter(abc.ABC):
+    """Render message items in a single format, see `FORMATTERS`."""
+
+    @abc.abstractmethod
+    def format(self, item: MessageItem) -> str: ...
+
+
+class MarkupFormatter(Formatter):
+    """Render message items as marked up text, eg: Slack's mrkdwn or Discord's markdown.
+
+    Each format writes out its links and messages as f-strings in a subclass, so they're compiled along with the
+    module rather than parsed on every message. The same few users and repos show up across most items, so each
+    of their links is only rendered the first time a thread sees it. Formatters are shared by every run (and job)
+    of the process, so each thread keeps its own links rather than locking around them.
+    """
+
+    # What each category of reviewers is led by, see `MessageItem`
+    review_prefixes: Dict[str, str] = {}
+
+    def __init__(self) -> None:
+        # The rendered links of users, teams, and repos by their text and URL, per thread
+        self._local = threading.local()
+
+    @abc.abstractmethod
+    def link(self, text: str, url: str) -> str: ...
+
+    @abc.abstractmethod
+    def description(self, description: str) -> str: ...
+
+    @abc.abstractmethod
+    def pull_request_message(self, title: str, repo: str, author: str, description: str, reviewers: str) -> str: ...
+
+    @abc.abstractmethod
+    def issue_message(self, title: str, repo: str, description: str, assignees: str) -> str: ...
+
+    def format(self, item: MessageItem) -> str:
+        links: Optional[Dict[Tuple[str, str], str]] = getattr(self._local, "links", None)
+        if links is None or len(links) > RENDER_CACHE_SIZE:
+            links = self._local.links = {}
+        render_link = functools.partial(self._render_link, links)
+
+        description = "" if item.description is None else self.description(item.description)
+        repo = links.get((item.repo.name, item.repo.html_url)) or render_link(item.repo.name, item.repo.html_url)
+
+        if item.kind == "issue":
+            assignees = [
+                links.get((user.login, user.html_url)) or render_link(user.login, user.html_url)
+                for user in item.assignees
+            ]
+
+            return self.issue_message(
+                self.link(item.title, item.html_url),
+                repo,
+                description,
+                ", ".join(assignees) if assignees else "NA",
+            )
+
+        reviews = ""
+        for category, reviewers in item.reviews:
+            reviewer_links = []
+            for reviewer in reviewers:
+                if isinstance(reviewer, TeamRecord):
+                    # Teams are only left without their URL if their owner's teams couldn't be looked up
+                    reviewer_links.append(
+                        (links.get((reviewer.name, reviewer.html_url)) or render_link(reviewer.name, reviewer.html_url))
+                        if reviewer.html_url
+                        else reviewer.name
+                    )
+                else:
+                    reviewer_links.append(
+                        links.get((reviewer.login, reviewer.html_url)) or render_link(reviewer.login, reviewer.html_url)
+                    )
+            reviews += f"{self.review_prefixes[category]}{', '.join(reviewer_links)};"
+        author = item.author
+
+        return self.pull_request_message(
+            self.link(item.title, item.html_url),
+            repo,
+            (links.get((author.login, author.html_url)) or render_link(author.login, author.html_url))
+            if author
+            else "NA",
+            description,
+            reviews or " NA",
+        )
+
+    def _render_link(self, links: Dict[Tuple[str, str], str], text: str, url: str) -> str:
+        """Render the link of a user, team, or repo, keeping it in `links` for the next item that links to it."""
+        link = links[(text, url)] = self.link(text, url)
+
+        return link
+
+
+class SlackFormatter(MarkupFormatter):
+    """Render message items in Slack's mrkdwn."""
+
+    review_prefixes = {
+        "approved": "  :white_check_mark: ",
+        "requested_changes": "  :no_entry: ",
+        "dismissed": "  :eyes: ",
+        "requested": "  :timer_clock: ",
+    }
+
+    def link(self, text: str, url: str) -> str:
+        return f"<{url}|{text}>"
+
+    def description(self, description: str) -> str:
+        return f"\n*Description:* {description}"
+
+    def pull_request_message(self, title: str, repo: str, author: str, description: str, reviewers: str) -> str:
+        return (
+            f"\n:arrow_heading_up: *Pull Request:* {title}\n*Repo:* {repo}\n*Author:* {author}{description}"
+            f"\n*Reviewers:*{reviewers}\n"
+        )
+
+    def issue_message(self, title: str, repo: str, description: str, assignees: str) -> str:
+        return f"\n:exclamation: *Issue:* {title}\n*Repo:* {repo}{description}\n*Assigned to:* {assignees}\n"
+
+
+class DiscordFormatter(MarkupFormatter):
+    """Render message items in Discord's markdown."""
+
+    review_prefixes = {
+        "approved": "  :white_check_mark: ",
+        "requested_changes": "  :no_entry: ",
+        "dismissed": "  :eyes: ",
+        "requested": "  :timer: ",
+    }
+
+    def link(self, text: str, url: str) -> str:
+        return f"[{text}]({url})"
+
+    def description(self, description: str) -> str:
+        return f"\n*Description:* {description}"
+
+    def pull_request_message(self, title: str, repo: str, author: str, description: str, reviewers: str) -> str:
+        return (
+            f"\n:arrow_heading_up: **Pull Request:** {title}\n**Repo:** {repo}\n**Author:** {author}{description}"
+            f"\n*Reviewers:*{reviewers}\n"
+        )
+
+    def issue_message(self, title: str, repo: str, description: str, assignees: str) -> str:
+        return f"\n:exclamation: **Issue:** {title}\n**Repo:** {repo}{description}\n**Assigned to:** {assignees}\n"
+
+
+class TextFormatter(MarkupFormatter):
+    """Render message items as plain text, eg: for logs or email."""
+
+    review_prefixes = {
+        "approved": "  approved: ",
+        "requested_changes": "  requested changes: ",
+        "dismissed": "  dismissed: ",
+        "requested": "  requested: ",
+    }
+
+    def link(self, text: str, url: str) -> str:
+        return f"{text} ({url})"
+
+    def description(self, description: str) -> str:
+        return f"\nDescription: {description}"
+
+    def pull_request_message(self, title: str, repo: str, author: str, description: str, reviewers: str) -> str:
+        return f"\nPull Request: {title}\nRepo: {repo}\nAuthor: {author}{description}\nReviewers:{reviewers}\n"
+
+    def issue_message(self, title: str, repo: str, description: str, assignees: str) -> str:
+        return f"\nIssue: {title}\nRepo: {repo}{description}\nAssigned to: {assignees}\n"
+
+
+class JSONFormatter(Formatter):
+    """Render message items as JSON objects, eg: for other tools to consume."""
+
+    def format(self, item: MessageItem) -> str:
+        message: Dict[str, Any] = {
+            "kind": item.kind,
+            "title": item.title,
+            "url": item.html_url,
+            "repo": {"name": item.repo.name, "full_name": item.repo.full_name, "url": item.repo.html_url},
+            "author": _user_json(item.author) if item.author else None,
+            "description": item.description,
+        }
+        if item.kind == "issue":
+            message["assignees"] = [_user_json(user) for user in item.assignees]
+        else:
+            message["reviewers"] = {
+                category: [_reviewer_json(reviewer) for reviewer in reviewers] for category, reviewers in item.reviews
+            }
+
+        return json.dumps(message)
+
+
+# Formatters by name, add to these to render items in another format
+FORMATTERS: Dict[str, Formatter] = {
+    "slack": SlackFormatter(),
+    "discord": DiscordFormatter(),
+    "text": TextFormatter(),
+    "json": JSONFormatter(),
+}
+
+
+def render(item: MessageItem, formats: Iterable[str]) -> Dict[str, str]:
+    """Render an item in each of the formats, by format name."""
+    return {format_name: FORMATTERS[format_name].format(item) for format_name in formats}
+
+
+def _unique(users: Sequence[T]) -> Sequence[T]:
+    """The users (or teams) without duplicates, in the order they were first seen."""
+    if len(users) < 2:
+        return users
+
+    unique: Dict[Tuple[str, Optional[str]], T] = {}
+    for user in users:
+        key = (user.name, None) if isinstance(user, TeamRecord) else (user.login, user.html_url)
+        if key not in unique:
+            unique[key] = user
+
+    return list(unique.values())
+
+
+def _description(body: Optional[str], disable_descriptions: bool) -> Optional[str]:
+    if disable_descriptions:
+        return None
+
+    body = body if body else ""
+
+    return body[:DESCRIPTION_MAX_LENGTH] + DESCRIPTION_CONTINUATION if len(body) > DESCRIPTION_MAX_LENGTH else body
+
+
+def _user_json(user: UserRecord) -> Dict[str, str]:
+    return {"login": user.login, "url": user.html_url}
+
+
+def _reviewer_json(reviewer: Reviewer) -> Dict[str, Optional[str]]:
+    if isinstance(reviewer, TeamRecord):
+        return {"team": reviewer.name, "slug": reviewer.slug, "url": reviewer.html_url}
+
+    return {"login": reviewer.login, "url": reviewer.html_url}
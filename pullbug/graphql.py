@@ -0,0 +1,216 @@
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from github import Requester
+
+from pullbug.records import (
+    PullRequestRecord,
+    PullRequestWithReviews,
+    RepoRecord,
+    Reviewer,
+    TeamRecord,
+    UserRecord,
+    parse_datetime,
+)
+
+# Each query asks for a page of pull requests for several repos at once via aliases. GitHub caps a single query
+# at 500,000 nodes, 10 repos * 100 pull requests * (100 review requests + 100 reviews + 100 labels) keeps us under that.
+REPOS_PER_QUERY = 10
+PULL_REQUESTS_PER_PAGE = 100
+REVIEWS_PER_PULL_REQUEST = 100
+LABELS_PER_PULL_REQUEST = 100
+
+PULL_REQUEST_STATES = {
+    "open": ["OPEN"],
+    "closed": ["CLOSED", "MERGED"],
+    "all": None,
+}
+
+PULL_REQUEST_FRAGMENT = f"""
+fragment PullRequestFields on PullRequest {{
+  number
+  title
+  body
+  url
+  isDraft
+  state
+  updatedAt
+  author {{
+    login
+    url
+  }}
+  baseRepository {{
+    name
+    nameWithOwner
+    url
+  }}
+  labels(first: {LABELS_PER_PULL_REQUEST}) {{
+    nodes {{
+      name
+    }}
+  }}
+  reviewRequests(first: {REVIEWS_PER_PULL_REQUEST}) {{
+    nodes {{
+      requestedReviewer {{
+        __typename
+        ... on User {{
+          login
+          url
+        }}
+        ... on Team {{
+          name
+          slug
+          url
+        }}
+      }}
+    }}
+  }}
+  latestReviews(first: {REVIEWS_PER_PULL_REQUEST}) {{
+    nodes {{
+      state
+      author {{
+        login
+        url
+      }}
+    }}
+  }}
+}}
+"""
+
+# Used in place of deleted accounts, matches what the REST API returns for them
+GHOST_USER = {
+    "login": "ghost",
+    "url": "https://github.com/ghost",
+}
+
+
+def get_pull_requests(
+    requester: Requester.Requester,
+    repo_full_names: List[str],
+    state: str,
+) -> List[List[PullRequestWithReviews]]:
+    """Grab all pull requests of a batch of repos (up to `REPOS_PER_QUERY`) including their reviews.
+
+    The first page of every repo is requested in a single query, repos with more pull requests than
+    fit on a page are then followed up together until every repo is exhausted. One list of pull
+    requests is returned per repo in the order of `repo_full_names`.
+    """
+    pull_requests_by_repo: List[List[PullRequestWithReviews]] = [[] for _ in repo_full_names]
+    # Each entry is the index of the repo in `repo_full_names` along with the cursor of its next page
+    pending_pages: List[Tuple[int, Optional[str]]] = [(index, None) for index in range(len(repo_full_names))]
+
+    while pending_pages:
+        query, variables = _build_query(
+            [(repo_full_names[index], cursor) for index, cursor in pending_pages],
+            state,
+        )
+        _, data = requester.graphql_query(query, variables)
+
+        next_pending_pages = []
+        for alias_index, (repo_index, _) in enumerate(pending_pages):
+            repository = data["data"][f"repo{alias_index}"]
+            if repository is None:
+                continue
+
+            pull_requests_connection = repository["pullRequests"]
+            for pull_request_node in pull_requests_connection["nodes"]:
+                pull_requests_by_repo[repo_index].append(_to_graphql_pull_request(requester, pull_request_node))
+
+            page_info = pull_requests_connection["pageInfo"]
+            if page_info["hasNextPage"]:
+                next_pending_pages.append((repo_index, page_info["endCursor"]))
+
+        pending_pages = next_pending_pages
+
+    return pull_requests_by_repo
+
+
+def _build_query(repo_pages: List[Tuple[str, Optional[str]]], state: str) -> Tuple[str, Dict[str, Any]]:
+    """Build a query that aliases one `repository` lookup per repo page."""
+    variable_definitions = ["$states: [PullRequestState!]"]
+    selections = []
+    variables: Dict[str, Any] = {"states": PULL_REQUEST_STATES[state]}
+
+    for index, (repo_full_name, cursor) in enumerate(repo_pages):
+        owner, name = repo_full_name.split("/", 1)
+        variable_definitions.extend([f"$owner{index}: String!", f"$name{index}: String!", f"$after{index}: String"])
+        variables[f"owner{index}"] = owner
+        variables[f"name{index}"] = name
+        variables[f"after{index}"] = cursor
+        selections.append(
+            f"repo{index}: repository(owner: $owner{index}, name: $name{index}) {{"
+            f" pullRequests(states: $states, first: {PULL_REQUESTS_PER_PAGE}, after: $after{index}) {{"
+            " pageInfo { hasNextPage endCursor }"
+            " nodes { ...PullRequestFields }"
+            " } }"
+        )
+
+    query = f"query({', '.join(variable_definitions)}) {{\n" + "\n".join(selections) + "\n}\n" + PULL_REQUEST_FRAGMENT
+
+    return query, variables
+
+
+def _to_graphql_pull_request(requester: Requester.Requester, node: Dict[str, Any]) -> PullRequestWithReviews:
+    """Convert a GraphQL pull request node into the records the message builders expect."""
+    base_repository = node["baseRepository"]
+    pull_request = PullRequestRecord(
+        number=node["number"],
+        title=node["title"],
+        body=node["body"],
+        html_url=node["url"],
+        url=f"{requester.base_url}/repos/{base_repository['nameWithOwner']}/pulls/{node['number']}",
+        draft=node["isDraft"],
+        state=node["state"].lower(),
+        updated_at=parse_datetime(node["updatedAt"]),
+        user=_to_user(node["author"]),
+        repo=RepoRecord(
+            name=base_repository["name"],
+            full_name=base_repository["nameWithOwner"],
+            html_url=base_repository["url"],
+        ),
+        labels=tuple(label["name"] for label in (node.get("labels") or {}).get("nodes", [])),
+    )
+
+    reviewers: List[Reviewer] = []
+    for review_request in node["reviewRequests"]["nodes"]:
+        requested_reviewer = review_request["requestedReviewer"]
+        # Bots and mannequins can also be requested, we only report on users and teams like the REST API
+        if requested_reviewer is None:
+            continue
+        elif requested_reviewer["__typename"] == "User":
+            reviewers.append(_to_user(requested_reviewer))
+        elif requested_reviewer["__typename"] == "Team":
+            reviewers.append(
+                TeamRecord(
+                    name=requested_reviewer["name"],
+                    slug=requested_reviewer["slug"],
+                    html_url=requested_reviewer["url"],
+                )
+            )
+
+    reviews_by_category: Dict[str, List[UserRecord]] = {
+        "users_who_approved": [],
+        "users_who_requested_changes": [],
+        "users_who_were_dismissed": [],
+    }
+    for review in node["latestReviews"]["nodes"]:
+        if review["state"] == "APPROVED":
+            reviews_by_category["users_who_approved"].append(_to_user(review["author"]))
+        elif review["state"] == "CHANGES_REQUESTED":
+            reviews_by_category["users_who_requested_changes"].append(_to_user(review["author"]))
+        elif review["state"] == "DISMISSED":
+            reviews_by_category["users_who_were_dismissed"].append(_to_user(review["author"]))
+
+    return PullRequestWithReviews(pull_request, reviewers, reviews_by_category)
+
+
+def _to_user(actor: Optional[Dict[str, Any]]) -> UserRecord:
+    """Convert a GraphQL actor into a user record, deleted accounts come back as `None`."""
+    actor = actor or GHOST_USER
+
+    return UserRecord(login=actor["login"], html_url=actor["url"])
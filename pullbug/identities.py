@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+)
+
+import woodchips
+
+from pullbug.records import (
+    Reviewer,
+    TeamRecord,
+    UserRecord,
+)
+
+LOGGER_NAME = "pullbug"
+IDENTITIES_FILENAME = "identities.json"
+IDENTITIES_VERSION = 1
+# How long a user, team, or team lookup is trusted for, in seconds
+DEFAULT_IDENTITY_TTL = 7 * 24 * 60 * 60
+# Identities seen again are only re-stamped once they're this far into their TTL, so most runs change nothing
+REFRESH_FRACTION = 0.5
+
+
+class IdentityCache:
+    """The users (by login) and teams (by owner and slug) Pullbug has seen, stored under `location` between runs.
+
+    Identities are remembered from the payloads they're listed in. A team listed without its URL gets it from
+    here, or from one lookup of every team of its owner when that hasn't been done within the `ttl`, so a
+    message never needs a request per user or team. Identities that haven't been seen within the `ttl` expire.
+    """
+
+    def __init__(self, location: str, ttl: float = DEFAULT_IDENTITY_TTL):
+        self.path = os.path.join(location, IDENTITIES_FILENAME)
+        self.ttl = ttl
+        self._identities: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None
+        self._changed = False
+        # The owners whose teams are being looked up, set once their lookup is done
+        self._pending_lookups: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, owner: str, reviewers: Sequence[Reviewer]) -> Sequence[Reviewer]:
+        """Remember the reviewers of a pull request of `owner`, filling in the URLs of those listed without one."""
+        now = time.time()
+        resolved: Optional[List[Reviewer]] = None
+
+        with self._lock:
+            identities = self._load()
+            for index, reviewer in enumerate(reviewers):
+                if isinstance(reviewer, TeamRecord):
+                    section, key, attributes = "teams", f"{owner}/{reviewer.slug}".lower(), {"name": reviewer.name}
+                else:
+                    section, key, attributes = "users", reviewer.login.lower(), {"login": reviewer.login}
+
+                identity = identities[section].get(key)
+                if reviewer.html_url:
+                    if identity is None or identity["html_url"] != reviewer.html_url or self._is_stale(identity, now):
+                        identities[section][key] = {**attributes, "html_url": reviewer.html_url, "seen_at": now}
+                        self._changed = True
+                elif identity is not None and not self._is_expired(identity, now):
+                    if resolved is None:
+                        resolved = list(reviewers)
+                    resolved[index] = (
+                        TeamRecord(name=reviewer.name, slug=reviewer.slug, html_url=identity["html_url"])
+                        if isinstance(reviewer, TeamRecord)
+                        else UserRecord(login=reviewer.login, html_url=identity["html_url"])
+                    )
+
+        return reviewers if resolved is None else resolved
+
+    def needs_team_lookup(self, owner: str, reviewers: Iterable[Reviewer]) -> bool:
+        """Whether any team is still without a URL, and the teams of `owner` haven't been looked up within the `ttl`."""
+        if not any(isinstance(reviewer, TeamRecord) and not reviewer.html_url for reviewer in reviewers):
+            return False
+
+        with self._lock:
+            lookup = self._load()["lookups"].get(owner.lower())
+
+            return lookup is None or self._is_expired(lookup, time.time())
+
+    def look_up_teams(self, owner: str, list_teams: Callable[[], Iterable[TeamRecord]]):
+        """Remember every team `list_teams` returns for `owner`, at most once per `ttl` however many ask at once.
+
+        Callers asking while a lookup of the same owner is in flight wait for it rather than looking up again. The
+        lookup itself runs without the lock held, so other owners (and `resolve`) aren't held up by it. A lookup
+        that fails (eg: the owner is a user, or the token can't see its teams) isn't retried until the `ttl` has
+        passed either, teams are left without their URL meanwhile.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+        key = owner.lower()
+
+        with self._lock:
+            lookup = self._load()["lookups"].get(key)
+            if lookup is not None and not self._is_expired(lookup, time.time()):
+                return
+
+            pending_lookup = self._pending_lookups.get(key)
+            looking_up = pending_lookup is None
+            if pending_lookup is None:
+                pending_lookup = self._pending_lookups[key] = threading.Event()
+
+        if not looking_up:
+            pending_lookup.wait()
+            return
+
+        try:
+            try:
+                teams = list(list_teams())
+            except Exception as error:
+                logger.warning(f"Could not look up the teams of {owner}, their links will be left out: {error}")
+                teams = []
+
+            with self._lock:
+                identities = self._load()
+                now = time.time()
+                for team in teams:
+                    if team.html_url:
+                        identities["teams"][f"{key}/{team.slug}".lower()] = {
+                            "name": team.name,
+                            "html_url": team.html_url,
+                            "seen_at": now,
+                        }
+                identities["lookups"][key] = {"seen_at": now}
+                self._changed = True
+        finally:
+            with self._lock:
+                del self._pending_lookups[key]
+            pending_lookup.set()
+
+    def save(self):
+        """Write the identities to disk if any changed, dropping those that expired."""
+        with self._lock:
+            if not self._changed:
+                return
+
+            now = time.time()
+            identities = {
+                section: {key: identity for key, identity in entries.items() if not self._is_expired(identity, now)}
+                for section, entries in self._load().items()
+            }
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            # Write to a temporary file first so an interrupted run never leaves a corrupt cache behind
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w") as identities_file:
+                json.dump({"version": IDENTITIES_VERSION, **identities}, identities_file)
+            os.replace(temporary_path, self.path)
+
+            self._identities = identities
+            self._changed = False
+
+    def _is_expired(self, identity: Dict[str, Any], now: float) -> bool:
+        return now - identity["seen_at"] > self.ttl
+
+    def _is_stale(self, identity: Dict[str, Any], now: float) -> bool:
+        return now - identity["seen_at"] > self.ttl * REFRESH_FRACTION
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Read the identities of earlier runs. Must be called while holding the lock."""
+        if self._identities is None:
+            self._identities = {"users": {}, "teams": {}, "lookups": {}}
+            try:
+                with open(self.path, "r") as identities_file:
+                    stored_identities = json.load(identities_file)
+                if stored_identities.get("version") == IDENTITIES_VERSION:
+                    self._identities = {section: stored_identities.get(section, {}) for section in self._identities}
+            except (OSError, ValueError):
+                # No usable identities, they're remembered again as they're seen
+                pass
+
+        return self._identities
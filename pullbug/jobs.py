@@ -0,0 +1,163 @@
+import inspect
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Tuple,
+)
+
+import woodchips
+
+from pullbug.bug import Pullbug
+from pullbug.cache import ResponseCache
+from pullbug.fetches import SharedFetches
+from pullbug.identities import IdentityCache
+from pullbug.rate_limit import RateLimiter
+from pullbug.routing import build_routes
+from pullbug.state import SyncState
+from pullbug.transport import MessageTransport
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+LOGGER_NAME = "pullbug"
+DEFAULT_CONCURRENT_JOBS = 4
+JOBS_KEY = "jobs"
+JOB_NAME_KEY = "name"
+# Settings of the whole batch rather than defaults of its jobs
+BATCH_SETTINGS = ("concurrent_jobs",)
+
+
+class JobError(Exception):
+    """Raised once every job of a batch has run if any of them failed, with the error of each."""
+
+    def __init__(self, errors: Dict[str, Exception]):
+        super().__init__(f"Pullbug jobs failed: {', '.join(errors)}.")
+        self.errors = errors
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Read a TOML batch config, see `build_jobs` for its layout."""
+    with open(os.path.expanduser(path), "rb") as config_file:
+        return tomllib.load(config_file)
+
+
+def build_jobs(config: Dict[str, Any]) -> Dict[str, Pullbug]:
+    """Build a `Pullbug` for each `[[jobs]]` table of a batch config, keyed by job name.
+
+    Jobs are configured with the same settings as `Pullbug` (eg: `github_owner`, `slack_channel`), `repos` can
+    also be a list. Settings at the top of the config are the defaults of every job, a job's own settings override
+    them. A job is named by its `name`, or by its owner and position in the config otherwise. A job's `[[jobs.routes]]`
+    tables configure its routes, see `pullbug.routing.build_routes`.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    defaults = {key: value for key, value in config.items() if key != JOBS_KEY and key not in BATCH_SETTINGS}
+    parameters = inspect.signature(Pullbug).parameters
+
+    jobs: Dict[str, Pullbug] = {}
+    for index, job_config in enumerate(config.get(JOBS_KEY, []), start=1):
+        settings = {**defaults, **job_config}
+        name = str(settings.pop(JOB_NAME_KEY, f"{settings.get('github_owner', '')}-{index}"))
+
+        unknown_settings = sorted(setting for setting in settings if setting not in parameters)
+        if unknown_settings:
+            message = f"Unknown settings for the Pullbug job {name}: {', '.join(unknown_settings)}."
+            logger.critical(message)
+            raise ValueError(message)
+        if name in jobs:
+            message = f"More than one Pullbug job is named {name}, job names must be unique."
+            logger.critical(message)
+            raise ValueError(message)
+
+        if isinstance(settings.get("repos"), list):
+            settings["repos"] = ",".join(settings["repos"])
+        if "routes" in settings:
+            settings["routes"] = build_routes(settings["routes"])
+        jobs[name] = Pullbug(**settings)
+
+    if not jobs:
+        message = "No Pullbug jobs found, add a [[jobs]] table to the config."
+        logger.critical(message)
+        raise ValueError(message)
+
+    return jobs
+
+
+def run_jobs(jobs: Dict[str, Pullbug], concurrent_jobs: int = DEFAULT_CONCURRENT_JOBS):
+    """Run every job once in this process, up to `concurrent_jobs` at a time.
+
+    Jobs reading GitHub with the same token and base URL share their fetches: each repo listing, repo's pull
+    requests and issues, and pull request's review data is only requested once however many jobs bug about it.
+    They also share a `RateLimiter`, as they share GitHub's rate limit. Jobs with the same `location` share its
+    sync state, identities, and response cache, which are saved once every job has run. Jobs with the same message
+    settings (`message_pool_size`, `message_timeout`, and `message_retries`) deliver over the same
+    `MessageTransport`, so jobs sending to the same webhook or channel share its connections and rate limit.
+    A job that fails doesn't stop the others, a `JobError` is raised once every job has run.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    transports: Dict[Tuple[int, float, int], MessageTransport] = {}
+    shared_fetches: Dict[Tuple[Optional[str], str], SharedFetches] = {}
+    rate_limiters: Dict[Tuple[Optional[str], str], RateLimiter] = {}
+    sync_states: Dict[str, SyncState] = {}
+    identities: Dict[str, IdentityCache] = {}
+    response_caches: Dict[str, ResponseCache] = {}
+    for index, bug in enumerate(jobs.values()):
+        bug.transport = transports.setdefault(
+            (bug.message_pool_size, bug.message_timeout, bug.message_retries), bug.transport
+        )
+        bug.shared_fetches = shared_fetches.setdefault((bug.github_token, bug.base_url), SharedFetches())
+        bug.share_state(
+            sync_state=sync_states.setdefault(bug.location, bug.sync_state),
+            identities=identities.setdefault(bug.location, bug.identities),
+            rate_limiter=rate_limiters.setdefault((bug.github_token, bug.base_url), bug.rate_limiter),
+            response_cache=(response_caches.setdefault(bug.location, bug.response_cache) if not bug.no_cache else None),
+        )
+        if index == 0:
+            bug.setup_logger()
+        else:
+            # Every job logs through the same logger, set up once by the first job
+            bug._logger_ready = True
+
+    def run_job(name: str, bug: Pullbug) -> Optional[Exception]:
+        logger.info(f"Running Pullbug job {name}...")
+        try:
+            bug.run()
+        except Exception as error:
+            logger.error(f"Pullbug job {name} failed: {error}")
+            return error
+
+        return None
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrent_jobs) as executor:
+            results = dict(zip(jobs, executor.map(run_job, jobs, jobs.values())))
+    finally:
+        for transport in transports.values():
+            transport.close()
+
+    errors = {name: error for name, error in results.items() if error is not None}
+
+    # Shared state is saved once every job sharing it has run, repos of failed jobs are kept for their next run
+    incremental_locations = {bug.location for bug in jobs.values() if bug.incremental}
+    for location, sync_state in sync_states.items():
+        if location in incremental_locations:
+            sync_state.save(drop_unseen=not errors)
+    for identity_cache in identities.values():
+        identity_cache.save()
+    logger.info(f"Pullbug ran {len(jobs)} jobs, {len(jobs) - len(errors)} succeeded and {len(errors)} failed.")
+    if errors:
+        raise JobError(errors)
+
+
+def run_config(path: str):
+    """Run every job of a TOML batch config once, see `build_jobs` and `run_jobs`."""
+    config = load_config(path)
+
+    run_jobs(build_jobs(config), config.get("concurrent_jobs", DEFAULT_CONCURRENT_JOBS))
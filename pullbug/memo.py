@@ -0,0 +1,171 @@
+import threading
+from concurrent.futures import Future
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Tuple,
+)
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from pullbug.accounting import (
+    ApiAccounting,
+    github_endpoint,
+)
+from pullbug.adapters import WrappedAdapter
+from pullbug.cache import WIRE_HEADERS
+
+# Responses stop being memoised once a run has memoised this many bytes of them, they're still coalesced
+DEFAULT_MEMO_MAX_BYTES = 100 * 1024 * 1024
+MEMO_HIT_HEADER = "X-Pullbug-Memo"
+
+MemoKey = Tuple[str, str, str, str]
+
+
+class MemoizedResponse:
+    """What's kept of a GitHub response to answer the same request with later in the run."""
+
+    __slots__ = ("status_code", "reason", "headers", "content", "encoding", "url")
+
+    def __init__(self, response: requests.Response):
+        self.status_code = response.status_code
+        self.reason = response.reason
+        # The content is kept decoded, like the cache's
+        self.headers = {name: value for name, value in response.headers.items() if name.lower() not in WIRE_HEADERS}
+        self.content = response.content
+        self.encoding = response.encoding
+        self.url = response.url
+
+
+class RunMemo:
+    """The GitHub responses of the current run, so that no URL is requested more than once per run.
+
+    A request that's already in flight is waited on rather than sent again, and a successful response answers the
+    same request for the rest of the run. Unlike the `ResponseCache`, nothing is revalidated with GitHub: the memo is
+    only used between `start` and `finish` and emptied after, so each run (and anything between runs, eg: webhook
+    deliveries) still sees GitHub as it is.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMO_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.active = False
+        self._responses: Dict[MemoKey, Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request: requests.PreparedRequest) -> MemoKey:
+        """Build the memo key of a request, responses differ between tokens and media types like the cache's."""
+        return (
+            request.method or "",
+            request.url or "",
+            str(request.headers.get("Accept", "")),
+            str(request.headers.get("Authorization", "")),
+        )
+
+    def claim(self, key: MemoKey) -> Tuple[Future, bool]:
+        """The future response of a request, and whether the caller is the one that has to send it."""
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                return response, False
+
+            response = self._responses[key] = Future()
+
+            return response, True
+
+    def resolve(self, key: MemoKey, response: Future, memoized_response: Optional[MemoizedResponse]):
+        """Answer everyone waiting on a request, keeping the response for the rest of the run if it succeeded."""
+        with self._lock:
+            if (
+                memoized_response is not None
+                and memoized_response.status_code == 200
+                and self._bytes + len(memoized_response.content) <= self.max_bytes
+            ):
+                self._bytes += len(memoized_response.content)
+            elif self._responses.get(key) is response:
+                del self._responses[key]
+
+    def start(self):
+        """Start memoising the responses of a run."""
+        with self._lock:
+            self._responses = {}
+            self._bytes = 0
+            self.active = True
+
+    def finish(self):
+        """Forget every response of the run, requests are sent as they are until the next run starts."""
+        with self._lock:
+            self._responses = {}
+            self._bytes = 0
+            self.active = False
+
+
+class MemoizingAdapter(WrappedAdapter):
+    """Answers GitHub `GET` requests that were already made (or are being made) this run from the `RunMemo`.
+
+    Mounted furthest from the connection so a memoised response skips the rate limiter and the cache entirely.
+    Every request answered this way is recorded as a memo hit with `ApiAccounting`.
+    """
+
+    def __init__(self, adapter: requests.adapters.BaseAdapter, memo: RunMemo, accounting: ApiAccounting):
+        super().__init__(adapter)
+        self.memo = memo
+        self.accounting = accounting
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        # Leave requests that are already conditional to the caller (eg: PyGithub's `update()`)
+        if (
+            not self.memo.active
+            or request.method != "GET"
+            or "If-None-Match" in request.headers
+            or "If-Modified-Since" in request.headers
+            or kwargs.get("stream")
+        ):
+            return super().send(request, **kwargs)
+
+        key = self.memo.key(request)
+        memoized, sending = self.memo.claim(key)
+
+        if not sending:
+            memoized_response = memoized.result()
+            if memoized_response is not None:
+                self.accounting.record_memo_hit("github", "GET", github_endpoint(request.url or ""))
+                return self._build_memoized_response(request, memoized_response)
+
+            # The request this one waited on failed, it's sent again like it would have been without the memo
+            return super().send(request, **kwargs)
+
+        try:
+            response = super().send(request, **kwargs)
+        except BaseException:
+            self.memo.resolve(key, memoized, None)
+            memoized.set_result(None)
+            raise
+
+        memoized_response = MemoizedResponse(response)
+        self.memo.resolve(key, memoized, memoized_response)
+        memoized.set_result(memoized_response if response.status_code == 200 else None)
+
+        return response
+
+    def _build_memoized_response(
+        self,
+        request: requests.PreparedRequest,
+        memoized_response: MemoizedResponse,
+    ) -> requests.Response:
+        """Rebuild a memoised response, each caller gets its own."""
+        response = requests.Response()
+        response.status_code = memoized_response.status_code
+        response.reason = memoized_response.reason
+        response.headers = CaseInsensitiveDict(memoized_response.headers)
+        response.headers[MEMO_HIT_HEADER] = "HIT"
+        response.encoding = memoized_response.encoding
+        response._content = memoized_response.content
+        response.url = memoized_response.url
+        response.request = request
+        response.connection = self  # type: ignore[assignment]
+
+        return response
@@ -1,253 +1,429 @@
-import math
+import abc
+import time
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
 from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
     List,
-    Tuple,
-    Union,
+    Optional,
 )
 
 import requests
 import slack_sdk
 import woodchips
-from github import (
-    Issue,
-    NamedUser,
-    PullRequest,
-    Team,
+from slack_sdk.web import SlackResponse
+
+from pullbug.accounting import (
+    DISCORD_ENDPOINT,
+    SLACK_ENDPOINT,
+    ApiAccounting,
+)
+from pullbug.formatters import (
+    DESCRIPTION_CONTINUATION,
+    issue_item,
+    pull_request_item,
+    render,
+)
+from pullbug.records import (
+    IssueRecord,
+    PullRequestRecord,
+    Reviewer,
+    UserRecord,
+)
+from pullbug.transport import (
+    MessageTransport,
+    header_retry_after,
 )
 
 LOGGER_NAME = "pullbug"
-DESCRIPTION_CONTINUATION = "..."
-DESCRIPTION_MAX_LENGTH = 120
-TIMEOUT = 30
+# The formats the messages of the messaging platforms are rendered in, see `pullbug.formatters`
+MESSAGE_FORMATS = ("slack", "discord")
+DISCORD_MESSAGE_MAX_LENGTH = 2000
+SLACK_MESSAGE_MAX_LENGTH = 40000
+# Slack allows `chat.postMessage` about one message per second per channel, with short bursts over that
+SLACK_CHANNEL_POST_INTERVAL = 1.0
 
 
-def send_discord_message(messages: List[str], discord_url: str):
-    """Send a Discord message.
+class MessageSender(abc.ABC):
+    """Send messages to a messaging platform as they are built.
 
-    Discord has a hard limit of 2000 characters per
-    As such, we break up the messages into batches, allow for
-    breathing room, and send each batch of messages separately.
+    Messages are packed into as few posts as fit the platform's `max_length` without splitting any of them,
+    a single message longer than that is truncated before sending.
+
+    Posts are sent one at a time, in order, from a background thread so that building the next messages
+    doesn't wait on the platform. Once a post fails no more are sent, its error is raised by the next `add`
+    or by `close`.
     """
-    logger = woodchips.get(LOGGER_NAME)
-
-    num_of_messages = len(messages)
-    # The message size of ~300 characters means we can send 6 messages per request plus some buffer room
-    max_messages_per_batch = 6
-    i = 1
-    new_cutoff = max_messages_per_batch
-    old_cutoff = 0
-
-    while i <= math.ceil(num_of_messages / max_messages_per_batch):
-        i += 1
-        batch_message = "".join(messages[old_cutoff:new_cutoff])
-        new_cutoff += max_messages_per_batch
-        old_cutoff += max_messages_per_batch
-        try:
-            requests.post(
-                discord_url,
-                json={"content": batch_message},
-                timeout=TIMEOUT,
+
+    platform = ""
+    max_length = 0
+
+    def __init__(
+        self,
+        accounting: Optional[ApiAccounting] = None,
+        transport: Optional[MessageTransport] = None,
+    ):
+        self.accounting = accounting
+        self.transport = transport or MessageTransport()
+        self._batch: List[str] = []
+        self._batch_length = 0
+        # A single worker keeps the posts in order
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._posts: List[Future] = []
+        self._error: Optional[Exception] = None
+        self.posts_sent = 0
+
+    def start_digest(self):
+        """Start a new digest, the messages queued so far are posted and the next ones start a new post."""
+        self.flush()
+
+    def add(self, message: str):
+        """Queue a message, sending the queued messages first if it wouldn't fit alongside them."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        self._raise_error()
+
+        if len(message) > self.max_length:
+            logger.warning(
+                f"Truncating a {self.platform} message of {len(message)} characters to fit {self.platform}'s limit."
             )
-            logger.info("Discord message sent!")
-        except requests.exceptions.RequestException as discord_error:
-            logger.error(f"Could not send Discord message: {discord_error}")
-            raise requests.exceptions.RequestException(discord_error)
+            message = message[: self.max_length - len(DESCRIPTION_CONTINUATION)] + DESCRIPTION_CONTINUATION
 
+        if self._batch and self._batch_length + len(message) > self.max_length:
+            self.flush()
 
-def send_slack_message(messages: List[str], slack_token: str, slack_channel: str):
-    """Send Slack messages via a bot.
+        self._batch.append(message)
+        self._batch_length += len(message)
 
-    Slack truncates messages after 40,000 characters so
-    we truncate there before sending the request.
-    """
-    logger = woodchips.get(LOGGER_NAME)
+    def flush(self):
+        """Queue the packed messages to be posted, if any."""
+        if not self._batch:
+            return
 
-    message_max_length = 40000
-    slack_message = "".join(messages)[:message_max_length]
-    slack_client = slack_sdk.WebClient(slack_token)
+        batch_message = "".join(self._batch)
+        self._batch = []
+        self._batch_length = 0
 
-    try:
-        slack_client.chat_postMessage(
-            channel=slack_channel,
-            text=slack_message,
-        )
-        logger.info("Slack message sent!")
-    except slack_sdk.errors.SlackApiError as slack_error:
-        logger.error(f"Could not send Slack message: {slack_error}")
-        raise slack_sdk.errors.SlackApiError(slack_error.response["ok"], slack_error.response["error"])
+        self._submit(self._send, batch_message)
 
+    def close(self):
+        """Send whatever is left once there are no more messages, waiting for every post to be sent."""
+        self.flush()
 
-def prepare_pulls_message(
-    pull_request: PullRequest.PullRequest,
-    reviewers: List[Union[NamedUser.NamedUser, Team.Team]],
-    users_who_approved: List[NamedUser.NamedUser],
-    users_who_requested_changes: List[NamedUser.NamedUser],
-    users_who_were_dismissed: List[NamedUser.NamedUser],
-    disable_descriptions: bool = False,
-) -> Tuple[str, str]:
-    """Prepares a GitHub pull request message with a single pull request's data.
-    This will then be appended to an array of messages.
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._posts = []
+
+        self._raise_error()
+
+    def _submit(self, function: Callable[..., None], *args: Any):
+        """Run a function on the worker thread once everything queued before it has run."""
+        if self.accounting:
+            # The post is made from the worker thread, it still belongs to the phase of the run that queued it
+            function = self.accounting.in_phase(self.accounting.current_phase, function)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._posts.append(self._executor.submit(function, *args))
+
+    def _send(self, batch_message: str):
+        if self._error:
+            return
+
+        try:
+            self._post(batch_message)
+            self.posts_sent += 1
+        except Exception as error:
+            self._error = error
+
+    @abc.abstractmethod
+    def _post(self, batch_message: str):
+        """Post packed messages to the platform, raising the error to stop sending on if it fails."""
 
-    Slack and Discord each have slightly different formatting required, both messages are returned here.
+    def _raise_error(self):
+        """Raise the error of a failed post, if any."""
+        if self._error:
+            raise self._error
+
+
+class DiscordSender(MessageSender):
+    """Send Discord messages as they are built, see `MessageSender`.
+
+    Discord refuses messages longer than 2000 characters. The rate limit bucket Discord reports for the webhook
+    is waited on rather than run into, and a rate limited post is retried after Discord's `retry_after`.
     """
-    pull_request_body = pull_request.body if pull_request.body else ""
-    description_message_element = ""
-
-    if disable_descriptions is False:
-        description = (
-            pull_request_body[:DESCRIPTION_MAX_LENGTH] + DESCRIPTION_CONTINUATION
-            if len(pull_request_body) > DESCRIPTION_MAX_LENGTH
-            else pull_request_body
-        )
-        description_message_element = f"\n*Description:* {description}"
-
-    slack_reviewers_string = ""
-    discord_reviewers_string = ""
-
-    if users_who_approved:
-        slack_users_who_approved = []
-        discord_users_who_approved = []
-
-        for user in users_who_approved:
-            slack_users_who_approved.append(_create_slack_user_link(user))
-            discord_users_who_approved.append(_create_discord_user_link(user))
-
-        if slack_users_who_approved:
-            slack_reviewers_string += f"  :white_check_mark: {', '.join(set(slack_users_who_approved))};"
-            discord_reviewers_string += f"  :white_check_mark: {', '.join(set(discord_users_who_approved))};"
-
-    if users_who_requested_changes:
-        slack_users_who_requested_changes = []
-        discord_users_who_requested_changes = []
-
-        for user in users_who_requested_changes:
-            if user not in users_who_approved:
-                slack_users_who_requested_changes.append(_create_slack_user_link(user))
-                discord_users_who_requested_changes.append(_create_discord_user_link(user))
-
-        if slack_users_who_requested_changes:
-            slack_reviewers_string += f"  :no_entry: {', '.join(set(slack_users_who_requested_changes))};"
-            discord_reviewers_string += f"  :no_entry: {', '.join(set(discord_users_who_requested_changes))};"
-
-    if users_who_were_dismissed:
-        slack_users_who_were_dismissed = []
-        discord_users_who_were_dismissed = []
-
-        for user in users_who_were_dismissed:
-            if user not in users_who_approved:
-                slack_users_who_were_dismissed.append(_create_slack_user_link(user))
-                discord_users_who_were_dismissed.append(_create_discord_user_link(user))
-
-        if slack_users_who_were_dismissed:
-            slack_reviewers_string += f"  :eyes: {', '.join(set(slack_users_who_were_dismissed))};"
-            discord_reviewers_string += f"  :eyes: {', '.join(set(discord_users_who_were_dismissed))};"
-
-    if reviewers:
-        slack_reviewers = []
-        discord_reviewers = []
-
-        for reviewer in reviewers:
-            if isinstance(reviewer, NamedUser.NamedUser):
-                slack_reviewers.append(_create_slack_user_link(reviewer))
-                discord_reviewers.append(_create_discord_user_link(reviewer))
-            elif isinstance(reviewer, Team.Team):
-                slack_reviewers.append(_create_slack_team_link(reviewer))
-                discord_reviewers.append(_create_discord_team_link(reviewer))
-
-        if slack_reviewers:
-            slack_reviewers_string += f"  :timer_clock: {', '.join(set(slack_reviewers))};"
-            discord_reviewers_string += f"  :timer: {', '.join(set(discord_reviewers))};"
-
-    slack_message = (
-        f"\n:arrow_heading_up: *Pull Request:* {_create_slack_object_link(pull_request)}"
-        f"\n*Repo:* <{pull_request.base.repo.html_url}|{pull_request.base.repo.name}>"
-        f"\n*Author:* <{pull_request.user.html_url}|{pull_request.user.login}>"
-        f"{description_message_element}"
-        f"\n*Reviewers:*{slack_reviewers_string if slack_reviewers_string else ' NA'}\n"
-    )
 
-    discord_message = (
-        f"\n:arrow_heading_up: **Pull Request:** {_create_discord_object_link(pull_request)}"
-        f"\n**Repo:** [{pull_request.base.repo.name}]({pull_request.base.repo.html_url})"
-        f"\n**Author:** [{pull_request.user.login}]({pull_request.user.html_url})"
-        f"{description_message_element}"
-        f"\n*Reviewers:*{discord_reviewers_string if discord_reviewers_string else ' NA'}\n"
-    )
+    platform = "Discord"
+    max_length = DISCORD_MESSAGE_MAX_LENGTH
 
-    return slack_message, discord_message
+    def __init__(
+        self,
+        discord_url: str,
+        accounting: Optional[ApiAccounting] = None,
+        transport: Optional[MessageTransport] = None,
+    ):
+        super().__init__(accounting, transport)
+        self.discord_url = discord_url
 
+    def _post(self, batch_message: str):
+        logger = woodchips.get(LOGGER_NAME)
 
-def prepare_issues_message(issue: Issue.Issue, disable_descriptions: bool = False) -> Tuple[str, str]:
-    """Prepares a GitHub issue message with a single issue's data.
-    This will then be appended to an array of messages.
+        started_at = time.monotonic()
+        try:
+            response = self.transport.post(
+                self.discord_url,
+                bucket=self.transport.bucket(self.discord_url),
+                retry_after=_discord_retry_after,
+                json={"content": batch_message},
+            )
+            if self.accounting:
+                self.accounting.record(
+                    "discord",
+                    "POST",
+                    DISCORD_ENDPOINT,
+                    response.status_code,
+                    time.monotonic() - started_at,
+                    bytes_sent=len(batch_message.encode()),
+                    bytes_received=len(response.content or b""),
+                )
+            response.raise_for_status()
+            logger.info("Discord message sent!")
+        except requests.exceptions.RequestException as discord_error:
+            if self.accounting and discord_error.response is None:
+                self.accounting.record("discord", "POST", DISCORD_ENDPOINT, None, time.monotonic() - started_at)
+            logger.error(f"Could not send Discord message: {discord_error}")
+            raise requests.exceptions.RequestException(discord_error)
 
-    Slack and Discord each have slightly different formatting required, both messages are returned here.
+
+def _discord_retry_after(response: requests.Response) -> float:
+    """How long Discord asks to wait before retrying a rate limited post, in seconds."""
+    try:
+        return float(response.json()["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return header_retry_after(response)
+
+
+class SlackSender(MessageSender):
+    """Send Slack messages via a bot as they are built, see `MessageSender`.
+
+    Slack truncates messages after 40,000 characters. The first post goes to the channel as the headline and
+    every post after it is a reply in its thread, so a digest too long for one message stays together without
+    flooding the channel. Posts are paced to Slack's rate for `chat.postMessage` in the channel, and a rate
+    limited post is retried after Slack's `Retry-After`.
+
+    Messages are posted over the connections of the `transport` rather than a `slack_sdk.WebClient`,
+    which opens a new connection for every message.
     """
-    issue_body = issue.body if issue.body else ""
-    description_message_element = ""
-
-    if disable_descriptions is False:
-        description = (
-            issue_body[:DESCRIPTION_MAX_LENGTH] + DESCRIPTION_CONTINUATION
-            if len(issue_body) > DESCRIPTION_MAX_LENGTH
-            else issue_body
+
+    platform = "Slack"
+    max_length = SLACK_MESSAGE_MAX_LENGTH
+
+    def __init__(
+        self,
+        slack_token: str,
+        slack_channel: str,
+        accounting: Optional[ApiAccounting] = None,
+        transport: Optional[MessageTransport] = None,
+    ):
+        super().__init__(accounting, transport)
+        self.slack_token = slack_token
+        self.slack_channel = slack_channel
+        # The timestamp of the headline post, which identifies the thread the rest are posted to
+        self.thread_ts: Optional[str] = None
+
+    def start_digest(self):
+        """Start a new digest, which gets its own headline post and thread."""
+        super().start_digest()
+        self._submit(self._start_thread)
+
+    def _start_thread(self):
+        self.thread_ts = None
+
+    def _post(self, batch_message: str):
+        logger = woodchips.get(LOGGER_NAME)
+
+        payload = {"channel": self.slack_channel, "text": batch_message}
+        if self.thread_ts:
+            payload["thread_ts"] = self.thread_ts
+
+        started_at = time.monotonic()
+        try:
+            response = self._post_message(payload)
+            if self.accounting:
+                self.accounting.record(
+                    "slack",
+                    "POST",
+                    SLACK_ENDPOINT,
+                    response.status_code,
+                    time.monotonic() - started_at,
+                    bytes_sent=len(batch_message.encode()),
+                    bytes_received=len(response.content or b""),
+                )
+            if self.thread_ts is None:
+                self.thread_ts = response.json().get("ts")
+            logger.info("Slack message sent!")
+        except slack_sdk.errors.SlackApiError as slack_error:
+            if self.accounting:
+                self.accounting.record(
+                    "slack", "POST", SLACK_ENDPOINT, slack_error.response.status_code, time.monotonic() - started_at
+                )
+            logger.error(f"Could not send Slack message: {slack_error}")
+            raise slack_sdk.errors.SlackApiError(slack_error.response["ok"], slack_error.response["error"])
+
+    def _post_message(self, payload: Dict[str, str]) -> requests.Response:
+        """Post a message to the channel, raising a `SlackApiError` like `slack_sdk` if Slack refuses it."""
+        response = self.transport.post_slack(
+            SLACK_ENDPOINT,
+            self.slack_token,
+            payload,
+            bucket=self.transport.bucket(f"slack:{self.slack_channel}", SLACK_CHANNEL_POST_INTERVAL),
         )
-        description_message_element = f"\n*Description:* {description}"
-
-    if issue.assignees:
-        slack_users = []
-        discord_users = []
-        for assignee in issue.assignees:
-            slack_users.append(_create_slack_user_link(assignee))
-            discord_users.append(_create_discord_user_link(assignee))
-    else:
-        slack_users = ["NA"]
-        discord_users = ["NA"]
-
-    slack_message = (
-        f"\n:exclamation: *Issue:* {_create_slack_object_link(issue)}"
-        f"\n*Repo:* <{issue.repository.html_url}|{issue.repository.name}>"
-        f"{description_message_element}"
-        f"\n*Assigned to:* {', '.join(slack_users)}\n"
-    )
+        try:
+            data = response.json()
+        except ValueError:
+            # Eg: an error page from a proxy in front of Slack
+            data = {"ok": False, "error": f"HTTP {response.status_code}"}
+
+        SlackResponse(
+            client=None,
+            http_verb="POST",
+            api_url=f"{self.transport.slack_api_url}{SLACK_ENDPOINT}",
+            req_args={},
+            data=data,
+            headers=dict(response.headers),
+            status_code=response.status_code,
+        ).validate()
+
+        return response
+
+
+class MessageDelivery:
+    """Deliver digests to every enabled destination at once, each sender keyed by its destination (eg: `slack`).
+
+    Every sender posts from its own thread, so a slow or rate limited destination doesn't hold up the others.
+    A destination that fails is left out of the rest of the delivery rather than stopping the others, its error
+    is kept and returned by `close`.
+    """
 
-    discord_message = (
-        f"\n:exclamation: **Issue:** {_create_discord_object_link(issue)}"
-        f"\n**Repo:** [{issue.repository.name}]({issue.repository.html_url})"
-        f"{description_message_element}"
-        f"\n**Assigned to:** {', '.join(discord_users)}\n"
-    )
+    def __init__(self, senders: Dict[str, MessageSender]):
+        self.senders = senders
+        self.errors: Dict[str, Exception] = {}
+
+    def start_digest(self):
+        """Start a new digest on every destination, see `MessageSender.start_digest`."""
+        for destination in self.senders:
+            self._call(destination, lambda sender: sender.start_digest())
+
+    def add(self, destination: str, message: str):
+        """Queue a message for a destination, if it's enabled and hasn't failed."""
+        self._call(destination, lambda sender: sender.add(message))
 
-    return slack_message, discord_message
+    def flush(self):
+        """Queue the packed messages of every destination to be posted."""
+        for destination in self.senders:
+            self._call(destination, lambda sender: sender.flush())
 
+    def close(self) -> Dict[str, Exception]:
+        """Wait for every destination to be sent what's left, returning the error of each destination that failed."""
+        for destination, sender in self.senders.items():
+            try:
+                sender.close()
+            except Exception as error:
+                self.errors.setdefault(destination, error)
 
-def _create_slack_user_link(user: NamedUser.NamedUser) -> str:
-    """Creates a Slack user name/url combo to be used in messages."""
-    return f"<{user.html_url}|{user.login}>"
+        return self.errors
 
+    def _call(self, destination: str, action: Callable[[MessageSender], None]):
+        sender = self.senders.get(destination)
+        if sender is None or destination in self.errors:
+            return
 
-def _create_discord_user_link(user: NamedUser.NamedUser) -> str:
-    """Creates a Discord user name/url combo to be used in messages."""
-    return f"[{user.login}]({user.html_url})"
+        try:
+            action(sender)
+        except Exception as error:
+            self.errors[destination] = error
+
+
+class DeliveryError(Exception):
+    """Raised once a delivery has finished if any of its destinations failed, with the error of each."""
+
+    def __init__(self, errors: Dict[str, Exception]):
+        super().__init__(f"Could not deliver messages to {', '.join(errors)}.")
+        self.errors = errors
+
+
+def send_discord_message(
+    messages: List[str],
+    discord_url: str,
+    accounting: Optional[ApiAccounting] = None,
+    transport: Optional[MessageTransport] = None,
+):
+    """Send a Discord message, batched to fit Discord's message limit (see `DiscordSender`)."""
+    discord_sender = DiscordSender(discord_url, accounting, transport)
+
+    for message in messages:
+        discord_sender.add(message)
+    discord_sender.close()
+
+
+def send_slack_message(
+    messages: List[str],
+    slack_token: str,
+    slack_channel: str,
+    accounting: Optional[ApiAccounting] = None,
+    transport: Optional[MessageTransport] = None,
+):
+    """Send Slack messages via a bot, batched to fit Slack's message limit and threaded under the first post (see
+    `SlackSender`).
+    """
+    slack_sender = SlackSender(slack_token, slack_channel, accounting, transport)
 
+    for message in messages:
+        slack_sender.add(message)
+    slack_sender.close()
 
-def _create_slack_object_link(object: Union[PullRequest.PullRequest, Issue.Issue]) -> str:
-    """Creates a Slack object name/url combo to be used in messages."""
-    return f"<{object.html_url}|{object.title}>"
 
+def prepare_pulls_message(
+    pull_request: PullRequestRecord,
+    reviewers: List[Reviewer],
+    users_who_approved: List[UserRecord],
+    users_who_requested_changes: List[UserRecord],
+    users_who_were_dismissed: List[UserRecord],
+    disable_descriptions: bool = False,
+    formats: Iterable[str] = MESSAGE_FORMATS,
+) -> Dict[str, str]:
+    """Prepares a GitHub pull request message with a single pull request's data.
+    This will then be appended to an array of messages.
 
-def _create_discord_object_link(object: Union[PullRequest.PullRequest, Issue.Issue]) -> str:
-    """Creates a Discord object name/url combo to be used in messages."""
-    return f"[{object.title}]({object.html_url})"
+    Each of the `formats` (by default Slack's and Discord's) has its own formatting, the message of each is returned
+    here by format name. Formats that aren't asked for aren't rendered.
+    """
+    item = pull_request_item(
+        pull_request,
+        reviewers,
+        users_who_approved,
+        users_who_requested_changes,
+        users_who_were_dismissed,
+        disable_descriptions,
+    )
 
+    return render(item, formats)
 
-def _create_slack_team_link(team: Team.Team) -> str:
-    """Creates a Slack team name/url combo to be used in messages."""
-    # TODO: The URL is not populating currently from PyGithub
-    return team.name
 
+def prepare_issues_message(
+    issue: IssueRecord,
+    disable_descriptions: bool = False,
+    formats: Iterable[str] = MESSAGE_FORMATS,
+) -> Dict[str, str]:
+    """Prepares a GitHub issue message with a single issue's data.
+    This will then be appended to an array of messages.
 
-def _create_discord_team_link(team: Team.Team) -> str:
-    """Creates a Discord team name/url combo to be used in messages."""
-    # TODO: The URL is not populating currently from PyGithub
-    return team.name
+    Each of the `formats` (by default Slack's and Discord's) has its own formatting, the message of each is returned
+    here by format name. Formats that aren't asked for aren't rendered.
+    """
+    return render(issue_item(issue, disable_descriptions), formats)
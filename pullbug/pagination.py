@@ -0,0 +1,77 @@
+import collections
+import functools
+from concurrent.futures import Future
+from typing import (
+    Callable,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+from urllib.parse import (
+    parse_qs,
+    urlsplit,
+)
+
+from github import PaginatedList
+
+# The most items GitHub returns in a single page of a list
+PAGE_SIZE = 100
+
+T = TypeVar("T")
+
+SubmitPage = Callable[[Callable[[], List[T]]], "Future[List[T]]"]
+
+
+def iterate_pages(items: Iterable[T], submit: SubmitPage) -> Iterator[T]:
+    """Iterate over a list from GitHub, requesting the rest of its pages concurrently once the first is in.
+
+    PyGithub only requests the next page of a list once every item of the page before it has been iterated over.
+    The first page's `Link` header says which page is the last, so every page after it is submitted to be
+    requested at once (via `submit`, eg: to a thread pool) and yielded in order as they arrive. A list that doesn't
+    say which page is its last has its next page requested while the current one is iterated over instead.
+    Anything that isn't a `PaginatedList` (eg: items already in memory) is iterated over as it is.
+
+    Every page is requested however few items the caller iterates over, lists that are only partially walked
+    (eg: those stopped at the first unchanged item) should be iterated over as they are.
+    """
+    if not isinstance(items, PaginatedList.PaginatedList) or not items.is_rest:
+        yield from items
+        return
+
+    # Lists are walked from their first page, iterating the list itself first yields the pages already requested
+    first_page = items._grow() if items._couldGrow() else []
+    yield from first_page
+
+    last_page = _last_page(items)
+    if last_page is not None:
+        pages: Deque[Future[List[T]]] = collections.deque(
+            submit(functools.partial(items.get_page, page)) for page in range(1, last_page + 1)
+        )
+        try:
+            while pages:
+                yield from pages.popleft().result()
+        finally:
+            # Something failed or the caller stopped early, don't request any more pages
+            for pending_page in pages:
+                pending_page.cancel()
+        return
+
+    next_page = submit(items._grow) if items._couldGrow() else None
+    while next_page is not None:
+        page = next_page.result()
+        next_page = submit(items._grow) if items._couldGrow() else None
+        yield from page
+
+
+def _last_page(items: PaginatedList.PaginatedList) -> Optional[int]:
+    """The index of the last page of a list, as linked from the page requested last (`None` if it isn't linked)."""
+    if not items._couldGrow():
+        return None
+
+    last_url = getattr(items, "_PaginatedList__lastUrl", None)
+    page = parse_qs(urlsplit(last_url).query).get("page") if last_url else None
+
+    return int(page[0]) - 1 if page else None
@@ -0,0 +1,218 @@
+import random
+import threading
+import time
+from typing import (
+    Any,
+    Optional,
+)
+
+import requests
+import woodchips
+
+from pullbug.adapters import WrappedAdapter
+
+LOGGER_NAME = "pullbug"
+DEFAULT_MAX_RETRIES = 5
+# Once less than this share of the allowed calls is left, requests are spread out until the rate limit resets
+PACING_THRESHOLD = 0.1
+# GitHub asks for at least a minute between retries of secondary rate limits that don't send `Retry-After`
+SECONDARY_RATE_LIMIT_WAIT = 60
+# How long GitHub's primary rate limit window lasts, in seconds
+RATE_LIMIT_WINDOW = 60 * 60
+RATE_LIMIT_STATUS_CODES = {403, 429}
+
+
+class CallBudget:
+    """Caps how many GitHub calls a single run may make before GitHub's rate limit resets, leaving the rest of the
+    quota to anything else sharing the token.
+
+    Once the run has made every call of its budget, its requests wait for the rate limit to reset and the run then
+    carries on with its whole budget again, rather than stopping partway. Calls that come back `304 Not Modified`
+    don't count, just like GitHub doesn't count them against the rate limit.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.calls = 0
+        # When the budget is given back in full, set once it has been used up
+        self._refill_time: Optional[float] = None
+        self._condition = threading.Condition()
+
+    def start_run(self):
+        """Give a new run the whole budget."""
+        with self._condition:
+            self.calls = 0
+            self._refill_time = None
+            self._condition.notify_all()
+
+    def calls_left(self) -> int:
+        """The number of calls the run can still make before waiting for the rate limit to reset."""
+        return max(self.budget - self.calls, 0)
+
+    def spend(self, reset_time: Optional[float]):
+        """Count a call, first waiting for the rate limit to reset (at `reset_time`) if the budget has been used up."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        with self._condition:
+            while True:
+                now = time.time()
+                if self._refill_time is not None and now >= self._refill_time:
+                    self.calls = 0
+                    self._refill_time = None
+                if self.calls < self.budget:
+                    self.calls += 1
+                    return
+
+                if self._refill_time is None:
+                    # GitHub always reports the reset, it's only unknown if no request has been answered yet
+                    self._refill_time = max(reset_time or now + RATE_LIMIT_WINDOW, now) + 1
+                    logger.warning(
+                        f"Pullbug used up its budget of {self.budget} GitHub calls, waiting"
+                        f" {self._refill_time - now:.0f}s for the rate limit to reset..."
+                    )
+                self._condition.wait(self._refill_time - now)
+
+    def refund(self):
+        """Give back a call that didn't count against the rate limit."""
+        with self._condition:
+            self.calls = max(self.calls - 1, 0)
+            self._condition.notify()
+
+
+class RateLimiter:
+    """Tracks GitHub's rate limit from response headers and paces requests to stay within it.
+
+    Once the remaining calls run low, requests are spread evenly over the time left in the window rather than
+    failing once the quota runs out. Everything using the same token can share a single `RateLimiter`, how many
+    calls a run may make is up to its `CallBudget`.
+    """
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES):
+        self.max_retries = max_retries
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_time: Optional[float] = None
+        # Calls made across every run
+        self.total_calls = 0
+        self._next_request_time = 0.0
+        self._lock = threading.Lock()
+
+    def calls_allowed(self) -> Optional[int]:
+        """The number of calls that can still be made this window, `None` until GitHub tells us the limit."""
+        return max(self.remaining, 0) if self.remaining is not None else None
+
+    def wait(self):
+        """Block until the next request may be sent.
+
+        Each request reserves the next free slot, so concurrent workers are paced together.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        with self._lock:
+            now = time.time()
+            self._start_new_window(now)
+            calls_allowed = self.calls_allowed()
+            seconds_until_reset = max((self.reset_time or now) - now, 0) + 1
+
+            if calls_allowed is None:
+                interval = 0.0
+            elif calls_allowed <= 0:
+                logger.warning(f"GitHub rate limit used up, waiting {seconds_until_reset:.0f}s for it to reset...")
+                self._next_request_time = max(self._next_request_time, now + seconds_until_reset)
+                interval = 0.0
+            elif calls_allowed < (self.limit or 0) * PACING_THRESHOLD:
+                interval = seconds_until_reset / calls_allowed
+            else:
+                interval = 0.0
+
+            request_time = max(now, self._next_request_time)
+            self._next_request_time = request_time + interval
+            # Optimistically count this call so concurrent workers don't all spend the last of the quota
+            self.total_calls += 1
+            if self.remaining is not None:
+                self.remaining -= 1
+
+        delay = request_time - time.time()
+        if delay > 0:
+            logger.debug(f"Pacing GitHub requests, sleeping {delay:.2f}s...")
+            time.sleep(delay)
+
+    def update(self, response: requests.Response):
+        """Record the rate limit GitHub reported on a response."""
+        with self._lock:
+            if response.status_code == 304 and self.remaining is not None:
+                # Conditional requests that come back unchanged don't count against the rate limit
+                self.remaining += 1
+            if "X-RateLimit-Limit" in response.headers:
+                self.limit = int(float(response.headers["X-RateLimit-Limit"]))
+            if "X-RateLimit-Remaining" in response.headers:
+                self.remaining = int(float(response.headers["X-RateLimit-Remaining"]))
+            if "X-RateLimit-Reset" in response.headers:
+                self.reset_time = float(response.headers["X-RateLimit-Reset"])
+
+    def retry_delay(self, response: requests.Response, attempt: int) -> Optional[float]:
+        """The number of seconds to wait before retrying a rate limited response, `None` if it wasn't rate limited.
+
+        Waits are jittered so that concurrent workers don't all retry at the same moment.
+        """
+        if response.status_code not in RATE_LIMIT_STATUS_CODES:
+            return None
+
+        if "Retry-After" in response.headers:
+            retry_after = float(response.headers["Retry-After"])
+            return retry_after + random.uniform(0, max(retry_after * 0.1, 1))  # nosec B311 jitter, not crypto
+        elif response.headers.get("X-RateLimit-Remaining") == "0" and self.reset_time:
+            return max(self.reset_time - time.time(), 0) + random.uniform(1, 5)  # nosec B311 jitter, not crypto
+        elif "rate limit" in response.text.lower():
+            # Secondary rate limits without `Retry-After` get an exponential backoff
+            backoff = SECONDARY_RATE_LIMIT_WAIT * 2**attempt
+            return backoff + random.uniform(0, SECONDARY_RATE_LIMIT_WAIT)  # nosec B311 jitter, not crypto
+
+        # A regular permissions error
+        return None
+
+    def _start_new_window(self, now: float):
+        """Reset the calls of the window once GitHub's rate limit has reset. Must be called while holding the lock."""
+        if self.reset_time is not None and now >= self.reset_time:
+            self.remaining = self.limit
+            self.reset_time = None
+
+
+class RateLimitAdapter(WrappedAdapter):
+    """Paces every GitHub request with a `RateLimiter` and retries requests that hit a rate limit.
+
+    With a `budget`, every request (retries included) is counted against the budget of the run first, waiting for
+    the rate limit to reset once the budget has been used up.
+    """
+
+    def __init__(
+        self,
+        adapter: requests.adapters.BaseAdapter,
+        rate_limiter: RateLimiter,
+        budget: Optional[CallBudget] = None,
+    ):
+        super().__init__(adapter)
+        self.rate_limiter = rate_limiter
+        self.budget = budget
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        logger = woodchips.get(LOGGER_NAME)
+
+        attempt = 0
+        while True:
+            if self.budget is not None:
+                self.budget.spend(self.rate_limiter.reset_time)
+            self.rate_limiter.wait()
+            response = super().send(request, **kwargs)
+            self.rate_limiter.update(response)
+            if self.budget is not None and response.status_code == 304:
+                self.budget.refund()
+
+            delay = self.rate_limiter.retry_delay(response, attempt)
+            if delay is None or attempt >= self.rate_limiter.max_retries:
+                return response
+
+            attempt += 1
+            logger.warning(f"GitHub rate limit hit, retrying {request.url} in {delay:.0f}s...")
+            response.close()
+            time.sleep(delay)
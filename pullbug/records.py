@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import (
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from github import (
+    Issue,
+    NamedUser,
+    PullRequest,
+    Team,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    """A GitHub user, eg: the author or a reviewer of a pull request."""
+
+    login: str
+    html_url: str
+
+
+@dataclass(frozen=True, slots=True)
+class TeamRecord:
+    """A GitHub team whose review has been requested."""
+
+    name: str
+    slug: str
+    html_url: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class RepoRecord:
+    """The repo a pull request or issue belongs to."""
+
+    name: str
+    full_name: str
+    html_url: str
+
+
+@dataclass(frozen=True, slots=True)
+class PullRequestRecord:
+    """The fields of a pull request that Pullbug needs to bug about it."""
+
+    number: int
+    title: str
+    body: Optional[str]
+    html_url: str
+    url: str
+    draft: bool
+    state: str
+    updated_at: Optional[datetime]
+    user: UserRecord
+    repo: RepoRecord
+    labels: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class IssueRecord:
+    """The fields of an issue that Pullbug needs to bug about it."""
+
+    number: int
+    title: str
+    body: Optional[str]
+    html_url: str
+    url: str
+    state: str
+    updated_at: Optional[datetime]
+    assignees: Tuple[UserRecord, ...]
+    repo: RepoRecord
+    user: Optional[UserRecord] = None
+    labels: Tuple[str, ...] = ()
+
+
+Reviewer = Union[UserRecord, TeamRecord]
+
+
+class PullRequestWithReviews(NamedTuple):
+    """A pull request along with its review requests and reviews, which the REST API needs separate requests for."""
+
+    pull_request: PullRequestRecord
+    reviewers: List[Reviewer]
+    reviews_by_category: Dict[str, List[UserRecord]]
+
+
+def from_pull_request(pull_request: PullRequest.PullRequest) -> PullRequestRecord:
+    """Copy the fields of a listed pull request into a record.
+
+    Only fields that are part of GitHub's list responses are read, so this never triggers a request.
+    """
+    return PullRequestRecord(
+        number=pull_request.number,
+        title=pull_request.title,
+        body=pull_request.body,
+        html_url=pull_request.html_url,
+        url=pull_request.url,
+        draft=bool(pull_request.draft),
+        state=pull_request.state,
+        updated_at=pull_request.updated_at,
+        user=from_user(pull_request.user),
+        repo=RepoRecord(
+            name=pull_request.base.repo.name,
+            full_name=pull_request.base.repo.full_name,
+            html_url=pull_request.base.repo.html_url,
+        ),
+        labels=tuple(label.name for label in pull_request.labels or ()),
+    )
+
+
+def from_issue(issue: Issue.Issue) -> IssueRecord:
+    """Copy the fields of a listed issue into a record.
+
+    Listed issues don't include their repository, loading it costs a request per issue. Its fields are
+    worked out from the issue's URLs instead.
+    """
+    full_name = issue.url.split("/repos/", 1)[1].rsplit("/issues/", 1)[0]
+
+    return IssueRecord(
+        number=issue.number,
+        title=issue.title,
+        body=issue.body,
+        html_url=issue.html_url,
+        url=issue.url,
+        state=issue.state,
+        updated_at=issue.updated_at,
+        assignees=tuple(from_user(assignee) for assignee in issue.assignees),
+        repo=RepoRecord(
+            name=full_name.split("/", 1)[1],
+            full_name=full_name,
+            html_url=issue.html_url.rsplit("/issues/", 1)[0],
+        ),
+        user=from_user(issue.user) if issue.user else None,
+        labels=tuple(label.name for label in issue.labels or ()),
+    )
+
+
+def from_user(user: NamedUser.NamedUser) -> UserRecord:
+    return UserRecord(login=user.login, html_url=user.html_url)
+
+
+def from_reviewer(reviewer: Union[NamedUser.NamedUser, Team.Team]) -> Reviewer:
+    if isinstance(reviewer, Team.Team):
+        return from_team(reviewer)
+
+    return from_user(reviewer)
+
+
+def from_team(team: Team.Team) -> TeamRecord:
+    # Reading `html_url` of a team listed without it loads the whole team, a request per team. It's read from the
+    # payload instead, `pullbug.identities.IdentityCache` fills it in when it's missing
+    return TeamRecord(name=team.name, slug=team.slug, html_url=team._rawData.get("html_url"))
+
+
+def is_pull_request(issue: Issue.Issue) -> bool:
+    """Whether a listed issue is actually a pull request.
+
+    GitHub's v3 API treats pull requests as issues. Checking `issue.pull_request` costs a request for every
+    issue that isn't one, the `pull_request` key GitHub lists pull requests with tells them apart for free.
+    """
+    return "pull_request" in issue._rawData
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a timestamp from GitHub or the sync state, Python 3.10 doesn't understand a trailing `Z`."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
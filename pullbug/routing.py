@@ -0,0 +1,124 @@
+import fnmatch
+from dataclasses import (
+    dataclass,
+    fields,
+)
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Tuple,
+)
+
+import woodchips
+
+from pullbug.records import (
+    IssueRecord,
+    PullRequestRecord,
+    RepoRecord,
+    Reviewer,
+    TeamRecord,
+)
+
+LOGGER_NAME = "pullbug"
+# The rules of a route, each can be a single value or a list of values
+RULE_SETTINGS = ("repos", "labels", "authors", "team_reviewers")
+
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    """A destination that gets its own digest of the pull requests and issues matching its rules.
+
+    A rule matches if any of its values match (eg: any of the `labels`), a route matches if all of its rules do.
+    Rules that are left empty match everything. Values are matched case insensitively, `repos` are globs matched
+    against a repo's name or full name (eg: `api-*` or `justintime50/*`). Issues have no reviewers, so a route with
+    `team_reviewers` only gets pull requests.
+    """
+
+    name: str
+    discord_url: str = ""
+    slack_channel: str = ""
+    repos: Tuple[str, ...] = ()
+    labels: Tuple[str, ...] = ()
+    authors: Tuple[str, ...] = ()
+    team_reviewers: Tuple[str, ...] = ()
+
+    def matches_pull_request(self, pull_request: PullRequestRecord, reviewers: Iterable[Reviewer]) -> bool:
+        """Whether a pull request, whose review has been requested of `reviewers`, belongs in this route."""
+        teams = [reviewer for reviewer in reviewers if isinstance(reviewer, TeamRecord)]
+
+        return (
+            self._matches_repo(pull_request.repo)
+            and _matches_any(self.labels, pull_request.labels)
+            and _matches_any(self.authors, [pull_request.user.login])
+            and _matches_any(self.team_reviewers, [value for team in teams for value in (team.slug, team.name)])
+        )
+
+    def matches_issue(self, issue: IssueRecord) -> bool:
+        """Whether an issue belongs in this route."""
+        return (
+            not self.team_reviewers
+            and self._matches_repo(issue.repo)
+            and _matches_any(self.labels, issue.labels)
+            and _matches_any(self.authors, [issue.user.login] if issue.user else [])
+        )
+
+    def _matches_repo(self, repo: RepoRecord) -> bool:
+        return not self.repos or any(
+            fnmatch.fnmatchcase(name.lower(), pattern.lower())
+            for pattern in self.repos
+            for name in (repo.name, repo.full_name)
+        )
+
+
+def build_routes(configs: List[Dict[str, Any]]) -> List[Route]:
+    """Build the routes of a job from their config (eg: the `[[jobs.routes]]` tables of a batch config).
+
+    Each route needs a unique `name` and a `discord_url` and/or `slack_channel` to send its digest to.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    settings = {field.name for field in fields(Route)}
+    routes: Dict[str, Route] = {}
+    for config in configs:
+        name = str(config.get("name", ""))
+        unknown_settings = sorted(setting for setting in config if setting not in settings)
+
+        message = None
+        if not name:
+            message = "A Pullbug route has no name, every route needs one."
+        elif unknown_settings:
+            message = f"Unknown settings for the Pullbug route {name}: {', '.join(unknown_settings)}."
+        elif name in routes:
+            message = f"More than one Pullbug route is named {name}, route names must be unique."
+        elif not config.get("discord_url") and not config.get("slack_channel"):
+            message = f"No discord_url or slack_channel set for the Pullbug route {name}."
+        if message:
+            logger.critical(message)
+            raise ValueError(message)
+
+        rules = {setting: _to_values(config[setting]) for setting in RULE_SETTINGS if setting in config}
+        routes[name] = Route(
+            name=name,
+            discord_url=config.get("discord_url", ""),
+            slack_channel=config.get("slack_channel", ""),
+            **rules,
+        )
+
+    return list(routes.values())
+
+
+def _to_values(value: Any) -> Tuple[str, ...]:
+    values = value if isinstance(value, list) else str(value).split(",")
+
+    return tuple(str(value).strip() for value in values if str(value).strip())
+
+
+def _matches_any(patterns: Tuple[str, ...], values: Iterable[str]) -> bool:
+    if not patterns:
+        return True
+
+    lowered_patterns = {pattern.lower() for pattern in patterns}
+
+    return any(value.lower() in lowered_patterns for value in values)
@@ -0,0 +1,103 @@
+from datetime import (
+    datetime,
+    timedelta,
+)
+from typing import (
+    List,
+    Set,
+    Tuple,
+)
+
+DEFAULT_SCHEDULE = "*/15 * * * *"
+
+# The (minimum, maximum) of each field: minute, hour, day of month, month, and day of week
+CRON_FIELD_RANGES: List[Tuple[int, int]] = [
+    (0, 59),
+    (0, 23),
+    (1, 31),
+    (1, 12),
+    (0, 7),
+]
+# No cron schedule can go longer than this without a run (eg: `0 0 29 2 *` only runs on leap years)
+MAX_SCHEDULE_LOOKAHEAD = timedelta(days=366 * 5)
+
+
+class CronSchedule:
+    """A standard 5 field cron schedule (minute, hour, day of month, month, and day of week).
+
+    Each field supports `*`, numbers, ranges (`1-5`), steps (`*/15`, `1-30/5`), and comma-separated lists.
+    Like cron, when both the day of month and day of week are restricted a day matching either one runs.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = expression.split()
+
+        if len(fields) != len(CRON_FIELD_RANGES):
+            raise ValueError(f"Invalid cron schedule {expression}, expected 5 fields.")
+
+        self.minutes, self.hours, self.days, self.months, days_of_week = [
+            _parse_field(field, minimum, maximum) for field, (minimum, maximum) in zip(fields, CRON_FIELD_RANGES)
+        ]
+        # Both 0 and 7 are Sunday
+        self.days_of_week = {day_of_week % 7 for day_of_week in days_of_week}
+        self._days_restricted = fields[2] != "*"
+        self._days_of_week_restricted = fields[4] != "*"
+
+    def next_run(self, after: datetime) -> datetime:
+        """The first time after `after` that the schedule runs."""
+        next_run = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        latest_run = after + MAX_SCHEDULE_LOOKAHEAD
+
+        # Skip whole months, days, and hours that don't match rather than checking every minute of them
+        while next_run <= latest_run:
+            if next_run.month not in self.months:
+                next_run = (next_run.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._matches_day(next_run):
+                next_run = next_run.replace(hour=0, minute=0) + timedelta(days=1)
+            elif next_run.hour not in self.hours:
+                next_run = next_run.replace(minute=0) + timedelta(hours=1)
+            elif next_run.minute not in self.minutes:
+                next_run += timedelta(minutes=1)
+            else:
+                return next_run
+
+        raise ValueError(f"Cron schedule {self.expression} never runs.")
+
+    def _matches_day(self, moment: datetime) -> bool:
+        matches_day = moment.day in self.days
+        # Python counts days of the week from Monday, cron from Sunday
+        matches_day_of_week = (moment.weekday() + 1) % 7 in self.days_of_week
+
+        if self._days_restricted and self._days_of_week_restricted:
+            return matches_day or matches_day_of_week
+
+        return matches_day and matches_day_of_week
+
+
+def _parse_field(field: str, minimum: int, maximum: int) -> Set[int]:
+    """Expand a single cron field into every value it matches."""
+    values: Set[int] = set()
+
+    for part in field.split(","):
+        value_range, _, step = part.partition("/")
+
+        try:
+            if value_range == "*":
+                start, end = minimum, maximum
+            elif "-" in value_range:
+                start, end = (int(value) for value in value_range.split("-", 1))
+            else:
+                start = int(value_range)
+                # A step from a single value runs until the end of the field (eg: `5/15`)
+                end = maximum if step else start
+            interval = int(step) if step else 1
+        except ValueError:
+            raise ValueError(f"Invalid cron field {field}.")
+
+        if not minimum <= start <= end <= maximum or interval < 1:
+            raise ValueError(f"Invalid cron field {field}, values must be between {minimum} and {maximum}.")
+
+        values.update(range(start, end + 1, interval))
+
+    return values
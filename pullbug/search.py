@@ -0,0 +1,126 @@
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+)
+
+import woodchips
+from github import (
+    Issue,
+    PaginatedList,
+    PullRequest,
+    Requester,
+)
+
+from pullbug import records
+
+LOGGER_NAME = "pullbug"
+SEARCH_PAGE_SIZE = 100
+# GitHub's search API never returns more than this many results for a single query
+SEARCH_MAX_RESULTS = 1000
+
+SEARCH_KIND_CHOICES = Literal[
+    "pr",
+    "issue",
+]
+
+
+def build_query(
+    github_owner: str,
+    github_context: str,
+    kind: SEARCH_KIND_CHOICES,
+    github_state: str,
+    drafts: bool,
+    repos: Iterable[str],
+    include_archived: bool = False,
+) -> str:
+    """Build a search query for the pull requests or issues of an owner."""
+    qualifiers = [
+        f"org:{github_owner}" if github_context == "orgs" else f"user:{github_owner}",
+        f"is:{kind}",
+    ]
+
+    if github_state != "all":
+        qualifiers.append(f"is:{github_state}")
+    if kind == "pr" and not drafts:
+        qualifiers.append("draft:false")
+    if not include_archived:
+        qualifiers.append("archived:false")
+
+    # Multiple `repo` qualifiers match any of the repos
+    qualifiers.extend(f"repo:{github_owner}/{repo}" for repo in repos if repo)
+
+    return " ".join(qualifiers)
+
+
+def get_pull_requests(requester: Requester.Requester, query: str) -> List[records.PullRequestRecord]:
+    """Grab every pull request matching a search query.
+
+    Search results are issues, they are converted into pull requests with the fields the message
+    builders read so no extra request is needed per pull request.
+    """
+    return _search(requester, query, PullRequest.PullRequest, records.from_pull_request, _to_pull_request_attributes)
+
+
+def get_issues(requester: Requester.Requester, query: str) -> List[records.IssueRecord]:
+    """Grab every issue matching a search query."""
+    return _search(requester, query, Issue.Issue, records.from_issue)
+
+
+def _search(
+    requester: Requester.Requester,
+    query: str,
+    content_class: Any,
+    to_record: Callable[[Any], Any],
+    attributes_transformer: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+) -> List:
+    """Walk every page of a search, warning when GitHub cuts the results short.
+
+    Each result is copied into a record as its page comes in so the PyGithub objects can be let go of.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    logger.debug(f"Searching GitHub for: {query}")
+    results = PaginatedList.PaginatedList(
+        content_class,
+        requester,
+        "/search/issues",
+        {"q": query, "per_page": SEARCH_PAGE_SIZE},
+        attributesTransformer=attributes_transformer,
+    )
+    items = [to_record(result) for result in results]
+
+    if results.totalCount > SEARCH_MAX_RESULTS:
+        logger.warning(
+            f"GitHub search found {results.totalCount} results but only returns the first {SEARCH_MAX_RESULTS},"
+            " narrow the search with `--repos` or use another fetch engine."
+        )
+
+    return items
+
+
+def _to_pull_request_attributes(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an issue search result into the attributes of a pull request."""
+    return {
+        **item,
+        "url": item["pull_request"]["url"],
+        "base": {
+            "repo": _to_repo_attributes(item, "/pull/"),
+        },
+    }
+
+
+def _to_repo_attributes(item: Dict[str, Any], html_url_separator: str) -> Dict[str, Any]:
+    """Build the repository attributes of a search result from its URLs."""
+    full_name = item["repository_url"].split("/repos/", 1)[1]
+
+    return {
+        "name": full_name.split("/", 1)[1],
+        "full_name": full_name,
+        "url": item["repository_url"],
+        "html_url": item["html_url"].rsplit(html_url_separator, 1)[0],
+    }
@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from pullbug.records import (
+    IssueRecord,
+    PullRequestRecord,
+    RepoRecord,
+    Reviewer,
+    TeamRecord,
+    UserRecord,
+    parse_datetime,
+)
+
+STATE_FILENAME = "state.json"
+STATE_VERSION = 2
+
+
+class SyncState:
+    """The pull requests, issues, and reviews Pullbug found on its last run, stored under `location`.
+
+    Each repo records a watermark (the newest `updated_at` it has seen) per section (`pulls` or `issues`)
+    so the next run only needs to request what changed since then and merge it into what's stored here.
+    """
+
+    def __init__(self, location: str):
+        self.path = os.path.join(location, STATE_FILENAME)
+        self._repos: Optional[Dict[str, Dict[str, Any]]] = None
+        self._seen_repos: set = set()
+        self._lock = threading.Lock()
+
+    def get_section(self, repo_full_name: str, section: str) -> Optional[Dict[str, Any]]:
+        """Retrieve the stored `pulls` or `issues` section of a repo."""
+        with self._lock:
+            self._seen_repos.add(repo_full_name)
+            return self._load().get(repo_full_name, {}).get(section)
+
+    def set_section(self, repo_full_name: str, section: str, data: Dict[str, Any]):
+        """Replace the stored `pulls` or `issues` section of a repo."""
+        with self._lock:
+            self._seen_repos.add(repo_full_name)
+            self._load().setdefault(repo_full_name, {})[section] = data
+
+    def get_pull_request_item(self, pull_request: PullRequestRecord) -> Optional[Dict[str, Any]]:
+        """Retrieve the stored item of a pull request, where its review data is kept."""
+        section = self.get_section(pull_request.repo.full_name, "pulls")
+
+        return section["items"].get(str(pull_request.number)) if section else None
+
+    def save(self, drop_unseen: bool = True):
+        """Write the state of this run to disk, dropping repos that weren't part of it unless `drop_unseen` is off
+        (eg: when some of the runs sharing the state failed before reaching their repos).
+        """
+        with self._lock:
+            repos = {
+                repo_full_name: repo_state
+                for repo_full_name, repo_state in self._load().items()
+                if repo_full_name in self._seen_repos or not drop_unseen
+            }
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            # Write to a temporary file first so an interrupted run never leaves a corrupt state behind
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w") as state_file:
+                json.dump({"version": STATE_VERSION, "repos": repos}, state_file)
+            os.replace(temporary_path, self.path)
+
+            self._repos = repos
+            self._seen_repos = set()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the state of the last run. Must be called while holding the lock."""
+        if self._repos is None:
+            self._repos = {}
+            try:
+                with open(self.path, "r") as state_file:
+                    state = json.load(state_file)
+                if state.get("version") == STATE_VERSION:
+                    self._repos = state["repos"]
+            except (OSError, ValueError):
+                # No usable state, everything gets fetched from scratch
+                pass
+
+        return self._repos
+
+
+def advance_watermark(watermark: Optional[str], updated_at: Optional[datetime]) -> Optional[str]:
+    """Move the watermark forward to `updated_at` if it's newer."""
+    return _isoformat(updated_at) if is_newer(updated_at, watermark) else watermark
+
+
+def is_newer(updated_at: Optional[datetime], watermark: Optional[str]) -> bool:
+    """Whether something was updated after the watermark."""
+    if updated_at is None:
+        return False
+
+    return watermark is None or updated_at > datetime.fromisoformat(watermark)
+
+
+def pull_request_attributes(pull_request: PullRequestRecord) -> Dict[str, Any]:
+    """Keep the attributes of a pull request needed to build its message later."""
+    return {
+        "number": pull_request.number,
+        "title": pull_request.title,
+        "body": pull_request.body,
+        "html_url": pull_request.html_url,
+        "url": pull_request.url,
+        "draft": pull_request.draft,
+        "state": pull_request.state,
+        "updated_at": _isoformat(pull_request.updated_at),
+        "user": user_attributes(pull_request.user),
+        "base": {
+            "repo": _repo_attributes(pull_request.repo),
+        },
+        "labels": _label_attributes(pull_request.labels),
+    }
+
+
+def issue_attributes(issue: IssueRecord) -> Dict[str, Any]:
+    """Keep the attributes of an issue needed to build its message later."""
+    return {
+        "number": issue.number,
+        "title": issue.title,
+        "body": issue.body,
+        "html_url": issue.html_url,
+        "url": issue.url,
+        "state": issue.state,
+        "updated_at": _isoformat(issue.updated_at),
+        "assignees": [user_attributes(assignee) for assignee in issue.assignees],
+        "repository": _repo_attributes(issue.repo),
+        "user": user_attributes(issue.user) if issue.user else None,
+        "labels": _label_attributes(issue.labels),
+    }
+
+
+def user_attributes(user: UserRecord) -> Dict[str, Any]:
+    return {
+        "login": user.login,
+        "html_url": user.html_url,
+    }
+
+
+def reviewer_attributes(reviewer: Reviewer) -> Dict[str, Any]:
+    if isinstance(reviewer, TeamRecord):
+        return {
+            "type": "team",
+            "name": reviewer.name,
+            "slug": reviewer.slug,
+            "html_url": reviewer.html_url,
+        }
+
+    return {"type": "user", **user_attributes(reviewer)}
+
+
+def to_pull_request(attributes: Dict[str, Any]) -> PullRequestRecord:
+    """Rebuild a pull request from its attributes, which follow GitHub's REST API (eg: a webhook payload)."""
+    return PullRequestRecord(
+        number=attributes["number"],
+        title=attributes["title"],
+        body=attributes["body"],
+        html_url=attributes["html_url"],
+        url=attributes["url"],
+        draft=bool(attributes.get("draft")),
+        state=attributes["state"],
+        updated_at=parse_datetime(attributes["updated_at"]),
+        user=to_user(attributes["user"]),
+        repo=_to_repo(attributes["base"]["repo"]),
+        labels=_to_labels(attributes.get("labels")),
+    )
+
+
+def to_issue(attributes: Dict[str, Any]) -> IssueRecord:
+    """Rebuild an issue from its attributes, which follow GitHub's REST API (eg: a webhook payload)."""
+    return IssueRecord(
+        number=attributes["number"],
+        title=attributes["title"],
+        body=attributes["body"],
+        html_url=attributes["html_url"],
+        url=attributes["url"],
+        state=attributes["state"],
+        updated_at=parse_datetime(attributes["updated_at"]),
+        assignees=tuple(to_user(assignee) for assignee in attributes["assignees"]),
+        repo=_to_repo(attributes["repository"]),
+        user=to_user(attributes["user"]) if attributes.get("user") else None,
+        labels=_to_labels(attributes.get("labels")),
+    )
+
+
+def to_user(attributes: Dict[str, Any]) -> UserRecord:
+    return UserRecord(login=attributes["login"], html_url=attributes["html_url"])
+
+
+def to_reviewers(reviewers: List[Dict[str, Any]]) -> List[Reviewer]:
+    return [
+        (
+            TeamRecord(name=reviewer["name"], slug=reviewer["slug"], html_url=reviewer.get("html_url"))
+            if reviewer["type"] == "team"
+            else to_user(reviewer)
+        )
+        for reviewer in reviewers
+    ]
+
+
+def _repo_attributes(repo: RepoRecord) -> Dict[str, Any]:
+    return {
+        "name": repo.name,
+        "full_name": repo.full_name,
+        "html_url": repo.html_url,
+    }
+
+
+def _to_repo(attributes: Dict[str, Any]) -> RepoRecord:
+    return RepoRecord(name=attributes["name"], full_name=attributes["full_name"], html_url=attributes["html_url"])
+
+
+def _label_attributes(labels: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    return [{"name": label} for label in labels]
+
+
+def _to_labels(labels: Optional[List[Dict[str, Any]]]) -> Tuple[str, ...]:
+    return tuple(label["name"] for label in labels or [])
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
@@ -0,0 +1,183 @@
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Optional,
+)
+from urllib.parse import urlsplit
+
+import requests
+import woodchips
+from urllib3.util.retry import Retry
+
+LOGGER_NAME = "pullbug"
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+SLACK_API_URL = "https://slack.com/api/"
+# Messages aren't safe to send twice, only responses that mean the message wasn't accepted are retried. A gateway
+# timeout (504) may come after the message was delivered, so it isn't retried either
+RETRY_STATUS_CODES = [502, 503]
+RATE_LIMITED_STATUS_CODE = 429
+# How long to wait on a rate limited response that doesn't say when to retry
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class RateLimitBucket:
+    """Tracks the rate limit bucket a service reports for a destination (eg: a Discord webhook).
+
+    Once the bucket has no requests remaining, the next request waits until it resets rather than being
+    rate limited. Services that publish a rate instead of reporting a bucket (eg: Slack's one message per second
+    per channel) are paced by spacing requests at least `min_interval` seconds apart.
+    """
+
+    def __init__(self, min_interval: float = 0.0) -> None:
+        self.min_interval = min_interval
+        self.remaining: Optional[int] = None
+        self._reset_at = 0.0
+        self._next_request_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the bucket allows another request."""
+        with self._lock:
+            now = time.monotonic()
+            request_at = self._next_request_at
+            if self.remaining is not None:
+                if self.remaining <= 0:
+                    request_at = max(request_at, self._reset_at)
+                # Optimistically count this request so concurrent senders don't all spend the last of the bucket
+                self.remaining -= 1
+            # Reserve the slot so concurrent senders queue up behind this request rather than alongside it
+            self._next_request_at = max(now, request_at) + self.min_interval
+
+        delay = request_at - now
+        if delay > 0:
+            woodchips.get(LOGGER_NAME).debug(f"Waiting on rate limit bucket, sleeping {delay:.2f}s...")
+            time.sleep(delay)
+
+    def update(self, response: requests.Response):
+        """Record the bucket reported on a response via Discord-style `X-RateLimit-*` headers."""
+        with self._lock:
+            if "X-RateLimit-Remaining" in response.headers:
+                self.remaining = int(response.headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset-After" in response.headers:
+                self._reset_at = time.monotonic() + float(response.headers["X-RateLimit-Reset-After"])
+
+
+class MessageTransport:
+    """Keep-alive HTTP connections for delivering messages to Discord and Slack.
+
+    A single transport is meant to be shared by every send of a run, and by every run of a long-lived process
+    (eg: `serve`), so each destination's connection is only set up once. Connections are pooled per host, up to
+    `pool_size` each. Unavailable and rate limited responses are retried up to `retries` times, rate limited
+    ones after the wait the service asked for.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        slack_api_url: str = SLACK_API_URL,
+    ):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.slack_api_url = slack_api_url
+        self._session: Optional[requests.Session] = None
+        # Rate limit buckets outlive a single sender, eg: the pull request and issue messages share a webhook
+        self._buckets: Dict[str, RateLimitBucket] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """The pooled session, created on first use so that a transport that never sends never connects."""
+        with self._lock:
+            if self._session is None:
+                retry = Retry(
+                    total=self.retries,
+                    # A message that was sent but whose response was lost may have been delivered already
+                    read=0,
+                    backoff_factor=1,
+                    status_forcelist=RETRY_STATUS_CODES,
+                    allowed_methods=["POST"],
+                    raise_on_status=False,
+                )
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.pool_size, max_retries=retry)
+                self._session = requests.Session()
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+
+            return self._session
+
+    def bucket(self, key: str, min_interval: float = 0.0) -> RateLimitBucket:
+        """The rate limit bucket of a destination, created on first use with `min_interval` between requests."""
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = RateLimitBucket(min_interval)
+
+            return self._buckets[key]
+
+    def post(
+        self,
+        url: str,
+        bucket: Optional[RateLimitBucket] = None,
+        retry_after: Optional[Callable[[requests.Response], float]] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """Send a POST request over a pooled connection.
+
+        A rate limited response is retried after `retry_after` (by default its `Retry-After` header) says to.
+        With a `bucket`, each attempt waits for the bucket and then updates it from the response.
+        """
+        logger = woodchips.get(LOGGER_NAME)
+
+        attempt = 0
+        while True:
+            if bucket:
+                bucket.wait()
+            response = self.session.post(url, timeout=self.timeout, **kwargs)
+            if bucket:
+                bucket.update(response)
+
+            if response.status_code != RATE_LIMITED_STATUS_CODE or attempt >= self.retries:
+                return response
+
+            attempt += 1
+            delay = (retry_after or header_retry_after)(response)
+            logger.warning(f"Rate limited by {urlsplit(url).hostname}, retrying in {delay:.2f}s...")
+            response.close()
+            time.sleep(delay)
+
+    def post_slack(
+        self,
+        method: str,
+        token: str,
+        payload: Dict[str, Any],
+        bucket: Optional[RateLimitBucket] = None,
+    ) -> requests.Response:
+        """Call a method of Slack's Web API (eg: `chat.postMessage`) with a bot token, paced by `bucket` if given."""
+        return self.post(
+            f"{self.slack_api_url}{method}",
+            bucket=bucket,
+            json=payload,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    def close(self):
+        """Close every pooled connection, the transport can still be used afterwards."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+def header_retry_after(response: requests.Response) -> float:
+    """How long a rate limited response asks to wait via its `Retry-After` header, in seconds."""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return DEFAULT_RETRY_AFTER
@@ -0,0 +1,296 @@
+import hashlib
+import hmac
+import json
+import threading
+from datetime import datetime
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import woodchips
+
+from pullbug import state
+from pullbug.records import (
+    IssueRecord,
+    PullRequestWithReviews,
+)
+
+LOGGER_NAME = "pullbug"
+DEFAULT_WEBHOOK_HOST = "127.0.0.1"
+# The largest delivery accepted, larger ones are refused before being read
+MAX_PAYLOAD_SIZE = 1024 * 1024
+# How many scheduled runs render from the webhook index before the next run reconciles it by polling GitHub
+DEFAULT_RECONCILE_EVERY = 12
+
+WEBHOOK_EVENTS = {
+    "pull_request",
+    "pull_request_review",
+    "issues",
+}
+# Only the latest review of each user counts, comments don't change whether a pull request is ready
+REVIEW_STATE_CATEGORIES = {
+    "APPROVED": "users_who_approved",
+    "CHANGES_REQUESTED": "users_who_requested_changes",
+    "DISMISSED": "users_who_were_dismissed",
+}
+
+
+class WebhookIndex:
+    """A live index of open pull requests, their review data, and open issues kept up to date by GitHub webhooks.
+
+    Pull requests and issues are rebuilt as records from the index without making any requests. Webhook
+    deliveries can be missed (eg: while Pullbug isn't running), so the index is periodically reconciled
+    against a regular run.
+    """
+
+    def __init__(self, accepts_repo: Callable[[Dict[str, Any]], bool] = lambda repository: True):
+        self.accepts_repo = accepts_repo
+        # Whether the index has been filled by a regular run yet, webhooks alone only ever know about changes
+        self.reconciled = False
+        self._pull_requests: Dict[str, Dict[str, Any]] = {}
+        self._issues: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def handle_event(self, event: str, payload: Dict[str, Any]) -> bool:
+        """Apply a webhook delivery to the index, returns whether it was used."""
+        repository = payload.get("repository")
+        if event not in WEBHOOK_EVENTS or not repository or not self.accepts_repo(repository):
+            return False
+
+        with self._lock:
+            if event == "issues":
+                self._handle_issue(payload)
+            else:
+                self._handle_pull_request(payload)
+
+        return True
+
+    def pull_requests(self) -> List[PullRequestWithReviews]:
+        """Rebuild every open pull request along with its review data, grouped by repo with the newest first."""
+        with self._lock:
+            entries = sorted(self._pull_requests.values(), key=_sort_key)
+
+        return [
+            PullRequestWithReviews(
+                pull_request=state.to_pull_request(entry["attributes"]),
+                reviewers=state.to_reviewers(entry["reviewers"]),
+                reviews_by_category=self._to_reviews_by_category(entry["reviews"]),
+            )
+            for entry in entries
+        ]
+
+    def issues(self) -> List[IssueRecord]:
+        """Rebuild every open issue, grouped by repo with the newest first."""
+        with self._lock:
+            entries = sorted(self._issues.values(), key=_sort_key)
+
+        return [state.to_issue(entry["attributes"]) for entry in entries]
+
+    def reconcile(
+        self,
+        pull_requests: Optional[List[PullRequestWithReviews]],
+        issues: Optional[List[IssueRecord]],
+        started_at: datetime,
+    ):
+        """Replace the index with what a regular run found, `None` leaves that part of the index as it is.
+
+        Webhooks delivered while the run was going are newer than what it found, so they are kept.
+        """
+        with self._lock:
+            if pull_requests is not None:
+                self._pull_requests = self._merge(
+                    self._pull_requests,
+                    {
+                        pull_request.pull_request.html_url: self._to_pull_request_entry(pull_request)
+                        for pull_request in pull_requests
+                    },
+                    started_at,
+                )
+            if issues is not None:
+                self._issues = self._merge(
+                    self._issues,
+                    {issue.html_url: self._to_issue_entry(issue) for issue in issues},
+                    started_at,
+                )
+            self.reconciled = True
+
+    def _handle_pull_request(self, payload: Dict[str, Any]):
+        """Apply a `pull_request` or `pull_request_review` delivery. Must be called while holding the lock."""
+        raw_pull_request = payload["pull_request"]
+
+        if raw_pull_request["state"] != "open":
+            self._pull_requests.pop(raw_pull_request["html_url"], None)
+            return
+
+        entry = self._pull_requests.setdefault(raw_pull_request["html_url"], {"reviews": {}})
+        entry["attributes"] = state.pull_request_attributes(state.to_pull_request(raw_pull_request))
+        # Submitting a review removes the user from the requested reviewers, so these are always current
+        entry["reviewers"] = [
+            {"type": "user", **_user_attributes(user)} for user in raw_pull_request.get("requested_reviewers", [])
+        ] + [
+            {"type": "team", "name": team["name"], "slug": team["slug"], "html_url": team.get("html_url")}
+            for team in raw_pull_request.get("requested_teams", [])
+        ]
+
+        if "review" in payload:
+            review = payload["review"]
+            review_state = "DISMISSED" if payload["action"] == "dismissed" else review["state"].upper()
+            if review_state in REVIEW_STATE_CATEGORIES and review.get("user"):
+                entry["reviews"][review["user"]["login"]] = {
+                    "state": review_state,
+                    "user": _user_attributes(review["user"]),
+                }
+
+    def _handle_issue(self, payload: Dict[str, Any]):
+        """Apply an `issues` delivery. Must be called while holding the lock."""
+        raw_issue = payload["issue"]
+
+        # Deleted and transferred issues are still reported as open
+        if raw_issue["state"] != "open" or payload["action"] in ("deleted", "transferred"):
+            self._issues.pop(raw_issue["html_url"], None)
+            return
+
+        self._issues[raw_issue["html_url"]] = {
+            "attributes": state.issue_attributes(state.to_issue({**raw_issue, "repository": payload["repository"]})),
+        }
+
+    def _to_reviews_by_category(self, reviews: Dict[str, Dict[str, Any]]) -> Dict[str, List[Any]]:
+        reviews_by_category: Dict[str, List[Any]] = {category: [] for category in REVIEW_STATE_CATEGORIES.values()}
+
+        for review in reviews.values():
+            reviews_by_category[REVIEW_STATE_CATEGORIES[review["state"]]].append(state.to_user(review["user"]))
+
+        return reviews_by_category
+
+    @staticmethod
+    def _to_pull_request_entry(pull_request: PullRequestWithReviews) -> Dict[str, Any]:
+        reviews = {}
+        # Later categories win when a user shows up in several, an approval is what counts most
+        for review_state in ("DISMISSED", "CHANGES_REQUESTED", "APPROVED"):
+            for user in pull_request.reviews_by_category[REVIEW_STATE_CATEGORIES[review_state]]:
+                reviews[user.login] = {"state": review_state, "user": state.user_attributes(user)}
+
+        return {
+            "attributes": state.pull_request_attributes(pull_request.pull_request),
+            "reviewers": [state.reviewer_attributes(reviewer) for reviewer in pull_request.reviewers],
+            "reviews": reviews,
+        }
+
+    @staticmethod
+    def _to_issue_entry(issue: IssueRecord) -> Dict[str, Any]:
+        return {"attributes": state.issue_attributes(issue)}
+
+    @staticmethod
+    def _merge(
+        indexed: Dict[str, Dict[str, Any]],
+        polled: Dict[str, Dict[str, Any]],
+        started_at: datetime,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Merge what a run found with the index, keeping entries the index updated after the run started."""
+        merged = dict(polled)
+
+        for html_url, entry in indexed.items():
+            if state.is_newer(_updated_at(entry), started_at.isoformat()) and (
+                html_url not in polled
+                or state.is_newer(_updated_at(entry), polled[html_url]["attributes"]["updated_at"])
+            ):
+                merged[html_url] = entry
+
+        return merged
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """Receives GitHub webhook deliveries and applies them to a `WebhookIndex`."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], index: WebhookIndex, secret: str):
+        super().__init__(address, WebhookRequestHandler)
+        self.index = index
+        self.secret = secret
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    server: WebhookServer
+
+    def do_POST(self):
+        logger = woodchips.get(LOGGER_NAME)
+
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0 or content_length > MAX_PAYLOAD_SIZE:
+            logger.warning(
+                f"Rejected a webhook delivery with a Content-Length of {self.headers.get('Content-Length')}."
+            )
+            # The body is left unread, so the connection can't be reused
+            self.close_connection = True
+            self._respond(400 if content_length < 0 else 413)
+            return
+
+        body = self.rfile.read(content_length)
+        if not verify_signature(self.server.secret, body, self.headers.get("X-Hub-Signature-256")):
+            logger.warning("Rejected a webhook delivery with an invalid signature.")
+            self._respond(401)
+            return
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self._respond(400)
+            return
+
+        event = self.headers.get("X-GitHub-Event", "")
+        used = self.server.index.handle_event(event, payload)
+        logger.debug(f"Received a {event} webhook delivery ({'used' if used else 'ignored'}).")
+
+        self._respond(200 if used else 202)
+
+    def log_message(self, format: str, *args: Any):
+        """Send request logs through the Pullbug logger rather than to `stderr`."""
+        woodchips.get(LOGGER_NAME).debug(format % args)
+
+    def _respond(self, status_code: int):
+        self.send_response(status_code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check a delivery's `X-Hub-Signature-256` header against the webhook secret."""
+    if not signature:
+        return False
+
+    expected_signature = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+    return hmac.compare_digest(expected_signature, signature)
+
+
+def _user_attributes(user: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "login": user["login"],
+        "html_url": user["html_url"],
+    }
+
+
+def _updated_at(entry: Dict[str, Any]) -> datetime:
+    return datetime.fromisoformat(entry["attributes"]["updated_at"])
+
+
+def _sort_key(entry: Dict[str, Any]) -> Tuple[str, int]:
+    attributes = entry["attributes"]
+    repo_full_name = (
+        attributes["base"]["repo"]["full_name"] if "base" in attributes else attributes["repository"]["full_name"]
+    )
+
+    return repo_full_name.lower(), -attributes["number"]
@@ -0,0 +1,299 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from multiprocessing.connection import Connection
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    get_args,
+)
+
+import requests
+
+from pullbug.bug import (
+    DEFAULT_FETCH_ENGINE,
+    DEFAULT_WORKERS,
+    FETCH_ENGINE_CHOICES,
+    Pullbug,
+)
+from pullbug.transport import MessageTransport
+from test.benchmark.fake_api import (
+    DEFAULT_RATE_LIMIT,
+    FakeApiServer,
+    OrgShape,
+)
+
+DEFAULT_LATENCY_MS = 50
+DEFAULT_RUNS = 1
+# How much worse than the baseline a result may be before it's reported as a regression
+DEFAULT_TOLERANCE = 0.2
+COMPARED_METRICS = ("wall_time_s", "requests", "peak_rss_mib", "peak_traced_mib")
+TIMEOUT = 30
+
+
+@contextlib.contextmanager
+def fake_api(shape: OrgShape, latency: float, rate_limit: int = DEFAULT_RATE_LIMIT) -> Iterator[str]:
+    """Serve the fake API from its own process, yielding its base URL.
+
+    Running it out of process keeps the server's own work out of Pullbug's wall time and memory.
+    """
+    context = multiprocessing.get_context("spawn")
+    receiving_connection, sending_connection = context.Pipe(duplex=False)
+    process = context.Process(target=_serve, args=(shape, latency, rate_limit, sending_connection), daemon=True)
+    process.start()
+
+    try:
+        yield receiving_connection.recv()
+    finally:
+        process.terminate()
+        process.join()
+
+
+def _serve(shape: OrgShape, latency: float, rate_limit: int, connection: Connection):
+    server = FakeApiServer(("127.0.0.1", 0), shape, latency, rate_limit)
+    connection.send(server.base_url)
+    server.serve_forever()
+
+
+def run_benchmark(
+    shape: OrgShape,
+    runs: int = DEFAULT_RUNS,
+    latency: float = DEFAULT_LATENCY_MS / 1000,
+    rate_limit: int = DEFAULT_RATE_LIMIT,
+    workers: int = DEFAULT_WORKERS,
+    fetch_engine: FETCH_ENGINE_CHOICES = DEFAULT_FETCH_ENGINE,
+    no_cache: bool = False,
+    trace_memory: bool = False,
+) -> List[Dict[str, Any]]:
+    """Run Pullbug end to end against the fake API for pull requests and issues, sending to Discord and Slack.
+
+    The same `Pullbug` is run each time like `pullbug serve` would, so runs after the first show the effect of
+    the response cache and reused connections. Returns the wall time, requests by endpoint, and peak memory of
+    each run.
+
+    The peak RSS is that of the whole process so far, so a later run only shows up if it went higher. With
+    `trace_memory`, the peak of each run's Python allocations is traced too, at the cost of a slower run.
+    """
+    with contextlib.ExitStack() as stack:
+        base_url = stack.enter_context(fake_api(shape, latency, rate_limit))
+        location = stack.enter_context(tempfile.TemporaryDirectory())
+        bug = Pullbug(
+            github_owner=shape.owner,
+            github_token="benchmark-token",  # nosec hardcoded_password_funcarg
+            github_context="orgs",
+            pulls=True,
+            issues=True,
+            discord=True,
+            discord_url=f"{base_url}/api/webhooks/1/benchmark-token",
+            slack=True,
+            slack_token="benchmark-token",  # nosec hardcoded_password_funcarg
+            slack_channel="benchmark",
+            location=location,
+            base_url=base_url,
+            # Every message is logged at info, which would drown out the results
+            log_level="warning",
+            workers=workers,
+            fetch_engine=fetch_engine,
+            no_cache=no_cache,
+        )
+        bug.transport = MessageTransport(slack_api_url=f"{base_url}/api/")
+
+        results = []
+        for run in range(1, runs + 1):
+            requests.post(f"{base_url}/_benchmark/reset", timeout=TIMEOUT)
+            if trace_memory:
+                tracemalloc.start()
+
+            started_at = time.perf_counter()
+            bug.run()
+            wall_time = time.perf_counter() - started_at
+
+            peak_traced_memory = None
+            if trace_memory:
+                peak_traced_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+            requests_by_endpoint: Dict[str, int] = requests.get(
+                f"{base_url}/_benchmark/requests", timeout=TIMEOUT
+            ).json()
+            results.append(
+                {
+                    "run": run,
+                    "wall_time_s": round(wall_time, 3),
+                    "requests": sum(requests_by_endpoint.values()),
+                    "cache_hits": bug.accounting.summary()["cache_hits"],
+                    "peak_rss_mib": round(_peak_rss() / 1024**2, 2),
+                    "peak_traced_mib": (
+                        round(peak_traced_memory / 1024**2, 2) if peak_traced_memory is not None else None
+                    ),
+                    "requests_by_endpoint": dict(sorted(requests_by_endpoint.items(), key=lambda item: -item[1])),
+                }
+            )
+
+    return results
+
+
+def _peak_rss() -> int:
+    """The peak resident memory of this process in bytes, macOS reports it in bytes and Linux in KiB."""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def compare_results(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[Dict[str, Any]]:
+    """Compare each run against the same run of a baseline, returning the change of each metric both measured and
+    whether it regressed beyond the `tolerance`.
+    """
+    changes = []
+
+    for result, baseline_result in zip(results, baseline):
+        for metric in COMPARED_METRICS:
+            value, baseline_value = result[metric], baseline_result[metric]
+            if value is None or baseline_value is None:
+                continue
+
+            change = (value - baseline_value) / baseline_value if baseline_value else 0.0
+            changes.append(
+                {
+                    "run": result["run"],
+                    "metric": metric,
+                    "baseline": baseline_value,
+                    "value": value,
+                    "change": change,
+                    "regressed": change > tolerance,
+                }
+            )
+
+    return changes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Pullbug against a local fake GitHub, Discord, and Slack.")
+    parser.add_argument("--owner", type=str, default=OrgShape.owner, help="The owner the fake GitHub serves.")
+    parser.add_argument("--repos", type=int, default=OrgShape.repos, help="The number of repos of the owner.")
+    parser.add_argument(
+        "--pull_requests", type=int, default=OrgShape.pull_requests, help="The open pull requests per repo."
+    )
+    parser.add_argument("--reviews", type=int, default=OrgShape.reviews, help="The reviews per pull request.")
+    parser.add_argument(
+        "--review_requests",
+        type=int,
+        default=OrgShape.review_requests,
+        help="The users whose review is requested per pull request.",
+    )
+    parser.add_argument("--issues", type=int, default=OrgShape.issues, help="The open issues per repo.")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="How many times to run Pullbug.")
+    parser.add_argument(
+        "--latency", type=float, default=DEFAULT_LATENCY_MS, help="How long every response is delayed, in ms."
+    )
+    parser.add_argument(
+        "--rate_limit", type=int, default=DEFAULT_RATE_LIMIT, help="The GitHub requests allowed per hour."
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="The workers Pullbug fetches with.")
+    parser.add_argument(
+        "--fetch_engine",
+        type=str,
+        default=DEFAULT_FETCH_ENGINE,
+        choices=set(get_args(FETCH_ENGINE_CHOICES)),
+        help="The fetch engine Pullbug uses.",
+    )
+    parser.add_argument("--no_cache", action="store_true", default=False, help="Disable Pullbug's response cache.")
+    parser.add_argument(
+        "--trace_memory",
+        action="store_true",
+        default=False,
+        help="Also trace the peak Python memory of each run, which slows Pullbug down and inflates the wall time.",
+    )
+    parser.add_argument("--output", type=str, default=None, help="Save the results as JSON to this path.")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against results saved with `--output`.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="How much worse than the baseline a result may be before failing (eg: 0.2 for 20%%).",
+    )
+    args = parser.parse_args(argv)
+
+    shape = OrgShape(
+        owner=args.owner,
+        repos=args.repos,
+        pull_requests=args.pull_requests,
+        reviews=args.reviews,
+        review_requests=args.review_requests,
+        issues=args.issues,
+    )
+    config = {
+        **vars(shape),
+        "latency_ms": args.latency,
+        "rate_limit": args.rate_limit,
+        "workers": args.workers,
+        "fetch_engine": args.fetch_engine,
+        "no_cache": args.no_cache,
+        "trace_memory": args.trace_memory,
+    }
+    print(f"Benchmarking Pullbug with {json.dumps(config)}...")
+
+    results = run_benchmark(
+        shape,
+        runs=args.runs,
+        latency=args.latency / 1000,
+        rate_limit=args.rate_limit,
+        workers=args.workers,
+        fetch_engine=args.fetch_engine,
+        no_cache=args.no_cache,
+        trace_memory=args.trace_memory,
+    )
+
+    for result in results:
+        traced_memory = f", {result['peak_traced_mib']} MiB traced" if result["peak_traced_mib"] is not None else ""
+        print(
+            f"Run {result['run']}: {result['wall_time_s']}s wall time, {result['requests']} requests"
+            f" ({result['cache_hits']} cache hits), {result['peak_rss_mib']} MiB peak RSS{traced_memory}"
+        )
+        for endpoint, count in result["requests_by_endpoint"].items():
+            print(f"  {count:>6} {endpoint}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"config": config, "results": results}, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["config"] != config:
+            print("Warning: the baseline was run with a different configuration.")
+
+        print(f"Compared to {args.baseline}:")
+        changes = compare_results(results, baseline["results"], args.tolerance)
+        for change in changes:
+            print(
+                f"  Run {change['run']} {change['metric']}: {change['baseline']} -> {change['value']}"
+                f" ({change['change']:+.0%})"
+            )
+        regressions = [change for change in changes if change["regressed"]]
+        for regression in regressions:
+            print(
+                f"Run {regression['run']} {regression['metric']} regressed from {regression['baseline']}"
+                f" to {regression['value']}"
+            )
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
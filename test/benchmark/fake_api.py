@@ -0,0 +1,604 @@
+import collections
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from typing import (
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+from urllib.parse import (
+    parse_qs,
+    urlencode,
+    urlsplit,
+)
+
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+# GitHub's search API never returns more than this many results for a single query
+SEARCH_MAX_RESULTS = 1000
+DEFAULT_RATE_LIMIT = 5000
+RATE_LIMIT_WINDOW = 3600
+# Discord allows each webhook 5 posts every 2 seconds
+DISCORD_BUCKET_LIMIT = 5
+DISCORD_BUCKET_WINDOW = 2.0
+# Every pull request and issue is updated a minute after the one before it
+UPDATED_AT_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+REVIEW_STATES = ("APPROVED", "CHANGES_REQUESTED", "COMMENTED", "DISMISSED")
+# Every nth pull request is a draft
+DRAFT_EVERY = 5
+LABELS = ("bug", "dependencies", "documentation")
+BODY = "This change updates the dependencies, fixes the flaky tests, and adds the missing documentation. " * 3
+
+
+@dataclass(frozen=True)
+class OrgShape:
+    """The size of the synthetic owner served by the fake API.
+
+    Every repo has the same number of open pull requests and issues, and every pull request the same number of
+    reviews and review requests.
+    """
+
+    owner: str = "benchmark-org"
+    repos: int = 20
+    pull_requests: int = 10
+    reviews: int = 2
+    review_requests: int = 1
+    issues: int = 10
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """A local stand-in for the GitHub REST, search, and GraphQL APIs, Discord webhooks, and Slack's `chat.postMessage`.
+
+    GitHub responses are paginated with `Link` headers, carry an `ETag` (revalidating with it answers
+    `304 Not Modified` without counting against the rate limit) and rate limit headers. Every response is delayed
+    by `latency` seconds. Requests are counted by endpoint, see `/_benchmark/requests`.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        shape: OrgShape,
+        latency: float = 0.0,
+        rate_limit: int = DEFAULT_RATE_LIMIT,
+    ):
+        super().__init__(address, FakeApiRequestHandler)
+        self.shape = shape
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.base_url = f"http://{self.server_address[0]!s}:{self.server_port}"
+        self.requests: Counter[str] = collections.Counter()
+        self._rate_limit_used = 0
+        self._rate_limit_reset = int(time.time()) + RATE_LIMIT_WINDOW
+        # The start of each webhook's current bucket window and the posts made in it
+        self._discord_buckets: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def count_request(self, endpoint: str, rate_limited: bool) -> Tuple[Dict[str, str], bool]:
+        """Count a request against its endpoint.
+
+        Returns the rate limit headers to respond with and whether the request is over the rate limit.
+        """
+        with self._lock:
+            self.requests[endpoint] += 1
+            if time.time() >= self._rate_limit_reset:
+                self._rate_limit_used = 0
+                self._rate_limit_reset = int(time.time()) + RATE_LIMIT_WINDOW
+
+            exceeded = rate_limited and self._rate_limit_used >= self.rate_limit
+            if rate_limited and not exceeded:
+                self._rate_limit_used += 1
+
+            headers = {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(self.rate_limit - self._rate_limit_used),
+                "X-RateLimit-Used": str(self._rate_limit_used),
+                "X-RateLimit-Reset": str(self._rate_limit_reset),
+                "X-RateLimit-Resource": "core",
+            }
+
+            return headers, exceeded
+
+    def take_discord_bucket(self, webhook: str) -> Tuple[bool, Dict[str, str]]:
+        """Spend a post from a webhook's bucket, returning whether it was allowed and the bucket headers."""
+        with self._lock:
+            now = time.monotonic()
+            window_start, posts = self._discord_buckets.get(webhook, (now, 0))
+            if now - window_start >= DISCORD_BUCKET_WINDOW:
+                window_start, posts = now, 0
+
+            allowed = posts < DISCORD_BUCKET_LIMIT
+            posts += allowed
+            self._discord_buckets[webhook] = (window_start, posts)
+            reset_after = DISCORD_BUCKET_WINDOW - (now - window_start)
+
+        return allowed, {
+            "X-RateLimit-Bucket": hashlib.sha256(webhook.encode()).hexdigest()[:16],
+            "X-RateLimit-Limit": str(DISCORD_BUCKET_LIMIT),
+            "X-RateLimit-Remaining": str(DISCORD_BUCKET_LIMIT - posts),
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+        }
+
+    def reset_requests(self) -> Dict[str, int]:
+        """Start counting requests over, returning the counts so far."""
+        with self._lock:
+            requests = dict(self.requests)
+            self.requests.clear()
+
+        return requests
+
+
+class FakeApiRequestHandler(BaseHTTPRequestHandler):
+    server: FakeApiServer
+    # Keep connections alive like the real APIs so that connection reuse shows up in the results
+    protocol_version = "HTTP/1.1"
+    # Headers and bodies are written separately, delaying the body would add latency the real APIs don't have
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format: str, *args: Any):
+        """Every request is logged otherwise, which would slow the server down."""
+
+    def _handle(self, method: str):
+        url = urlsplit(self.path)
+        self.query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        self.body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        for route_method, pattern, endpoint, handler in ROUTES:
+            match = re.fullmatch(pattern, url.path)
+            if route_method == method and match:
+                break
+        else:
+            self._respond(404, {"message": "Not Found"}, endpoint=f"{method} (unknown)")
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        status_code, body, headers = handler(self, *match.groups())
+        self._respond(status_code, body, headers, endpoint=f"{method} {endpoint}")
+
+    def _respond(
+        self,
+        status_code: int,
+        body: Any,
+        headers: Optional[Dict[str, str]] = None,
+        endpoint: str = "",
+    ):
+        content = json.dumps(body).encode() if body is not None else b""
+        headers = dict(headers or {})
+        is_github = endpoint.startswith(("GET /repos", "GET /users", "GET /orgs", "GET /search", "POST /graphql"))
+        rate_limited = is_github
+
+        if self.command == "GET" and status_code == 200:
+            etag = f'"{hashlib.sha256(content).hexdigest()}"'
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                # Like GitHub, revalidated responses don't count against the rate limit
+                status_code, content, rate_limited = 304, b"", False
+
+        if "/_benchmark/" not in endpoint:
+            rate_limit_headers, exceeded = self.server.count_request(endpoint, rate_limited)
+            if is_github:
+                headers.update(rate_limit_headers)
+            if exceeded:
+                status_code = 403
+                content = json.dumps({"message": "API rate limit exceeded"}).encode()
+
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if content:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _paginate(self, total: int, build: Callable[[int], Any], max_results: Optional[int] = None) -> Tuple:
+        """Respond with a page of `total` items built by index, linking to the next and last pages like GitHub."""
+        per_page = min(int(self.query.get("per_page", DEFAULT_PER_PAGE)), MAX_PER_PAGE)
+        page = max(int(self.query.get("page", 1)), 1)
+        available = min(total, max_results) if max_results is not None else total
+        last_page = max((available + per_page - 1) // per_page, 1)
+
+        start = (page - 1) * per_page
+        items = [build(index) for index in range(start, min(start + per_page, available))]
+
+        links = []
+        if page < last_page:
+            links.append(f'<{self._page_url(page + 1)}>; rel="next"')
+            links.append(f'<{self._page_url(last_page)}>; rel="last"')
+        if page > 1:
+            links.append(f'<{self._page_url(1)}>; rel="first"')
+            links.append(f'<{self._page_url(page - 1)}>; rel="prev"')
+
+        return items, {"Link": ", ".join(links)} if links else {}
+
+    def _page_url(self, page: int) -> str:
+        return f"{self.server.base_url}{urlsplit(self.path).path}?{urlencode({**self.query, 'page': page})}"
+
+    def _repo_index(self, owner: str, name: str) -> Optional[int]:
+        """The index of a repo of the synthetic owner, `None` when it doesn't exist."""
+        match = re.fullmatch(r"repo-(\d+)", name)
+        if owner.lower() != self.server.shape.owner.lower() or not match:
+            return None
+
+        index = int(match.group(1))
+
+        return index if index < self.server.shape.repos else None
+
+    def _get_owner(self, owner: str) -> Tuple:
+        if owner.lower() != self.server.shape.owner.lower():
+            return 404, {"message": "Not Found"}, {}
+
+        return 200, {**self._owner(), "public_repos": self.server.shape.repos}, {}
+
+    def _list_repos(self, owner: str) -> Tuple:
+        if owner.lower() != self.server.shape.owner.lower():
+            return 404, {"message": "Not Found"}, {}
+
+        items, headers = self._paginate(self.server.shape.repos, self._repo)
+
+        return 200, items, headers
+
+    def _get_repo(self, owner: str, name: str) -> Tuple:
+        repo_index = self._repo_index(owner, name)
+        if repo_index is None:
+            return 404, {"message": "Not Found"}, {}
+
+        return 200, self._repo(repo_index), {}
+
+    def _list_pulls(self, owner: str, name: str) -> Tuple:
+        repo_index = self._repo_index(owner, name)
+        if repo_index is None:
+            return 404, {"message": "Not Found"}, {}
+
+        # Every pull request is open, newest first
+        total = self.server.shape.pull_requests if self.query.get("state", "open") in ("open", "all") else 0
+        items, headers = self._paginate(total, lambda index: self._pull(repo_index, total - index))
+
+        return 200, items, headers
+
+    def _list_issues(self, owner: str, name: str) -> Tuple:
+        repo_index = self._repo_index(owner, name)
+        if repo_index is None:
+            return 404, {"message": "Not Found"}, {}
+
+        # Like GitHub, pull requests are listed as issues too. Numbers are shared, issues come after pull requests
+        numbers = list(range(self.server.shape.pull_requests + self.server.shape.issues, 0, -1))
+        if self.query.get("state", "open") not in ("open", "all"):
+            numbers = []
+        if "since" in self.query:
+            since = datetime.fromisoformat(self.query["since"].replace("Z", "+00:00"))
+            numbers = [number for number in numbers if _updated_at(number) >= since]
+
+        items, headers = self._paginate(len(numbers), lambda index: self._issue(repo_index, numbers[index]))
+
+        return 200, items, headers
+
+    def _list_review_requests(self, owner: str, name: str, number: str) -> Tuple:
+        repo_index = self._repo_index(owner, name)
+        if repo_index is None or not 0 < int(number) <= self.server.shape.pull_requests:
+            return 404, {"message": "Not Found"}, {}
+
+        reviews = self.server.shape.reviews
+        users = [self._user(f"reviewer-{reviews + index}") for index in range(self.server.shape.review_requests)]
+        # Every other pull request also has a team's review requested
+        teams = [self._team("maintainers")] if int(number) % 2 else []
+
+        return 200, {"users": users, "teams": teams}, {}
+
+    def _list_reviews(self, owner: str, name: str, number: str) -> Tuple:
+        repo_index = self._repo_index(owner, name)
+        if repo_index is None or not 0 < int(number) <= self.server.shape.pull_requests:
+            return 404, {"message": "Not Found"}, {}
+
+        items, headers = self._paginate(self.server.shape.reviews, lambda index: self._review(int(number), index))
+
+        return 200, items, headers
+
+    def _search_issues(self) -> Tuple:
+        qualifiers = self.query.get("q", "").split()
+        shape = self.server.shape
+        owners = {
+            qualifier.split(":", 1)[1].lower() for qualifier in qualifiers if qualifier.startswith(("org:", "user:"))
+        }
+        repos = {qualifier.split("/", 1)[1] for qualifier in qualifiers if qualifier.startswith("repo:")}
+
+        results: List[Tuple[int, int]] = []
+        if owners == {shape.owner.lower()} and "is:closed" not in qualifiers:
+            for repo_index in range(shape.repos):
+                if repos and _repo_name(repo_index) not in repos:
+                    continue
+                if "is:pr" in qualifiers:
+                    results.extend(
+                        (repo_index, number)
+                        for number in range(shape.pull_requests, 0, -1)
+                        if "draft:false" not in qualifiers or not _is_draft(number)
+                    )
+                else:
+                    results.extend(
+                        (repo_index, number)
+                        for number in range(shape.pull_requests + shape.issues, shape.pull_requests, -1)
+                    )
+
+        items, headers = self._paginate(
+            len(results), lambda index: self._issue(*results[index]), max_results=SEARCH_MAX_RESULTS
+        )
+
+        return 200, {"total_count": len(results), "incomplete_results": False, "items": items}, headers
+
+    def _graphql(self) -> Tuple:
+        """Answer the pull request queries of `pullbug.graphql` from their variables alone."""
+        request = json.loads(self.body)
+        variables = request.get("variables") or {}
+        first_match = re.search(r"pullRequests\([^)]*first: (\d+)", request.get("query", ""))
+        first = int(first_match.group(1)) if first_match else MAX_PER_PAGE
+        states = variables.get("states")
+
+        data: Dict[str, Optional[Dict[str, Any]]] = {}
+        index = 0
+        while f"owner{index}" in variables:
+            repo_index = self._repo_index(variables[f"owner{index}"], variables[f"name{index}"])
+            if repo_index is None:
+                data[f"repo{index}"] = None
+            else:
+                total = self.server.shape.pull_requests if states is None or "OPEN" in states else 0
+                after = int(variables.get(f"after{index}") or 0)
+                numbers = range(after + 1, min(after + first, total) + 1)
+                data[f"repo{index}"] = {
+                    "pullRequests": {
+                        "pageInfo": {"hasNextPage": after + first < total, "endCursor": str(after + len(numbers))},
+                        "nodes": [self._graphql_pull(repo_index, number) for number in numbers],
+                    }
+                }
+            index += 1
+
+        return 200, {"data": data}, {}
+
+    def _post_discord_message(self, webhook_id: str, webhook_token: str) -> Tuple:
+        allowed, headers = self.server.take_discord_bucket(webhook_id)
+        if not allowed:
+            retry_after = float(headers["X-RateLimit-Reset-After"])
+            return 429, {"message": "You are being rate limited.", "retry_after": retry_after, "global": False}, headers
+
+        return 204, None, headers
+
+    def _post_slack_message(self) -> Tuple:
+        message = json.loads(self.body or b"{}")
+
+        return 200, {"ok": True, "channel": message.get("channel"), "ts": f"{time.time():.6f}"}, {}
+
+    def _benchmark_requests(self) -> Tuple:
+        return 200, dict(self.server.requests), {}
+
+    def _benchmark_reset(self) -> Tuple:
+        return 200, self.server.reset_requests(), {}
+
+    def _owner(self) -> Dict[str, Any]:
+        owner = self.server.shape.owner
+
+        return {
+            "login": owner,
+            "id": 1,
+            "type": "Organization",
+            "url": f"{self.server.base_url}/orgs/{owner}",
+            "html_url": f"https://github.com/{owner}",
+        }
+
+    def _user(self, login: str) -> Dict[str, Any]:
+        return {
+            "login": login,
+            "id": int(hashlib.sha256(login.encode()).hexdigest()[:8], 16),
+            "type": "User",
+            "url": f"{self.server.base_url}/users/{login}",
+            "html_url": f"https://github.com/{login}",
+        }
+
+    def _team(self, slug: str) -> Dict[str, Any]:
+        owner = self.server.shape.owner
+
+        return {
+            "id": 1,
+            "name": slug.title(),
+            "slug": slug,
+            "url": f"{self.server.base_url}/orgs/{owner}/teams/{slug}",
+            "html_url": f"https://github.com/orgs/{owner}/teams/{slug}",
+        }
+
+    def _repo(self, repo_index: int) -> Dict[str, Any]:
+        full_name = f"{self.server.shape.owner}/{_repo_name(repo_index)}"
+
+        return {
+            "id": repo_index + 1,
+            "name": _repo_name(repo_index),
+            "full_name": full_name,
+            "owner": self._owner(),
+            "private": False,
+            "fork": False,
+            "archived": False,
+            "disabled": False,
+            "has_issues": True,
+            "open_issues_count": self.server.shape.pull_requests + self.server.shape.issues,
+            "default_branch": "main",
+            "url": f"{self.server.base_url}/repos/{full_name}",
+            "html_url": f"https://github.com/{full_name}",
+        }
+
+    def _pull(self, repo_index: int, number: int) -> Dict[str, Any]:
+        repo = self._repo(repo_index)
+
+        return {
+            "id": number,
+            "number": number,
+            "title": f"Pull request {number} of {repo['name']}",
+            "body": BODY,
+            "state": "open",
+            "draft": _is_draft(number),
+            "updated_at": _format_datetime(_updated_at(number)),
+            "user": self._user(f"author-{number % 7}"),
+            "base": {"ref": "main", "repo": repo},
+            "labels": _labels(number),
+            "url": f"{repo['url']}/pulls/{number}",
+            "html_url": f"{repo['html_url']}/pull/{number}",
+        }
+
+    def _issue(self, repo_index: int, number: int) -> Dict[str, Any]:
+        repo = self._repo(repo_index)
+        is_pull_request = number <= self.server.shape.pull_requests
+        issue = {
+            "id": number,
+            "number": number,
+            "title": f"{'Pull request' if is_pull_request else 'Issue'} {number} of {repo['name']}",
+            "body": BODY,
+            "state": "open",
+            "updated_at": _format_datetime(_updated_at(number)),
+            "user": self._user(f"author-{number % 7}"),
+            "assignees": [self._user(f"author-{(number + 1) % 7}")],
+            "labels": _labels(number),
+            "repository_url": repo["url"],
+            "url": f"{repo['url']}/issues/{number}",
+            "html_url": f"{repo['html_url']}/{'pull' if is_pull_request else 'issues'}/{number}",
+        }
+        if is_pull_request:
+            issue["draft"] = _is_draft(number)
+            issue["pull_request"] = {
+                "url": f"{repo['url']}/pulls/{number}",
+                "html_url": f"{repo['html_url']}/pull/{number}",
+            }
+
+        return issue
+
+    def _review(self, number: int, index: int) -> Dict[str, Any]:
+        return {
+            "id": number * 1000 + index,
+            "user": self._user(f"reviewer-{index}"),
+            "state": REVIEW_STATES[(number + index) % len(REVIEW_STATES)],
+            "submitted_at": _format_datetime(_updated_at(number)),
+        }
+
+    def _graphql_pull(self, repo_index: int, number: int) -> Dict[str, Any]:
+        pull = self._pull(repo_index, number)
+        reviews = [self._review(number, index) for index in range(self.server.shape.reviews)]
+        _, review_requests, _ = self._list_review_requests(
+            self.server.shape.owner, pull["base"]["repo"]["name"], str(number)
+        )
+
+        return {
+            "number": number,
+            "title": pull["title"],
+            "body": pull["body"],
+            "url": pull["html_url"],
+            "isDraft": pull["draft"],
+            "state": "OPEN",
+            "updatedAt": pull["updated_at"],
+            "author": _graphql_actor(pull["user"]),
+            "baseRepository": {
+                "name": pull["base"]["repo"]["name"],
+                "nameWithOwner": pull["base"]["repo"]["full_name"],
+                "url": pull["base"]["repo"]["html_url"],
+            },
+            "labels": {"nodes": [{"name": label["name"]} for label in pull["labels"]]},
+            "reviewRequests": {
+                "nodes": [
+                    {"requestedReviewer": {"__typename": "User", **_graphql_actor(user)}}
+                    for user in review_requests["users"]
+                ]
+                + [
+                    {
+                        "requestedReviewer": {
+                            "__typename": "Team",
+                            "name": team["name"],
+                            "slug": team["slug"],
+                            "url": team["html_url"],
+                        }
+                    }
+                    for team in review_requests["teams"]
+                ]
+            },
+            "latestReviews": {
+                "nodes": [{"state": review["state"], "author": _graphql_actor(review["user"])} for review in reviews]
+            },
+        }
+
+
+def _repo_name(repo_index: int) -> str:
+    return f"repo-{repo_index:04d}"
+
+
+def _is_draft(number: int) -> bool:
+    return number % DRAFT_EVERY == 0
+
+
+def _labels(number: int) -> List[Dict[str, Any]]:
+    return [{"name": LABELS[number % len(LABELS)]}]
+
+
+def _updated_at(number: int) -> datetime:
+    return UPDATED_AT_START + timedelta(minutes=number)
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _graphql_actor(user: Dict[str, Any]) -> Dict[str, Any]:
+    return {"login": user["login"], "url": user["html_url"]}
+
+
+# Matched in order, each endpoint template is what its requests are counted under
+ROUTES: List[Tuple[str, str, str, Callable[..., Tuple]]] = [
+    ("GET", r"/users/([^/]+)", "/users/{owner}", FakeApiRequestHandler._get_owner),
+    ("GET", r"/orgs/([^/]+)", "/orgs/{owner}", FakeApiRequestHandler._get_owner),
+    ("GET", r"/users/([^/]+)/repos", "/users/{owner}/repos", FakeApiRequestHandler._list_repos),
+    ("GET", r"/orgs/([^/]+)/repos", "/orgs/{owner}/repos", FakeApiRequestHandler._list_repos),
+    ("GET", r"/repos/([^/]+)/([^/]+)", "/repos/{owner}/{repo}", FakeApiRequestHandler._get_repo),
+    ("GET", r"/repos/([^/]+)/([^/]+)/pulls", "/repos/{owner}/{repo}/pulls", FakeApiRequestHandler._list_pulls),
+    ("GET", r"/repos/([^/]+)/([^/]+)/issues", "/repos/{owner}/{repo}/issues", FakeApiRequestHandler._list_issues),
+    (
+        "GET",
+        r"/repos/([^/]+)/([^/]+)/pulls/(\d+)/requested_reviewers",
+        "/repos/{owner}/{repo}/pulls/{number}/requested_reviewers",
+        FakeApiRequestHandler._list_review_requests,
+    ),
+    (
+        "GET",
+        r"/repos/([^/]+)/([^/]+)/pulls/(\d+)/reviews",
+        "/repos/{owner}/{repo}/pulls/{number}/reviews",
+        FakeApiRequestHandler._list_reviews,
+    ),
+    ("GET", r"/search/issues", "/search/issues", FakeApiRequestHandler._search_issues),
+    ("POST", r"/graphql", "/graphql", FakeApiRequestHandler._graphql),
+    (
+        "POST",
+        r"/api/webhooks/([^/]+)/([^/]+)",
+        "/api/webhooks/{id}/{token}",
+        FakeApiRequestHandler._post_discord_message,
+    ),
+    ("POST", r"/api/chat\.postMessage", "/api/chat.postMessage", FakeApiRequestHandler._post_slack_message),
+    ("GET", r"/_benchmark/requests", "/_benchmark/requests", FakeApiRequestHandler._benchmark_requests),
+    ("POST", r"/_benchmark/reset", "/_benchmark/reset", FakeApiRequestHandler._benchmark_reset),
+]
@@ -0,0 +1,53 @@
+from test.benchmark.benchmark import (
+    compare_results,
+    run_benchmark,
+)
+from test.benchmark.fake_api import OrgShape
+
+
+def test_run_benchmark():
+    """Tests that Pullbug runs end to end against the fake API, fetching and sending everything."""
+    results = run_benchmark(OrgShape(repos=2, pull_requests=2, issues=1), runs=2, latency=0)
+
+    requests_by_endpoint = results[0]["requests_by_endpoint"]
+
+    assert requests_by_endpoint["GET /orgs/{owner}/repos"] == 1
+    assert requests_by_endpoint["GET /repos/{owner}/{repo}/pulls"] == 2
+    assert requests_by_endpoint["GET /repos/{owner}/{repo}/issues"] == 2
+    assert requests_by_endpoint["GET /repos/{owner}/{repo}/pulls/{number}/reviews"] == 4
+    assert requests_by_endpoint["POST /api/webhooks/{id}/{token}"] >= 1
+    assert requests_by_endpoint["POST /api/chat.postMessage"] >= 1
+    assert "GET (unknown)" not in requests_by_endpoint
+    # The second run revalidates every GitHub response it cached on the first
+    assert results[1]["cache_hits"] > results[0]["cache_hits"]
+
+
+def test_run_benchmark_graphql():
+    """Tests that the fake API answers the GraphQL fetch engine with every pull request in one query."""
+    results = run_benchmark(OrgShape(repos=2, pull_requests=2, issues=1), latency=0, fetch_engine="graphql")
+
+    requests_by_endpoint = results[0]["requests_by_endpoint"]
+
+    assert requests_by_endpoint["POST /graphql"] == 1
+    assert "GET /repos/{owner}/{repo}/pulls/{number}/reviews" not in requests_by_endpoint
+
+
+def test_compare_results():
+    """Tests that only results worse than the baseline by more than the tolerance are regressions."""
+    baseline = [{"run": 1, "wall_time_s": 1.0, "requests": 100, "peak_rss_mib": 50.0, "peak_traced_mib": None}]
+    results = [{"run": 1, "wall_time_s": 1.1, "requests": 150, "peak_rss_mib": 40.0, "peak_traced_mib": 2.0}]
+
+    changes = compare_results(results, baseline, tolerance=0.2)
+
+    # Metrics either side didn't measure aren't compared
+    assert [change["metric"] for change in changes] == ["wall_time_s", "requests", "peak_rss_mib"]
+    assert [change["metric"] for change in changes if change["regressed"]] == ["requests"]
+    assert changes[1] == {
+        "run": 1,
+        "metric": "requests",
+        "baseline": 100,
+        "value": 150,
+        "change": 0.5,
+        "regressed": True,
+    }
+    assert changes[2]["change"] == -0.2
@@ -1,6 +1,9 @@
+import io
 from unittest.mock import MagicMock
 
 import pytest
+import requests
+from github import Requester
 
 
 @pytest.fixture
@@ -45,8 +48,8 @@ def mock_pull_request(mock_user, mock_repo):
     mock_pull_request.description = "Mock description"
     mock_pull_request.body = "Mock body of a pull request."
     mock_pull_request.html_url = f"https://github.com/{mock_user}/{mock_repo}/pull/1"
-    mock_pull_request.base.repo.name = "mock-repo"
-    mock_pull_request.base.repo.html_url = f"https://github.com/{mock_user}/{mock_repo}"
+    mock_pull_request.repo.name = "mock-repo"
+    mock_pull_request.repo.html_url = f"https://github.com/{mock_user}/{mock_repo}"
 
     return mock_pull_request
 
@@ -62,8 +65,8 @@ def mock_issue(mock_user, mock_repo):
     mock_issue.assignees = [assignee]
     mock_issue.body = "Mock body of an issue."
     mock_issue.html_url = f"https://github.com/{mock_user}/{mock_repo}/issue/1"
-    mock_issue.repository.name = "mock-repo"
-    mock_issue.repository.html_url = f"https://github.com/{mock_user}/{mock_repo}"
+    mock_issue.repo.name = "mock-repo"
+    mock_issue.repo.html_url = f"https://github.com/{mock_user}/{mock_repo}"
 
     return mock_issue
 
@@ -87,3 +90,36 @@ def mock_channel():
     mock_channel = "mock-channel"
 
     return mock_channel
+
+
+@pytest.fixture
+def build_request():
+    def build(url="https://api.github.com/users/justintime50/repos", method="GET"):
+        return requests.Request(method, url, headers={"Authorization": "token 123"}).prepare()
+
+    return build
+
+
+@pytest.fixture
+def build_response():
+    def build(status_code=200, body=b"{}", headers=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers or {})
+        response._content = body
+        response.raw = io.BytesIO(body)
+        response.encoding = "utf-8"
+
+        return response
+
+    return build
+
+
+@pytest.fixture
+def mock_requester():
+    # Each test serves its own responses, eg: via `requestJsonAndCheck` or `graphql_query`
+    mock_requester = MagicMock(spec=Requester.Requester)
+    mock_requester.base_url = "https://api.github.com"
+    mock_requester.per_page = 100
+
+    return mock_requester
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+from unittest.mock import MagicMock
+
+import requests
+
+from pullbug.accounting import (
+    ACCOUNTING_FILENAME,
+    UNTRACKED_PHASE,
+    AccountingAdapter,
+    ApiAccounting,
+    github_endpoint,
+)
+
+
+def test_github_endpoint():
+    """Tests that GitHub URLs are reduced to their endpoint templates."""
+    assert github_endpoint("https://api.github.com/users/justintime50/repos?page=2") == "/users/{owner}/repos"
+    assert (
+        github_endpoint("https://api.github.com/repos/justintime50/pullbug/pulls/12/reviews")
+        == "/repos/{owner}/{repo}/pulls/{number}/reviews"
+    )
+    assert github_endpoint("https://github.example.com/api/v3/orgs/acme/repos") == "/orgs/{owner}/repos"
+    assert github_endpoint("https://api.github.com/search/issues?q=is:pr") == "/search/issues"
+
+
+def test_accounting_phases():
+    """Tests that requests are grouped by the phase they were made in, including on other threads."""
+    accounting = ApiAccounting()
+
+    accounting.record("github", "GET", "/rate_limit", 200, 0.1)
+    with accounting.phase("get_repos"):
+        accounting.record("github", "GET", "/users/{owner}/repos", 200, 0.2)
+
+    record = accounting.in_phase("send_messages", accounting.record)
+    thread = threading.Thread(target=record, args=("slack", "POST", "chat.postMessage", 200, 0.3))
+    thread.start()
+    thread.join()
+
+    phases = accounting.summary()["phases"]
+
+    assert set(phases) == {UNTRACKED_PHASE, "get_repos", "send_messages"}
+    assert phases["send_messages"]["endpoints"][0]["service"] == "slack"
+    assert accounting.current_phase == UNTRACKED_PHASE
+
+
+def test_accounting_summary(tmp_path):
+    """Tests that the summary counts requests, status codes, bytes, and latency percentiles, and is saved."""
+    accounting = ApiAccounting()
+    with accounting.phase("get_pull_requests"):
+        for latency in range(1, 101):
+            accounting.record("github", "GET", "/repos/{owner}/{repo}/pulls", 200, latency / 1000, bytes_received=10)
+        accounting.record("github", "GET", "/repos/{owner}/{repo}/pulls", 304, 0.001, cache_hit=True)
+        accounting.record("github", "GET", "/repos/{owner}/{repo}/pulls", None, 0.001)
+
+    summary = accounting.save(str(tmp_path))
+    endpoint = summary["phases"]["get_pull_requests"]["endpoints"][0]
+
+    assert summary["requests"] == 102
+    assert summary["cache_hits"] == 1
+    assert endpoint["status_codes"] == {"200": 100, "304": 1, "error": 1}
+    assert endpoint["bytes_received"] == 1000
+    assert endpoint["latency_ms"] == {"p50": 49.0, "p90": 90.0, "p99": 99.0, "max": 100.0}
+    with open(os.path.join(tmp_path, ACCOUNTING_FILENAME)) as accounting_file:
+        assert json.load(accounting_file) == summary
+
+    accounting.reset()
+
+    assert accounting.summary()["requests"] == 0
+
+
+def test_accounting_adapter_counts_not_modified_as_cache_hit(build_response):
+    """Tests that the adapter records each request, counting a `304 Not Modified` as a cache hit."""
+    accounting = ApiAccounting()
+    mock_adapter = MagicMock()
+    mock_adapter.send.side_effect = [build_response(), build_response(304, b"")]
+    adapter = AccountingAdapter(mock_adapter, accounting)
+    request = requests.Request("GET", "https://api.github.com/repos/justintime50/pullbug/pulls").prepare()
+
+    adapter.send(request)
+    adapter.send(request)
+
+    endpoint = accounting.summary()["phases"][UNTRACKED_PHASE]["endpoints"][0]
+
+    assert endpoint["endpoint"] == "/repos/{owner}/{repo}/pulls"
+    assert endpoint["requests"] == 2
+    assert endpoint["cache_hits"] == 1
+    assert endpoint["bytes_received"] == 2
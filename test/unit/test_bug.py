@@ -1,11 +1,30 @@
+import io
+import json
+import threading
+from datetime import (
+    datetime,
+    timezone,
+)
 from unittest.mock import (
     MagicMock,
     patch,
 )
 
 import pytest
+import requests
+from github import (
+    GithubException,
+    UnknownObjectException,
+)
 
+from pullbug import (
+    records,
+    state,
+)
 from pullbug.bug import Pullbug
+from pullbug.messages import DeliveryError
+from pullbug.routing import Route
+from pullbug.webhooks import WebhookIndex
 
 
 @patch("pullbug.bug.Pullbug.send_messages")
@@ -39,7 +58,7 @@ def test_run_no_pull_requests(mock_logger, mock_get_repos, mock_pull_request):
 
     mock_get_repos.assert_called_once()
     mock_pull_request.assert_called_once()
-    assert mock_logger.call_count == 4
+    assert mock_logger.call_count == 6
 
 
 @patch("pullbug.bug.Pullbug.send_messages")
@@ -73,7 +92,67 @@ def test_run_no_issues(mock_logger, mock_get_repos, mock_issues):
 
     mock_get_repos.assert_called_once()
     mock_issues.assert_called_once()
-    assert mock_logger.call_count == 4
+    assert mock_logger.call_count == 6
+
+
+def test_estimate_calls():
+    """Tests that the estimate accounts for listing pages and the review requests of each pull request."""
+    repos = [MagicMock(open_issues_count=0), MagicMock(open_issues_count=45)]
+
+    estimated_calls = Pullbug(
+        github_owner="justintime50",
+        pulls=True,
+        issues=True,
+    ).estimate_calls(repos)
+
+    # Pull requests: 1 + 1 pages and 45 * 2 review calls, issues: 1 + 1 pages
+    assert estimated_calls == 2 + 90 + 2
+
+
+@patch("logging.Logger.warning")
+@patch("logging.Logger.info")
+def test_log_estimated_calls_over_budget(mock_logger, mock_warning_logger):
+    """Tests that we warn when a run is expected to need more calls than the rate limit allows."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        issues=True,
+        rate_limit_budget=1,
+    )
+    bug.log_estimated_calls([MagicMock(open_issues_count=500)])
+
+    assert (
+        "~5 GitHub calls (unknown allowed before the rate limit resets, 1 left in the budget of this run)"
+        in (mock_logger.call_args.args[0])
+    )
+    mock_warning_logger.assert_called_once()
+
+
+@patch("logging.Logger.error")
+@patch("logging.Logger.info")
+@patch("pullbug.bug.CronSchedule.next_run", side_effect=lambda after: after)
+@patch("pullbug.bug.Pullbug.run")
+@patch("woodchips.Logger")
+def test_serve(mock_woodchips_logger, mock_run, mock_next_run, mock_logger, mock_error_logger):
+    """Tests that runs keep happening on the schedule, surviving failures, until told to stop."""
+    stop_event = threading.Event()
+
+    def run():
+        if mock_run.call_count == 1:
+            raise GithubException(500, "mock-error")
+        elif mock_run.call_count == 3:
+            stop_event.set()
+
+    mock_run.side_effect = run
+
+    Pullbug(
+        github_owner="justintime50",
+        pulls=True,
+    ).serve(stop_event=stop_event)
+
+    assert mock_run.call_count == 3
+    mock_error_logger.assert_called_once()
+    # The logger is only setup once for the whole process
+    mock_woodchips_logger.assert_called_once()
 
 
 @patch("woodchips.Logger")
@@ -166,10 +245,124 @@ def test_get_repos_orgs(mock_logger, mock_get_org, mock_get_repos, mock_github_i
 
 
 @patch("logging.Logger.info")
-def test_get_pull_requests(mock_logger):
-    pull_requests = Pullbug(
+def test_get_repos_named_repos(mock_logger):
+    """Tests that named repos are requested directly by their exact name instead of listing the owner's repos."""
+    bug = Pullbug(
         github_owner="justintime50",
-    ).get_pull_requests(repos=[MagicMock()])
+        github_context="orgs",
+        repos="Pullbug, harvey,,pullbug",
+    )
+    bug.github_instance = MagicMock()
+    repos = bug.get_repos()
+
+    assert bug.repos == ["pullbug", "harvey"]
+    assert [call.args[0] for call in bug.github_instance.get_repo.call_args_list] == [
+        "justintime50/pullbug",
+        "justintime50/harvey",
+    ]
+    assert len(repos) == 2
+    bug.github_instance.get_organization.assert_not_called()
+
+
+@patch("logging.Logger.info")
+def test_get_repos_no_named_repos(mock_logger):
+    """Tests that every repo of the owner is listed when no repos are named."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        github_context="users",
+    )
+    bug.github_instance = MagicMock()
+    bug.github_instance.get_user.return_value.get_repos.return_value = [MagicMock()]
+    repos = bug.get_repos()
+
+    assert bug.repos == []
+    assert list(repos) == bug.github_instance.get_user.return_value.get_repos.return_value
+    bug.github_instance.get_repo.assert_not_called()
+
+
+def _mock_repo(name, archived=False, disabled=False, fork=False, has_issues=True, open_issues_count=1):
+    repo = MagicMock(
+        archived=archived,
+        disabled=disabled,
+        fork=fork,
+        has_issues=has_issues,
+        open_issues_count=open_issues_count,
+    )
+    repo.name = name
+
+    return repo
+
+
+@pytest.mark.parametrize(
+    "include_forks, include_archived, github_state, expected_repos",
+    [
+        (False, False, "open", ["mock-repo"]),
+        (True, True, "open", ["mock-repo", "mock-fork", "mock-archived"]),
+        (False, False, "all", ["mock-repo", "mock-empty"]),
+    ],
+)
+@patch("logging.Logger.info")
+def test_filter_repos(mock_logger, include_forks, include_archived, github_state, expected_repos):
+    """Tests that repos which can't have anything to bug about are skipped without any requests."""
+    repos = [
+        _mock_repo("mock-repo"),
+        _mock_repo("mock-fork", fork=True),
+        _mock_repo("mock-archived", archived=True),
+        _mock_repo("mock-disabled", disabled=True),
+        _mock_repo("mock-empty", open_issues_count=0),
+    ]
+
+    filtered_repos = Pullbug(
+        github_owner="justintime50",
+        github_state=github_state,
+        pulls=True,
+        include_forks=include_forks,
+        include_archived=include_archived,
+    ).filter_repos(repos)
+
+    assert [repo.name for repo in filtered_repos] == expected_repos
+    mock_logger.assert_called_once()
+
+
+@patch("logging.Logger.info")
+def test_get_issues_skips_repos_without_issues(mock_logger):
+    """Tests that repos with issues turned off aren't asked for their issues."""
+    repo = _mock_repo("mock-repo", has_issues=False)
+
+    issues = list(
+        Pullbug(
+            github_owner="justintime50",
+        ).get_issues(repos=[repo])
+    )
+
+    assert issues == []
+    repo.get_issues.assert_not_called()
+
+
+@patch("logging.Logger.critical")
+@patch("logging.Logger.info")
+def test_get_repos_unknown_repo(mock_logger, mock_critical_logger):
+    """Tests that a clear error is raised when a named repo doesn't exist."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        repos="does-not-exist",
+    )
+    bug.github_instance = MagicMock()
+    bug.github_instance.get_repo.side_effect = UnknownObjectException(404, "Not Found")
+
+    with pytest.raises(ValueError, match="justintime50/does-not-exist does not exist"):
+        bug.get_repos()
+
+    mock_critical_logger.assert_called_once()
+
+
+@patch("logging.Logger.info")
+def test_get_pull_requests(mock_logger):
+    pull_requests = list(
+        Pullbug(
+            github_owner="justintime50",
+        ).get_pull_requests(repos=[MagicMock()])
+    )
 
     assert isinstance(pull_requests, list)
     mock_logger.call_count == 2
@@ -177,64 +370,451 @@ def test_get_pull_requests(mock_logger):
 
 
 @patch("logging.Logger.info")
-def test_get_issues(mock_logger):
-    issues = Pullbug(
+def test_get_pull_requests_keeps_repo_order(mock_logger):
+    """Tests that pull requests fetched concurrently are returned in the order of their repos."""
+    repos = []
+    for index in range(20):
+        repo = MagicMock()
+        repo.get_pulls.return_value = [_mock_pull_request(index, 1)]
+        repos.append(repo)
+
+    pull_requests = list(
+        Pullbug(
+            github_owner="justintime50",
+            workers=4,
+        ).get_pull_requests(repos=repos)
+    )
+
+    assert [pull_request.number for pull_request in pull_requests] == list(range(20))
+    for repo in repos:
+        repo.get_pulls.assert_called_once_with(state="open")
+
+
+@patch("logging.Logger.info")
+def test_get_pull_requests_raises_first_error(mock_logger):
+    """Tests that an error from any worker stops the fetch and is raised to the caller."""
+    failing_repo = MagicMock()
+    failing_repo.get_pulls.side_effect = GithubException(500, "mock-error")
+
+    with pytest.raises(GithubException):
+        list(
+            Pullbug(
+                github_owner="justintime50",
+            ).get_pull_requests(repos=[MagicMock(), failing_repo, MagicMock()])
+        )
+
+
+def test_stream_concurrently_fetches_a_bounded_number_ahead():
+    """Tests that only a bounded number of items are fetched ahead of what's been consumed."""
+    items_taken = []
+
+    def items():
+        for index in range(100):
+            items_taken.append(index)
+            yield index
+
+    results = Pullbug(
         github_owner="justintime50",
-    ).get_issues(repos=[MagicMock()])
+        workers=2,
+    )._stream_concurrently(lambda item: item * 2, items())
+
+    assert next(results) == 0
+    assert len(items_taken) == 5
+    assert list(results) == [index * 2 for index in range(1, 100)]
+
+
+@patch("pullbug.bug.graphql.get_pull_requests")
+@patch("logging.Logger.info")
+def test_get_pull_requests_graphql(mock_logger, mock_get_graphql_pull_requests):
+    """Tests that the GraphQL engine batches repos and keeps review data aside for building messages."""
+    repos = []
+    for index in range(12):
+        repo = MagicMock()
+        repo.full_name = f"justintime50/repo-{index}"
+        repos.append(repo)
+    pull_request = MagicMock(draft=False)
+    graphql_pull_request = MagicMock(pull_request=pull_request)
+    mock_get_graphql_pull_requests.side_effect = [[[graphql_pull_request]] + [[]] * 9, [[], []]]
+
+    bug = Pullbug(
+        github_owner="justintime50",
+        github_token="123",
+        fetch_engine="graphql",
+    )
+    pull_requests = list(bug.get_pull_requests(repos=repos))
+
+    assert pull_requests == [pull_request]
+    assert mock_get_graphql_pull_requests.call_count == 2
+    assert len(mock_get_graphql_pull_requests.call_args_list[0].args[1]) == 10
+    assert mock_get_graphql_pull_requests.call_args_list[1].args[1] == ["justintime50/repo-10", "justintime50/repo-11"]
+    for repo in repos:
+        repo.get_pulls.assert_not_called()
+
+    # Review data comes from the GraphQL response rather than the REST API
+    assert bug.get_review_requests(pull_request) == graphql_pull_request.reviewers
+    assert bug.get_pull_request_reviews(pull_request) == graphql_pull_request.reviews_by_category
+    pull_request.get_review_requests.assert_not_called()
+    pull_request.get_reviews.assert_not_called()
+
+
+@patch("pullbug.bug.graphql.get_pull_requests")
+@patch("logging.Logger.info")
+def test_get_pull_requests_graphql_skips_draft_reviews(mock_logger, mock_get_graphql_pull_requests):
+    """Tests that the review data of drafts isn't kept aside when drafts are excluded, nothing would let go of it."""
+    repo = MagicMock()
+    repo.full_name = "justintime50/pullbug"
+    draft = MagicMock(pull_request=MagicMock(draft=True, html_url="mock-draft"))
+    ready = MagicMock(pull_request=MagicMock(draft=False, html_url="mock-ready"))
+    mock_get_graphql_pull_requests.return_value = [[draft, ready]]
+
+    bug = Pullbug(
+        github_owner="justintime50",
+        github_token="123",
+        fetch_engine="graphql",
+    )
+    pull_requests = list(bug.get_pull_requests(repos=[repo]))
+
+    assert pull_requests == [draft.pull_request, ready.pull_request]
+    assert list(bug._prefetched_reviews) == ["mock-ready"]
+
+
+def _mock_pull_request(number, updated_day, state="open"):
+    pull_request = MagicMock()
+    pull_request.number = number
+    pull_request.title = f"mock-pull-request-{number}"
+    pull_request.body = "Mock body."
+    pull_request.html_url = f"https://github.com/justintime50/mock-repo/pull/{number}"
+    pull_request.url = f"https://api.github.com/repos/justintime50/mock-repo/pulls/{number}"
+    pull_request.state = state
+    pull_request.draft = False
+    pull_request.updated_at = datetime(2024, 1, updated_day, tzinfo=timezone.utc)
+    pull_request.user.login = "mock-user"
+    pull_request.user.html_url = "https://github.com/mock-user"
+    pull_request.base.repo.name = "mock-repo"
+    pull_request.base.repo.full_name = "justintime50/mock-repo"
+    pull_request.base.repo.html_url = "https://github.com/justintime50/mock-repo"
+
+    return pull_request
+
+
+@patch("logging.Logger.info")
+def test_get_pull_requests_incremental(mock_logger, tmp_path):
+    """Tests that only pull requests updated since the last run are requested and merged into the state."""
+    repo = MagicMock()
+    repo.full_name = "justintime50/mock-repo"
+    repo.get_pulls.return_value = [_mock_pull_request(2, 2), _mock_pull_request(1, 1)]
+
+    first_bug = Pullbug(github_owner="justintime50", location=str(tmp_path), incremental=True)
+    list(first_bug.get_pull_requests([repo]))
+    first_bug.sync_state.save()
+    repo.get_pulls.assert_called_once_with(state="open")
+
+    # Pull request 2 was closed and 3 was opened, pull request 1 stops the listing as it hasn't changed
+    repo.get_pulls.reset_mock()
+    repo.get_pulls.return_value = [
+        _mock_pull_request(3, 4),
+        _mock_pull_request(2, 3, state="closed"),
+        _mock_pull_request(1, 1),
+        _mock_pull_request(0, 1),
+    ]
+    bug = Pullbug(github_owner="justintime50", location=str(tmp_path), incremental=True)
+    pull_requests = list(bug.get_pull_requests([repo]))
+
+    repo.get_pulls.assert_called_once_with(state="all", sort="updated", direction="desc")
+    assert [pull_request.number for pull_request in pull_requests] == [3, 1]
+    assert pull_requests[1].title == "mock-pull-request-1"
+    assert pull_requests[1].repo.full_name == "justintime50/mock-repo"
+    assert bug.sync_state.get_section("justintime50/mock-repo", "pulls")["watermark"] == "2024-01-04T00:00:00+00:00"
+
+
+def test_get_pull_request_reviews_incremental(tmp_path):
+    """Tests that the reviews of an unchanged pull request are reused from the state."""
+    bug = Pullbug(github_owner="justintime50", location=str(tmp_path), incremental=True)
+    bug.sync_state.set_section(
+        "justintime50/mock-repo",
+        "pulls",
+        {"github_state": "open", "watermark": None, "items": {"1": {"attributes": {}}}},
+    )
+    pull_request = records.from_pull_request(_mock_pull_request(1, 1))
+    review = MagicMock(state="APPROVED")
+    review.user.login = "mock-reviewer"
+    review.user.html_url = "https://github.com/mock-reviewer"
+
+    with patch("github.PullRequest.PullRequest.get_reviews", return_value=[review]) as mock_get_reviews:
+        bug.get_pull_request_reviews(pull_request)
+        reviews_by_category = bug.get_pull_request_reviews(pull_request)
+
+    mock_get_reviews.assert_called_once()
+    assert [user.login for user in reviews_by_category["users_who_approved"]] == ["mock-reviewer"]
+
+
+@patch("pullbug.bug.search.get_pull_requests")
+@patch("logging.Logger.info")
+def test_get_pull_requests_search(mock_logger, mock_search_pull_requests):
+    """Tests that the search engine finds pull requests across the owner without using the repos."""
+    pull_request = MagicMock()
+    mock_search_pull_requests.return_value = [pull_request]
+
+    pull_requests = list(
+        Pullbug(
+            github_owner="justintime50",
+            github_context="orgs",
+            fetch_engine="search",
+        ).get_pull_requests(repos=[])
+    )
+
+    assert pull_requests == [pull_request]
+    assert mock_search_pull_requests.call_args.args[1] == "org:justintime50 is:pr is:open draft:false archived:false"
+
+
+@patch("pullbug.bug.Pullbug.send_messages")
+@patch("pullbug.bug.search.get_issues", return_value=[])
+@patch("pullbug.bug.Pullbug.get_repos")
+@patch("logging.Logger.info")
+def test_run_search_skips_repos(mock_logger, mock_get_repos, mock_search_issues, mock_send_messages):
+    """Tests that the search engine doesn't list the owner's repos."""
+    Pullbug(
+        github_owner="justintime50",
+        issues=True,
+        fetch_engine="search",
+    ).run()
+
+    mock_get_repos.assert_not_called()
+    assert mock_search_issues.call_args.args[1] == "user:justintime50 is:issue is:open archived:false"
+
+
+@patch("logging.Logger.info")
+def test_get_issues(mock_logger):
+    issues = list(
+        Pullbug(
+            github_owner="justintime50",
+        ).get_issues(repos=[MagicMock()])
+    )
 
     assert isinstance(issues, list)
     mock_logger.call_count == 2
     # TODO: Assert and mock that `get_pulls` gets called
 
 
-@patch("pullbug.bug.prepare_pulls_message", return_value=([], []))
-def test_iterate_pull_requests(mock_prepare_pulls_message):
-    slack_messages, discord_messages = Pullbug(
+@patch("pullbug.bug.prepare_pulls_message", return_value={"slack": "slack-message", "discord": "discord-message"})
+@patch("pullbug.bug.Pullbug.get_pull_request_reviews")
+@patch("pullbug.bug.Pullbug.get_review_requests")
+def test_iterate_routed_pull_requests(
+    mock_get_review_requests, mock_get_pull_request_reviews, mock_prepare_pulls_message
+):
+    messages = Pullbug(
         github_owner="justintime50",
         drafts=True,  # Lazy approach but keeps us from needing to build the MagicMock object below
-    ).iterate_pull_requests(pull_requests=[MagicMock()])
+    ).iterate_routed_pull_requests(pull_requests=[MagicMock()])
 
-    assert isinstance(slack_messages, list)
-    assert isinstance(discord_messages, list)
+    assert list(messages) == [({"slack": "slack-message", "discord": "discord-message"}, ())]
     mock_prepare_pulls_message.assert_called_once()
 
 
-@patch("pullbug.bug.prepare_issues_message", return_value=([], []))
-def test_iterate_issues(mock_prepare_issues_message):
-    slack_messages, discord_messages = Pullbug(
+@patch("pullbug.bug.prepare_issues_message", return_value={"slack": "slack-message", "discord": "discord-message"})
+def test_iterate_routed_issues(mock_prepare_issues_message):
+    messages = Pullbug(
         github_owner="justintime50",
-    ).iterate_issues(issues=[MagicMock()])
+    ).iterate_routed_issues(issues=[MagicMock()])
 
-    assert isinstance(slack_messages, list)
-    assert isinstance(discord_messages, list)
+    assert list(messages) == [({"slack": "slack-message", "discord": "discord-message"}, ())]
     mock_prepare_issues_message.assert_called_once()
 
 
-@patch("pullbug.bug.send_discord_message")
-def test_send_messages_discord(mock_send_discord_message, mock_url):
-    slack_messages = discord_messages = []
-
-    Pullbug(
+@patch("pullbug.bug.DiscordSender")
+def test_send_messages_discord(mock_discord_sender, mock_url):
+    bug = Pullbug(
         github_owner="justintime50",
         discord=True,
         discord_url=mock_url,
-    ).send_messages(slack_messages, discord_messages)
-
-    mock_send_discord_message.assert_called_once_with(slack_messages, mock_url)
+    )
+    bug.send_messages([("slack-message", "discord-message")])
 
+    mock_discord_sender.assert_called_once_with(mock_url, bug.accounting, bug.transport)
+    mock_discord_sender.return_value.add.assert_called_once_with("discord-message")
+    mock_discord_sender.return_value.close.assert_called_once()
 
-@patch("pullbug.bug.send_slack_message")
-def test_send_messages_slack(mock_send_slack_message, mock_token, mock_channel):
-    slack_messages = discord_messages = []
 
-    Pullbug(
+@patch("pullbug.bug.SlackSender")
+def test_send_messages_slack(mock_slack_sender, mock_token, mock_channel):
+    bug = Pullbug(
         github_owner="justintime50",
         slack=True,
         slack_token=mock_token,
         slack_channel=mock_channel,
-    ).send_messages(slack_messages, discord_messages)
+    )
+    bug.send_messages([("slack-message", "discord-message")])
+
+    mock_slack_sender.assert_called_once_with(mock_token, mock_channel, bug.accounting, bug.transport)
+    mock_slack_sender.return_value.add.assert_called_once_with("slack-message")
+    mock_slack_sender.return_value.close.assert_called_once()
+
+
+@patch("pullbug.bug.Pullbug.get_issues")
+@patch("pullbug.bug.Pullbug.get_repos")
+@patch("logging.Logger.info")
+def test_run_streams_messages(mock_logger, mock_get_repos, mock_get_issues):
+    """Tests that messages are sent while the issues are still being fetched."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        issues=True,
+        discord=True,
+        discord_url="https://discord.com/api/webhooks/mock",
+    )
+    first_post_sent = threading.Event()
+    sent_before_exhausted = []
 
-    mock_send_slack_message.assert_called_once_with(slack_messages, mock_token, mock_channel)
+    def mock_issues(repos):
+        for index in range(20):
+            yield MagicMock(body="", assignees=[], title=f"mock-issue-{index}")
+        sent_before_exhausted.append(first_post_sent.wait(timeout=5))
+
+    mock_get_issues.side_effect = mock_issues
+
+    def mock_post_message(*args, **kwargs):
+        first_post_sent.set()
+        return MagicMock(status_code=204, headers={}, content=b"")
+
+    with patch("requests.Session.post", side_effect=mock_post_message) as mock_post:
+        bug.run()
+
+    # The first issues filled a post before the last of the issues was fetched
+    assert sent_before_exhausted == [True]
+    assert mock_post.call_count == 3
+
+
+@patch("logging.Logger.info")
+@patch("pullbug.bug.SlackSender")
+@patch("pullbug.bug.DiscordSender")
+def test_send_messages_every_platform(mock_discord_sender, mock_slack_sender, mock_logger, mock_url, mock_token):
+    """Tests that messages are delivered to every platform requested."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        discord=True,
+        discord_url=mock_url,
+        slack=True,
+        slack_token=mock_token,
+        slack_channel="mock-channel",
+    )
+    bug.send_messages([("slack-message", "discord-message")])
+
+    mock_discord_sender.return_value.add.assert_called_once_with("discord-message")
+    mock_discord_sender.return_value.close.assert_called_once()
+    mock_slack_sender.return_value.add.assert_called_once_with("slack-message")
+    mock_slack_sender.return_value.close.assert_called_once()
+
+
+@patch("logging.Logger.error")
+@patch("logging.Logger.info")
+@patch("pullbug.bug.SlackSender")
+@patch("pullbug.bug.DiscordSender")
+@patch("pullbug.bug.Pullbug.get_issues", return_value=[])
+@patch("pullbug.bug.Pullbug.get_pull_requests", return_value=[])
+@patch("pullbug.bug.Pullbug.get_repos")
+def test_run_delivers_despite_failed_platform(
+    mock_get_repos,
+    mock_get_pull_requests,
+    mock_get_issues,
+    mock_discord_sender,
+    mock_slack_sender,
+    mock_logger,
+    mock_error_logger,
+    mock_url,
+    mock_token,
+):
+    """Tests that a messaging platform failing doesn't stop the others, and that the run reports it once done."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        pulls=True,
+        issues=True,
+        discord=True,
+        discord_url=mock_url,
+        slack=True,
+        slack_token=mock_token,
+        slack_channel="mock-channel",
+    )
+    mock_discord_sender.return_value.add.side_effect = requests.exceptions.RequestException("mock-error")
+    mock_discord_sender.return_value.platform = "Discord"
+    mock_discord_sender.return_value.posts_sent = 0
+    mock_slack_sender.return_value.platform = "Slack"
+    mock_slack_sender.return_value.posts_sent = 2
+
+    with pytest.raises(DeliveryError) as error:
+        bug.run()
+
+    assert list(error.value.errors) == ["discord"]
+    # Discord is given up on after its first failure, Slack gets both digests
+    assert mock_discord_sender.return_value.add.call_count == 1
+    assert mock_slack_sender.return_value.add.call_count == 2
+    mock_slack_sender.return_value.close.assert_called_once()
+    mock_error_logger.assert_called_once_with("Discord: 0 posts sent before failing: mock-error")
+    mock_logger.assert_any_call("Slack: 2 posts sent.")
+
+
+@patch("pullbug.bug.Pullbug.send_messages")
+@patch("pullbug.bug.Pullbug.get_issues")
+@patch("pullbug.bug.Pullbug.get_pull_requests")
+@patch("pullbug.bug.Pullbug.get_repos")
+@patch("logging.Logger.info")
+def test_run_fetches_issues_alongside_pull_requests(
+    mock_logger, mock_get_repos, mock_get_pull_requests, mock_get_issues, mock_send_messages
+):
+    """Tests that issues are fetched while the pull requests are still being fetched, and sent after them."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        pulls=True,
+        issues=True,
+    )
+    issues_started = threading.Event()
+
+    def mock_pull_requests(repos):
+        assert issues_started.wait(timeout=5)
+        return []
+
+    def mock_issues(repos):
+        issues_started.set()
+        yield MagicMock(body="", assignees=[], title="mock-issue")
+
+    mock_get_pull_requests.side_effect = mock_pull_requests
+    mock_get_issues.side_effect = mock_issues
+
+    bug.run()
+
+    pull_messages, issue_messages = [list(call.args[0]) for call in mock_send_messages.call_args_list]
+    assert "no ready pull requests" in pull_messages[0][0]
+    assert "mock-issue" in issue_messages[1][0]
+
+
+@patch("pullbug.bug.Pullbug.send_messages")
+@patch("pullbug.bug.Pullbug.get_issues")
+@patch("pullbug.bug.Pullbug.get_pull_requests", side_effect=ValueError("mock-error"))
+@patch("pullbug.bug.Pullbug.get_repos")
+@patch("logging.Logger.info")
+def test_run_stops_fetching_issues_when_pull_requests_fail(
+    mock_logger, mock_get_repos, mock_get_pull_requests, mock_get_issues, mock_send_messages
+):
+    """Tests that issues stop being fetched in the background once the run fails, however many are left."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        pulls=True,
+        issues=True,
+    )
+    issues_stopped = threading.Event()
+
+    def mock_issues(repos):
+        try:
+            while True:
+                yield MagicMock(body="", assignees=[], title="mock-issue")
+        finally:
+            issues_stopped.set()
+
+    mock_get_issues.side_effect = mock_issues
+
+    with pytest.raises(ValueError):
+        bug.run()
+
+    assert issues_stopped.wait(timeout=5)
+    mock_send_messages.assert_not_called()
 
 
 @patch("pullbug.bug.Pullbug.send_messages")
@@ -256,3 +836,242 @@ def test_no_messages_when_quiet(mock_logger, mock_get_repos, mock_pull_request,
     mock_pull_request.assert_called_once()
     mock_logger.assert_called()
     mock_send_messages.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "repository, include_forks, expected",
+    [
+        ({"full_name": "justintime50/pullbug"}, False, True),
+        ({"full_name": "justintime50/harvey"}, False, False),
+        ({"full_name": "octocat/pullbug"}, False, False),
+        ({"full_name": "justintime50/pullbug", "fork": True}, False, False),
+        ({"full_name": "justintime50/pullbug", "fork": True}, True, True),
+        ({"full_name": "justintime50/pullbug", "archived": True}, False, False),
+        ({"full_name": "justintime50/pullbug", "disabled": True}, True, False),
+    ],
+)
+def test_is_bugged_repo(repository, include_forks, expected):
+    """Tests that webhook deliveries are filtered by owner and repos, and like `filter_repos` otherwise."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        repos="pullbug",
+        include_forks=include_forks,
+    )
+
+    assert bug._is_bugged_repo(repository) is expected
+
+
+@patch("pullbug.bug.Pullbug.filter_repos", side_effect=lambda repos: repos)
+@patch("pullbug.bug.Pullbug.get_repos", return_value=[MagicMock(open_issues_count=1)])
+@patch("logging.Logger.info")
+def test_run_webhook_index(mock_logger, mock_get_repos, mock_filter_repos):
+    """Tests that runs reconcile the webhook index by polling GitHub and otherwise render from it alone."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        pulls=True,
+        discord=True,
+        discord_url="https://discord.com/api/webhooks/mock",
+    )
+    bug.webhook_index = WebhookIndex()
+    bug.reconcile_every = 1
+    repository = {
+        "name": "pullbug",
+        "full_name": "justintime50/pullbug",
+        "html_url": "https://github.com/justintime50/pullbug",
+    }
+    user = {"id": 1, "login": "justintime50", "html_url": "https://github.com/justintime50"}
+    pull_request = state.to_pull_request(
+        {
+            "number": 1,
+            "title": "mock-title",
+            "body": "",
+            "html_url": "https://github.com/justintime50/pullbug/pull/1",
+            "url": "https://api.github.com/repos/justintime50/pullbug/pulls/1",
+            "draft": False,
+            "state": "open",
+            "updated_at": "2024-01-01T00:00:00+00:00",
+            "user": user,
+            "base": {"repo": repository},
+        },
+    )
+    reviews_by_category = {
+        "users_who_approved": [state.to_user(user)],
+        "users_who_requested_changes": [],
+        "users_who_were_dismissed": [],
+    }
+    sent_messages = []
+
+    def mock_send_messages(messages):
+        sent_messages.append([discord_message for _, discord_message in messages])
+
+    with patch("pullbug.bug.Pullbug.send_messages", side_effect=mock_send_messages):
+        # The index hasn't been filled yet, so the first run polls GitHub
+        with (
+            patch("pullbug.bug.Pullbug._get_repo_pull_requests", return_value=[pull_request]),
+            patch("pullbug.bug.Pullbug.get_review_requests", return_value=[]),
+            patch("pullbug.bug.Pullbug.get_pull_request_reviews", return_value=reviews_by_category),
+        ):
+            bug.run()
+        assert mock_get_repos.call_count == 1
+
+        # Rendering from the index never touches GitHub
+        with patch("github.Requester.Requester.requestJsonAndCheck", side_effect=AssertionError):
+            bug.run()
+        assert mock_get_repos.call_count == 1
+        assert sent_messages[0] == sent_messages[1]
+        assert "mock-title" in sent_messages[1][1]
+
+        # Every `reconcile_every` runs, GitHub is polled again
+        with patch("pullbug.bug.Pullbug._get_repo_pull_requests", return_value=[]):
+            bug.run()
+
+    assert mock_get_repos.call_count == 2
+    assert bug.webhook_index.pull_requests() == []
+
+
+def _pull_request_record(number, repo_name, labels=()):
+    return records.PullRequestRecord(
+        number=number,
+        title=f"mock-title-{number}",
+        body=None,
+        html_url=f"https://github.com/justintime50/{repo_name}/pull/{number}",
+        url=f"https://api.github.com/repos/justintime50/{repo_name}/pulls/{number}",
+        draft=False,
+        state="open",
+        updated_at=None,
+        user=records.UserRecord(login="mock-user", html_url="https://github.com/mock-user"),
+        repo=records.RepoRecord(
+            name=repo_name,
+            full_name=f"justintime50/{repo_name}",
+            html_url=f"https://github.com/justintime50/{repo_name}",
+        ),
+        labels=labels,
+    )
+
+
+@patch("pullbug.bug.Pullbug.get_pull_request_reviews")
+@patch("pullbug.bug.Pullbug.get_review_requests", return_value=[])
+@patch("pullbug.bug.DiscordSender")
+@patch("pullbug.bug.Pullbug.get_pull_requests")
+@patch("pullbug.bug.Pullbug.get_repos")
+@patch("logging.Logger.info")
+def test_run_routes_digests(
+    mock_logger,
+    mock_get_repos,
+    mock_get_pull_requests,
+    mock_discord_sender,
+    mock_get_review_requests,
+    mock_get_pull_request_reviews,
+):
+    """Tests that each route gets a digest of the pull requests it matched, built from the same fetched data."""
+    senders = {}
+    mock_discord_sender.side_effect = lambda url, *args: senders.setdefault(
+        url, MagicMock(platform="Discord", posts_sent=1)
+    )
+    mock_get_pull_requests.return_value = [
+        _pull_request_record(1, "api-server", labels=("bug",)),
+        _pull_request_record(2, "website", labels=("Documentation",)),
+    ]
+    mock_get_pull_request_reviews.return_value = {
+        "users_who_approved": [],
+        "users_who_requested_changes": [],
+        "users_who_were_dismissed": [],
+    }
+    bug = Pullbug(
+        github_owner="justintime50",
+        pulls=True,
+        discord=True,
+        discord_url="mock-everything",
+        routes=[
+            Route(name="api", discord_url="mock-api", repos=("api-*",)),
+            Route(name="docs", discord_url="mock-docs", labels=("documentation",)),
+            Route(name="security", discord_url="mock-security", team_reviewers=("security",)),
+        ],
+    )
+
+    bug.run()
+
+    def digest(url):
+        return [call.args[0] for call in senders[url].add.call_args_list]
+
+    assert len(digest("mock-everything")) == 3
+    assert "still need your help" in digest("mock-api")[0]
+    assert "mock-title-1" in digest("mock-api")[1] and len(digest("mock-api")) == 2
+    assert "mock-title-2" in digest("mock-docs")[1] and len(digest("mock-docs")) == 2
+    assert "no ready pull requests" in digest("mock-security")[0] and len(digest("mock-security")) == 1
+    # Routing doesn't request any more of GitHub than the digest of everything does
+    assert mock_get_review_requests.call_count == 2
+    mock_logger.assert_any_call("Discord (api): 1 posts sent.")
+
+
+@pytest.mark.parametrize(
+    "settings, expected_formats",
+    [
+        ({}, ("slack",)),
+        ({"discord": True}, ("discord",)),
+        ({"discord": True, "slack": True}, ("discord", "slack")),
+        ({"routes": [Route(name="mock-route", slack_channel="mock-channel")], "discord": True}, ("discord", "slack")),
+    ],
+)
+def test_message_formats(settings, expected_formats):
+    """Tests that messages are only rendered in the formats of the platforms sent to, and Slack's for logging."""
+    assert Pullbug(github_owner="justintime50", **settings)._message_formats() == expected_formats
+
+
+@patch("pullbug.bug.Pullbug.send_messages")
+@patch("pullbug.bug.Pullbug.get_pull_request_reviews")
+@patch("pullbug.bug.Pullbug.get_review_requests", return_value=[])
+@patch("pullbug.bug.Pullbug.get_pull_requests")
+@patch("pullbug.bug.Pullbug.get_repos")
+@patch("logging.Logger.info")
+def test_run_output_format(
+    mock_logger,
+    mock_get_repos,
+    mock_get_pull_requests,
+    mock_get_review_requests,
+    mock_get_pull_request_reviews,
+    mock_send_messages,
+):
+    """Tests that each pull request is also written to the output in the `output_format`, besides being sent."""
+    mock_get_pull_requests.return_value = [_pull_request_record(1, "pullbug"), _pull_request_record(2, "pullbug")]
+    mock_get_pull_request_reviews.return_value = {
+        "users_who_approved": [],
+        "users_who_requested_changes": [],
+        "users_who_were_dismissed": [],
+    }
+    bug = Pullbug(github_owner="justintime50", pulls=True, output_format="json")
+    bug.output = io.StringIO()
+    sent = []
+    mock_send_messages.side_effect = sent.extend
+
+    bug.run()
+
+    written = [json.loads(line) for line in bug.output.getvalue().splitlines()]
+    assert [item["kind"] for item in written] == ["pull_request", "pull_request"]
+    assert [item["title"] for item in written] == ["mock-title-1", "mock-title-2"]
+    assert all("mock-title" in slack_message for slack_message, _ in sent[1:])
+
+
+@patch("pullbug.bug.Pullbug._request_teams")
+@patch("pullbug.bug.Pullbug.get_pull_request_reviews")
+@patch("pullbug.bug.Pullbug.get_review_requests")
+def test_prepare_pull_request_message_team_links(
+    mock_get_review_requests, mock_get_pull_request_reviews, mock_request_teams, tmp_path
+):
+    """Tests that teams requested without their URL are linked from one lookup of their owner's teams."""
+    team_url = "https://github.com/orgs/justintime50/teams/security"
+    mock_get_review_requests.return_value = [records.TeamRecord(name="Security", slug="security")]
+    mock_get_pull_request_reviews.return_value = {
+        "users_who_approved": [],
+        "users_who_requested_changes": [],
+        "users_who_were_dismissed": [],
+    }
+    mock_request_teams.return_value = [records.TeamRecord(name="Security", slug="security", html_url=team_url)]
+    bug = Pullbug(github_owner="justintime50", location=str(tmp_path), slack_token="123", slack_channel="mock-channel")
+
+    slack_messages = [
+        bug._prepare_pull_request_message(_pull_request_record(number, "api-server"))["slack"] for number in (1, 2)
+    ]
+
+    mock_request_teams.assert_called_once_with("justintime50")
+    assert all(f"<{team_url}|Security>" in slack_message for slack_message in slack_messages)
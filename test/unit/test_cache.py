@@ -0,0 +1,99 @@
+import os
+from unittest.mock import MagicMock
+
+from pullbug.bug import Pullbug
+from pullbug.cache import (
+    CACHE_HIT_HEADER,
+    CachingAdapter,
+    ResponseCache,
+)
+
+
+def _github_adapter(bug):
+    return bug.github_instance.requester._Requester__createConnection().session.get_adapter("https://")
+
+
+def test_caching_adapter_revalidates(tmp_path, build_request, build_response):
+    """Tests that cached responses are requested conditionally and rebuilt from the cache on `304`."""
+    inner_adapter = MagicMock()
+    inner_adapter.send.side_effect = [
+        build_response(200, b'[{"name": "mock-repo"}]', {"ETag": '"abc"', "Link": "<next>; rel=next"}),
+        build_response(304, b"", {"ETag": '"abc"', "X-RateLimit-Remaining": "4999"}),
+    ]
+    adapter = CachingAdapter(inner_adapter, ResponseCache(str(tmp_path)))
+
+    first_response = adapter.send(build_request())
+    second_request = build_request()
+    second_response = adapter.send(second_request)
+
+    assert first_response.status_code == 200
+    assert second_request.headers["If-None-Match"] == '"abc"'
+    assert second_response.status_code == 200
+    assert second_response.json() == [{"name": "mock-repo"}]
+    assert second_response.headers["Link"] == "<next>; rel=next"
+    assert second_response.headers["X-RateLimit-Remaining"] == "4999"
+    assert second_response.headers[CACHE_HIT_HEADER] == "HIT"
+
+
+def test_caching_adapter_skips_uncacheable_requests(tmp_path, build_request, build_response):
+    """Tests that writes and responses without validators never touch the cache."""
+    inner_adapter = MagicMock()
+    inner_adapter.send.return_value = build_response(200, b"{}")
+    adapter = CachingAdapter(inner_adapter, ResponseCache(str(tmp_path)))
+
+    adapter.send(build_request(method="POST"))
+    adapter.send(build_request())
+    request = build_request()
+    adapter.send(request)
+
+    assert "If-None-Match" not in request.headers
+    assert os.listdir(tmp_path) == []
+
+
+def test_response_cache_keys_by_token(tmp_path, build_request):
+    """Tests that responses cached for one token are never served to another."""
+    cache = ResponseCache(str(tmp_path))
+    other_request = build_request()
+    other_request.headers["Authorization"] = "token 456"
+
+    assert cache.key(build_request()) != cache.key(other_request)
+    assert "123" not in cache.key(build_request())
+
+
+def test_response_cache_evicts_least_recently_used(tmp_path):
+    """Tests that the least recently used responses are evicted once over the size limit."""
+    cache = ResponseCache(str(tmp_path), max_bytes=150)
+    cache.set("first", {"body": "a" * 50})
+    cache.set("second", {"body": "b" * 50})
+    cache.get("first")
+    cache.set("third", {"body": "c" * 50})
+
+    assert cache.get("second") is None
+    assert cache.get("first") == {"body": "a" * 50}
+    assert cache.get("third") == {"body": "c" * 50}
+    assert sorted(os.listdir(tmp_path)) == ["first.json", "third.json"]
+
+
+def test_response_cache_persists(tmp_path):
+    """Tests that responses cached by a previous run are found by the next one."""
+    ResponseCache(str(tmp_path)).set("key", {"etag": '"abc"'})
+
+    assert ResponseCache(str(tmp_path)).get("key") == {"etag": '"abc"'}
+
+
+def test_pullbug_mounts_cache(tmp_path):
+    """Tests that the GitHub session gets the caching adapter unless disabled."""
+    bug = Pullbug(
+        github_owner="justintime50",
+        location=str(tmp_path),
+    )
+    uncached_bug = Pullbug(
+        github_owner="justintime50",
+        location=str(tmp_path),
+        no_cache=True,
+    )
+
+    # The run memo sits in front of the cache, see `MemoizingAdapter`
+    assert isinstance(_github_adapter(bug).adapter, CachingAdapter)
+    assert _github_adapter(bug).adapter.cache.location == os.path.join(str(tmp_path), "cache")
+    assert not isinstance(_github_adapter(uncached_bug).adapter, CachingAdapter)
@@ -0,0 +1,57 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from pullbug.fetches import SharedFetches
+
+
+def test_shared_fetches_fetch_once():
+    """Tests that each key is only fetched once, and that other keys are fetched separately."""
+    shared_fetches = SharedFetches()
+    fetch = MagicMock(return_value=["mock-pull-request"])
+
+    assert shared_fetches.get(("pulls", "justintime50/pullbug"), fetch) == ["mock-pull-request"]
+    assert shared_fetches.get(("pulls", "justintime50/pullbug"), fetch) == ["mock-pull-request"]
+    shared_fetches.get(("pulls", "justintime50/harvey"), fetch)
+
+    assert fetch.call_count == 2
+
+
+def test_shared_fetches_wait_for_fetch_in_progress():
+    """Tests that asking for a key that's still being fetched waits for that fetch instead of fetching again."""
+    shared_fetches = SharedFetches()
+    fetch_started = threading.Event()
+    finish_fetch = threading.Event()
+    fetch_calls = []
+
+    def fetch():
+        fetch_calls.append(1)
+        fetch_started.set()
+        finish_fetch.wait(timeout=5)
+        return "mock-result"
+
+    results = []
+    first_thread = threading.Thread(target=lambda: results.append(shared_fetches.get(("key",), fetch)))
+    first_thread.start()
+    fetch_started.wait(timeout=5)
+    second_thread = threading.Thread(target=lambda: results.append(shared_fetches.get(("key",), fetch)))
+    second_thread.start()
+    finish_fetch.set()
+    first_thread.join()
+    second_thread.join()
+
+    assert results == ["mock-result", "mock-result"]
+    assert len(fetch_calls) == 1
+
+
+def test_shared_fetches_share_errors():
+    """Tests that a fetch that failed raises its error for everyone asking for it."""
+    shared_fetches = SharedFetches()
+    fetch = MagicMock(side_effect=ValueError("mock-error"))
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            shared_fetches.get(("key",), fetch)
+
+    fetch.assert_called_once()
@@ -0,0 +1,151 @@
+import json
+import threading
+
+import pytest
+
+from pullbug import records
+from pullbug.formatters import (
+    FORMATTERS,
+    MarkupFormatter,
+    issue_item,
+    pull_request_item,
+    render,
+)
+from pullbug.messages import (
+    prepare_issues_message,
+    prepare_pulls_message,
+)
+
+REPO = records.RepoRecord(
+    name="mock-repo",
+    full_name="justintime50/mock-repo",
+    html_url="https://github.com/justintime50/mock-repo",
+)
+
+
+def _user(login):
+    return records.UserRecord(login=login, html_url=f"https://github.com/{login}")
+
+
+def _pull_request():
+    return records.PullRequestRecord(
+        number=1,
+        title="mock-title",
+        body="mock-body",
+        html_url="https://github.com/justintime50/mock-repo/pull/1",
+        url="https://api.github.com/repos/justintime50/mock-repo/pulls/1",
+        draft=False,
+        state="open",
+        updated_at=None,
+        user=_user("author"),
+        repo=REPO,
+    )
+
+
+def test_pull_request_item():
+    """Tests that reviewers are deduplicated, and those who approved are left out of the other categories."""
+    approved, requested_changes = _user("approved"), _user("requested-changes")
+    team = records.TeamRecord(name="mock-team", slug="mock-team")
+
+    item = pull_request_item(
+        _pull_request(),
+        reviewers=[team, team],
+        users_who_approved=[approved, approved],
+        users_who_requested_changes=[requested_changes, approved, requested_changes],
+        users_who_were_dismissed=[approved],
+    )
+
+    assert item.reviews == [
+        ("approved", [approved]),
+        ("requested_changes", [requested_changes]),
+        ("requested", [team]),
+    ]
+    assert item.description == "mock-body"
+
+
+def test_render():
+    """Tests that an item is rendered in each of the formats asked for."""
+    messages = render(pull_request_item(_pull_request(), [], [_user("approved")], [], []), ["slack", "discord"])
+
+    assert list(messages) == ["slack", "discord"]
+    assert "*Repo:* <https://github.com/justintime50/mock-repo|mock-repo>" in messages["slack"]
+    assert "**Author:** [author](https://github.com/author)" in messages["discord"]
+
+
+def test_render_text():
+    """Tests that an item is rendered as plain text."""
+    message = render(pull_request_item(_pull_request(), [], [_user("approved")], [], []), ["text"])["text"]
+
+    assert message == (
+        "\nPull Request: mock-title (https://github.com/justintime50/mock-repo/pull/1)"
+        "\nRepo: mock-repo (https://github.com/justintime50/mock-repo)"
+        "\nAuthor: author (https://github.com/author)"
+        "\nDescription: mock-body"
+        "\nReviewers:  approved: approved (https://github.com/approved);\n"
+    )
+
+
+def test_render_json():
+    """Tests that an issue is rendered as a JSON object."""
+    issue = records.IssueRecord(
+        number=2,
+        title="mock-title",
+        body=None,
+        html_url="https://github.com/justintime50/mock-repo/issues/2",
+        url="https://api.github.com/repos/justintime50/mock-repo/issues/2",
+        state="open",
+        updated_at=None,
+        assignees=(_user("assignee"),),
+        repo=REPO,
+    )
+
+    message = json.loads(FORMATTERS["json"].format(issue_item(issue, disable_descriptions=True)))
+
+    assert message["kind"] == "issue"
+    assert message["author"] is None
+    assert message["description"] is None
+    assert message["assignees"] == [{"login": "assignee", "url": "https://github.com/assignee"}]
+
+
+def test_formatter_links_per_thread():
+    """Tests that each thread keeps its own rendered links, so shared formatters never share them across threads."""
+    formatter = FORMATTERS["slack"]
+    item = pull_request_item(_pull_request(), [], [], [], [])
+    links = []
+
+    def render_links():
+        formatter.format(item)
+        links.append(formatter._local.links)
+
+    threads = [threading.Thread(target=render_links) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    first_links, second_links = links
+    assert first_links is not second_links
+    assert first_links == second_links
+
+
+def test_prepare_messages_only_renders_formats_asked_for(mock_issue):
+    """Tests that only the formats asked for are rendered."""
+    messages = prepare_pulls_message(_pull_request(), [], [], [], [], formats=("discord",))
+    issue_messages = prepare_issues_message(mock_issue, formats=("slack", "text"))
+
+    assert list(messages) == ["discord"]
+    assert "**Pull Request:**" in messages["discord"]
+    assert list(issue_messages) == ["slack", "text"]
+    assert "*Issue:*" in issue_messages["slack"]
+    assert "\nIssue: " in issue_messages["text"]
+
+
+def test_markup_formatter_needs_its_format():
+    """Tests that a markup formatter can't be created without writing out each part of its format."""
+
+    class LinkOnlyFormatter(MarkupFormatter):
+        def link(self, text, url):
+            return url
+
+    with pytest.raises(TypeError):
+        LinkOnlyFormatter()
@@ -0,0 +1,145 @@
+from pullbug.graphql import get_pull_requests
+from pullbug.messages import prepare_pulls_message
+from pullbug.records import (
+    TeamRecord,
+    UserRecord,
+)
+
+
+def _pull_request_node(number, is_draft=False):
+    return {
+        "number": number,
+        "title": f"mock-pull-request-{number}",
+        "body": "Mock body of a pull request.",
+        "url": f"https://github.com/mock-user/mock-repo/pull/{number}",
+        "isDraft": is_draft,
+        "state": "OPEN",
+        "updatedAt": "2026-01-01T00:00:00Z",
+        "author": {"login": "mock-user", "url": "https://github.com/mock-user"},
+        "baseRepository": {
+            "name": "mock-repo",
+            "nameWithOwner": "mock-user/mock-repo",
+            "url": "https://github.com/mock-user/mock-repo",
+        },
+        "reviewRequests": {
+            "nodes": [
+                {
+                    "requestedReviewer": {
+                        "__typename": "User",
+                        "login": "reviewer",
+                        "url": "https://github.com/reviewer",
+                    }
+                },
+                {
+                    "requestedReviewer": {
+                        "__typename": "Team",
+                        "name": "team",
+                        "slug": "team",
+                        "url": "https://github.com/orgs/mock-user/teams/team",
+                    }
+                },
+                {"requestedReviewer": {"__typename": "Mannequin"}},
+            ]
+        },
+        "latestReviews": {
+            "nodes": [
+                {"state": "APPROVED", "author": {"login": "approver", "url": "https://github.com/approver"}},
+                {"state": "CHANGES_REQUESTED", "author": None},
+                {"state": "COMMENTED", "author": {"login": "commenter", "url": "https://github.com/commenter"}},
+            ]
+        },
+    }
+
+
+def _repository(nodes, has_next_page=False, end_cursor=None):
+    return {
+        "pullRequests": {
+            "pageInfo": {"hasNextPage": has_next_page, "endCursor": end_cursor},
+            "nodes": nodes,
+        }
+    }
+
+
+def _serve_queries(requester, *responses):
+    requester.graphql_query.side_effect = [({}, {"data": response}) for response in responses]
+
+    return requester
+
+
+def test_get_pull_requests(mock_requester):
+    """Tests that pull requests and their reviews are built from a single query."""
+    requester = _serve_queries(
+        mock_requester,
+        {
+            "repo0": _repository([_pull_request_node(1), _pull_request_node(2, is_draft=True)]),
+            "repo1": _repository([]),
+        },
+    )
+
+    pull_requests_by_repo = get_pull_requests(requester, ["mock-user/mock-repo", "mock-user/empty-repo"], "open")
+
+    requester.graphql_query.assert_called_once()
+    _, variables = requester.graphql_query.call_args.args
+    assert variables["states"] == ["OPEN"]
+    assert variables["owner0"] == "mock-user"
+    assert variables["name1"] == "empty-repo"
+    assert [len(pull_requests) for pull_requests in pull_requests_by_repo] == [2, 0]
+
+    pull_request, reviewers, reviews_by_category = pull_requests_by_repo[0][0]
+    assert pull_request.title == "mock-pull-request-1"
+    assert pull_request.draft is False
+    assert pull_request.repo.name == "mock-repo"
+    assert pull_request.state == "open"
+    assert pull_request.url == "https://api.github.com/repos/mock-user/mock-repo/pulls/1"
+    assert isinstance(reviewers[0], UserRecord)
+    assert isinstance(reviewers[1], TeamRecord)
+    assert len(reviewers) == 2
+    assert [user.login for user in reviews_by_category["users_who_approved"]] == ["approver"]
+    assert [user.login for user in reviews_by_category["users_who_requested_changes"]] == ["ghost"]
+    assert reviews_by_category["users_who_were_dismissed"] == []
+    assert pull_requests_by_repo[0][1].pull_request.draft is True
+
+
+def test_get_pull_requests_follows_pages(mock_requester):
+    """Tests that repos with more pull requests than fit on a page are queried again from their cursor."""
+    requester = _serve_queries(
+        mock_requester,
+        {
+            "repo0": _repository([_pull_request_node(1)], has_next_page=True, end_cursor="cursor-1"),
+            "repo1": _repository([_pull_request_node(2)]),
+        },
+        {
+            "repo0": _repository([_pull_request_node(3)]),
+        },
+    )
+
+    pull_requests_by_repo = get_pull_requests(requester, ["mock-user/mock-repo", "mock-user/other-repo"], "all")
+
+    assert requester.graphql_query.call_count == 2
+    _, variables = requester.graphql_query.call_args.args
+    assert variables["states"] is None
+    assert variables["name0"] == "mock-repo"
+    assert variables["after0"] == "cursor-1"
+    assert "name1" not in variables
+    assert [
+        [graphql_pull_request.pull_request.number for graphql_pull_request in pull_requests]
+        for pull_requests in pull_requests_by_repo
+    ] == [[1, 3], [2]]
+
+
+def test_get_pull_requests_feeds_message_builder(mock_requester):
+    """Tests that the objects built from GraphQL can be used by the message builders without any requests."""
+    requester = _serve_queries(mock_requester, {"repo0": _repository([_pull_request_node(1)])})
+
+    pull_request, reviewers, reviews_by_category = get_pull_requests(requester, ["mock-user/mock-repo"], "open")[0][0]
+    messages = prepare_pulls_message(
+        pull_request=pull_request,
+        reviewers=reviewers,
+        **reviews_by_category,
+    )
+    slack_message, discord_message = messages["slack"], messages["discord"]
+
+    assert "<https://github.com/mock-user/mock-repo|mock-repo>" in slack_message
+    assert "<https://github.com/reviewer|reviewer>" in slack_message
+    assert "[approver](https://github.com/approver)" in discord_message
+    requester.requestJsonAndCheck.assert_not_called()
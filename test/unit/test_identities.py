@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+from pullbug.identities import (
+    IDENTITIES_FILENAME,
+    IdentityCache,
+)
+from pullbug.records import (
+    TeamRecord,
+    UserRecord,
+)
+
+TEAM_URL = "https://github.com/orgs/justintime50/teams/security"
+
+
+def test_identity_cache_round_trip(tmp_path):
+    """Tests that teams seen with their URL in one run fill in the URL of the same teams in the next."""
+    identities = IdentityCache(str(tmp_path))
+    identities.resolve("justintime50", [TeamRecord(name="Security", slug="security", html_url=TEAM_URL)])
+    identities.save()
+
+    reviewers = [
+        UserRecord(login="mock-user", html_url="https://github.com/mock-user"),
+        TeamRecord(name="Security", slug="security"),
+        TeamRecord(name="Website", slug="website"),
+    ]
+    resolved_reviewers = IdentityCache(str(tmp_path)).resolve("JustinTime50", reviewers)
+
+    assert resolved_reviewers == [
+        reviewers[0],
+        TeamRecord(name="Security", slug="security", html_url=TEAM_URL),
+        reviewers[2],
+    ]
+
+
+def test_identity_cache_looks_up_teams_once(tmp_path):
+    """Tests that the teams of an owner are looked up once per TTL, even when the lookup fails."""
+    identities = IdentityCache(str(tmp_path))
+    teams = [TeamRecord(name="Security", slug="security")]
+    list_teams = MagicMock(return_value=[TeamRecord(name="Security", slug="security", html_url=TEAM_URL)])
+
+    assert identities.needs_team_lookup("justintime50", teams)
+    identities.look_up_teams("justintime50", list_teams)
+    identities.look_up_teams("justintime50", list_teams)
+
+    list_teams.assert_called_once()
+    assert not identities.needs_team_lookup("justintime50", teams)
+    assert identities.resolve("justintime50", teams)[0].html_url == TEAM_URL
+
+    failing_list_teams = MagicMock(side_effect=Exception("mock-error"))
+    identities.look_up_teams("mock-user", failing_list_teams)
+    identities.look_up_teams("mock-user", failing_list_teams)
+
+    failing_list_teams.assert_called_once()
+    assert not identities.needs_team_lookup("mock-user", teams)
+
+
+def test_identity_cache_looks_up_teams_without_lock(tmp_path):
+    """Tests that a lookup in flight doesn't hold up other owners, and that callers for the same owner wait on it."""
+    identities = IdentityCache(str(tmp_path))
+    teams = [TeamRecord(name="Security", slug="security")]
+    lookup_started = threading.Event()
+    release_lookup = threading.Event()
+
+    def list_teams():
+        lookup_started.set()
+        assert release_lookup.wait(timeout=5)
+        return [TeamRecord(name="Security", slug="security", html_url=TEAM_URL)]
+
+    mock_list_teams = MagicMock(side_effect=list_teams)
+    lookups = [
+        threading.Thread(target=identities.look_up_teams, args=("justintime50", mock_list_teams)) for _ in range(2)
+    ]
+    lookups[0].start()
+    assert lookup_started.wait(timeout=5)
+    lookups[1].start()
+
+    # Neither the lookup of another owner nor resolving reviewers waits on the lookup in flight
+    identities.look_up_teams("mock-org", MagicMock(return_value=[]))
+    assert identities.resolve("justintime50", teams) == teams
+
+    release_lookup.set()
+    for lookup in lookups:
+        lookup.join(timeout=5)
+
+    mock_list_teams.assert_called_once()
+    assert identities.resolve("justintime50", teams)[0].html_url == TEAM_URL
+
+
+def test_identity_cache_expires_identities(tmp_path):
+    """Tests that identities not seen within the TTL are neither used nor saved again."""
+    with open(os.path.join(tmp_path, IDENTITIES_FILENAME), "w") as identities_file:
+        json.dump(
+            {
+                "version": 1,
+                "users": {},
+                "teams": {"justintime50/security": {"name": "Security", "html_url": TEAM_URL, "seen_at": 0}},
+                "lookups": {"justintime50": {"seen_at": 0}},
+            },
+            identities_file,
+        )
+    identities = IdentityCache(str(tmp_path), ttl=60)
+    teams = [TeamRecord(name="Security", slug="security")]
+
+    assert identities.resolve("justintime50", teams) == teams
+    assert identities.needs_team_lookup("justintime50", teams)
+
+    identities.resolve("justintime50", [UserRecord(login="mock-user", html_url="https://github.com/mock-user")])
+    identities.save()
+
+    with open(os.path.join(tmp_path, IDENTITIES_FILENAME)) as identities_file:
+        saved_identities = json.load(identities_file)
+    assert saved_identities["teams"] == {}
+    assert saved_identities["lookups"] == {}
+    assert saved_identities["users"]["mock-user"]["seen_at"] > time.time() - 60
+
+
+def test_identity_cache_ignores_unusable_cache(tmp_path):
+    """Tests that a corrupt identities file means starting over rather than failing."""
+    with open(os.path.join(tmp_path, IDENTITIES_FILENAME), "w") as identities_file:
+        identities_file.write("{not json")
+
+    teams = [TeamRecord(name="Security", slug="security")]
+
+    assert IdentityCache(str(tmp_path)).resolve("justintime50", teams) == teams
@@ -0,0 +1,188 @@
+import json
+import os
+from unittest.mock import (
+    MagicMock,
+    patch,
+)
+
+import pytest
+
+from pullbug.jobs import (
+    JobError,
+    build_jobs,
+    load_config,
+    run_jobs,
+)
+from pullbug.routing import Route
+from pullbug.state import STATE_FILENAME
+
+
+def test_load_config(tmp_path):
+    """Tests that a TOML batch config is read."""
+    config_path = tmp_path / "jobs.toml"
+    config_path.write_text('github_context = "orgs"\n\n[[jobs]]\ngithub_owner = "justintime50"\npulls = true\n')
+
+    assert load_config(str(config_path)) == {
+        "github_context": "orgs",
+        "jobs": [{"github_owner": "justintime50", "pulls": True}],
+    }
+
+
+def test_build_jobs(tmp_path):
+    """Tests that each job is built from the defaults at the top of the config and its own settings."""
+    jobs = build_jobs(
+        {
+            "github_context": "orgs",
+            "location": str(tmp_path),
+            "concurrent_jobs": 2,
+            "jobs": [
+                {"name": "backend", "github_owner": "justintime50", "repos": ["Pullbug", "harvey"], "pulls": True},
+                {"github_owner": "justintime50", "github_context": "users", "issues": True},
+            ],
+        }
+    )
+
+    assert list(jobs) == ["backend", "justintime50-2"]
+    assert jobs["backend"].github_context == "orgs"
+    assert jobs["backend"].repos == ["pullbug", "harvey"]
+    assert jobs["justintime50-2"].github_context == "users"
+    assert jobs["justintime50-2"].issues is True
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"jobs": [{"github_owner": "justintime50", "pull_requests": True}]},
+        {"jobs": [{"name": "mock-job", "github_owner": "justintime50"}] * 2},
+        {"github_owner": "justintime50"},
+    ],
+)
+@patch("logging.Logger.critical")
+def test_build_jobs_invalid_config(mock_logger, config):
+    """Tests that unknown settings, duplicate job names, and configs without any jobs are refused."""
+    with pytest.raises(ValueError):
+        build_jobs(config)
+
+    mock_logger.assert_called_once()
+
+
+@patch("logging.Logger.info")
+@patch("github.Github.get_repo")
+def test_run_jobs_share_fetches(mock_get_repo, mock_logger, tmp_path):
+    """Tests that a repo several jobs bug about only has its pull requests fetched once."""
+    mock_repo = MagicMock(
+        full_name="justintime50/pullbug", disabled=False, archived=False, fork=False, open_issues_count=1
+    )
+    mock_repo.get_pulls.return_value = []
+    mock_get_repo.return_value = mock_repo
+    job_config = {"github_owner": "justintime50", "repos": "pullbug", "pulls": True, "no_cache": True}
+    jobs = build_jobs(
+        {
+            "location": str(tmp_path),
+            "jobs": [{"name": "first", **job_config}, {"name": "second", **job_config, "drafts": True}],
+        }
+    )
+
+    run_jobs(jobs)
+
+    mock_get_repo.assert_called_once()
+    mock_repo.get_pulls.assert_called_once()
+    assert jobs["first"].transport is jobs["second"].transport
+
+
+@patch("logging.Logger.info")
+def test_run_jobs_share_transports(mock_logger, tmp_path):
+    """Tests that jobs only deliver over the same transport when their message settings are the same."""
+    jobs = build_jobs(
+        {
+            "location": str(tmp_path),
+            "message_timeout": 10,
+            "jobs": [
+                {"name": "first", "github_owner": "justintime50"},
+                {"name": "second", "github_owner": "justintime50"},
+                {"name": "patient", "github_owner": "justintime50", "message_timeout": 60, "message_retries": 5},
+            ],
+        }
+    )
+    for bug in jobs.values():
+        bug.run = MagicMock()
+
+    run_jobs(jobs)
+
+    assert jobs["first"].transport is jobs["second"].transport
+    assert jobs["first"].transport.timeout == 10
+    assert jobs["patient"].transport is not jobs["first"].transport
+    assert (jobs["patient"].transport.timeout, jobs["patient"].transport.retries) == (60, 5)
+
+
+@patch("logging.Logger.info")
+@patch("github.Github.get_repo")
+def test_run_jobs_share_state(mock_get_repo, mock_logger, tmp_path):
+    """Tests that incremental jobs sharing a location keep the sync state of every repo either of them bugs about."""
+
+    def get_repo(full_name):
+        mock_repo = MagicMock(full_name=full_name, disabled=False, archived=False, fork=False, open_issues_count=1)
+        mock_repo.get_pulls.return_value = []
+        return mock_repo
+
+    mock_get_repo.side_effect = get_repo
+    job_config = {"github_owner": "justintime50", "pulls": True, "incremental": True}
+    jobs = build_jobs(
+        {
+            "location": str(tmp_path),
+            "jobs": [
+                {"name": "first", **job_config, "repos": "pullbug"},
+                {"name": "second", **job_config, "repos": "pullbug,harvey"},
+            ],
+        }
+    )
+
+    run_jobs(jobs)
+
+    with open(os.path.join(tmp_path, STATE_FILENAME)) as state_file:
+        assert sorted(json.load(state_file)["repos"]) == ["justintime50/harvey", "justintime50/pullbug"]
+    assert jobs["first"].sync_state is jobs["second"].sync_state
+    assert jobs["first"].rate_limiter is jobs["second"].rate_limiter
+    assert jobs["first"].response_cache is jobs["second"].response_cache
+
+
+@patch("logging.Logger.error")
+@patch("logging.Logger.info")
+def test_run_jobs_failed_job(mock_logger, mock_error_logger, tmp_path):
+    """Tests that a failed job doesn't stop the others, and that the batch reports it once every job has run."""
+    jobs = build_jobs(
+        {
+            "location": str(tmp_path),
+            "jobs": [
+                {"name": "failing", "github_owner": "justintime50"},
+                {"name": "working", "github_owner": "harvey"},
+            ],
+        }
+    )
+    jobs["failing"].run = MagicMock(side_effect=ValueError("mock-error"))
+    jobs["working"].run = MagicMock()
+
+    with pytest.raises(JobError) as error:
+        run_jobs(jobs)
+
+    assert list(error.value.errors) == ["failing"]
+    jobs["working"].run.assert_called_once()
+    mock_error_logger.assert_called_once_with("Pullbug job failing failed: mock-error")
+
+
+def test_build_jobs_routes(tmp_path):
+    """Tests that a job's routes are built from its `[[jobs.routes]]` tables."""
+    jobs = build_jobs(
+        {
+            "location": str(tmp_path),
+            "jobs": [
+                {
+                    "github_owner": "justintime50",
+                    "pulls": True,
+                    "routes": [{"name": "api", "discord_url": "mock-url", "repos": ["api-*"]}],
+                }
+            ],
+        }
+    )
+
+    assert jobs["justintime50-1"].routes == [Route(name="api", discord_url="mock-url", repos=("api-*",))]
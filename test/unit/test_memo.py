@@ -0,0 +1,79 @@
+import threading
+from unittest.mock import MagicMock
+
+from pullbug.accounting import ApiAccounting
+from pullbug.memo import (
+    MEMO_HIT_HEADER,
+    MemoizingAdapter,
+    RunMemo,
+)
+
+
+def _memoizing_adapter(inner_adapter):
+    memo = RunMemo()
+    memo.start()
+
+    return MemoizingAdapter(inner_adapter, memo, ApiAccounting())
+
+
+def test_memoizing_adapter_memoizes_run(build_request, build_response):
+    """Tests that a GET is only sent once per run and every repeat is counted as a memo hit."""
+    inner_adapter = MagicMock()
+    inner_adapter.send.side_effect = lambda request, **kwargs: build_response(
+        200, b'{"users": []}', {"Content-Encoding": "gzip", "ETag": '"abc"'}
+    )
+    adapter = _memoizing_adapter(inner_adapter)
+
+    adapter.send(build_request())
+    response = adapter.send(build_request())
+
+    inner_adapter.send.assert_called_once()
+    assert response.json() == {"users": []}
+    assert response.headers[MEMO_HIT_HEADER] == "HIT"
+    assert "Content-Encoding" not in response.headers
+    assert adapter.accounting.summary()["memo_hits"] == 1
+
+    # Other requests, and requests once the run has finished, are sent as they are
+    adapter.send(build_request(method="POST"))
+    adapter.memo.finish()
+    adapter.send(build_request())
+
+    assert inner_adapter.send.call_count == 3
+
+
+def test_memoizing_adapter_coalesces_concurrent_requests(build_request, build_response):
+    """Tests that identical requests made at the same time share the response of the first."""
+    sending = threading.Event()
+    release = threading.Event()
+
+    def send(request, **kwargs):
+        sending.set()
+        release.wait(5)
+        return build_response(200)
+
+    inner_adapter = MagicMock()
+    inner_adapter.send.side_effect = send
+    adapter = _memoizing_adapter(inner_adapter)
+
+    first_request = threading.Thread(target=adapter.send, args=(build_request(),))
+    first_request.start()
+    sending.wait(5)
+    second_request = threading.Thread(target=adapter.send, args=(build_request(),))
+    second_request.start()
+    release.set()
+    first_request.join(5)
+    second_request.join(5)
+
+    inner_adapter.send.assert_called_once()
+    assert adapter.accounting.summary()["memo_hits"] == 1
+
+
+def test_memoizing_adapter_skips_failures(build_request, build_response):
+    """Tests that failed responses aren't memoised, the same request is sent again."""
+    inner_adapter = MagicMock()
+    inner_adapter.send.side_effect = [build_response(502), build_response(200)]
+    adapter = _memoizing_adapter(inner_adapter)
+
+    assert adapter.send(build_request()).status_code == 502
+    assert adapter.send(build_request()).status_code == 200
+    assert adapter.accounting.summary()["memo_hits"] == 0
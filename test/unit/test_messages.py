@@ -1,26 +1,43 @@
+import json
 from unittest.mock import (
-    MagicMock,
     patch,
 )
 
 import pytest
 import requests
 import slack_sdk
-from github import (
-    NamedUser,
-    Team,
-)
 
 from pullbug.messages import (
+    SLACK_CHANNEL_POST_INTERVAL,
+    SLACK_MESSAGE_MAX_LENGTH,
+    DiscordSender,
+    SlackSender,
     prepare_issues_message,
     prepare_pulls_message,
     send_discord_message,
     send_slack_message,
 )
+from pullbug.records import (
+    TeamRecord,
+    UserRecord,
+)
+from pullbug.transport import (
+    MessageTransport,
+    RateLimitBucket,
+)
+
+
+def _build_slack_response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json"
+    response._content = json.dumps(body).encode()
+
+    return response
 
 
 @patch("logging.Logger.info")
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_discord_success(mock_request, mock_logger, mock_url, mock_messages):
     """Tests that we can send a Discord message."""
     send_discord_message(mock_messages, mock_url)
@@ -30,7 +47,7 @@ def test_discord_success(mock_request, mock_logger, mock_url, mock_messages):
 
 
 @patch("logging.Logger.error")
-@patch("requests.post", side_effect=requests.exceptions.RequestException("mock-error"))
+@patch("requests.Session.post", side_effect=requests.exceptions.RequestException("mock-error"))
 def test_discord_exception(mock_request, mock_logger, mock_url, mock_messages):
     """Tests that we log errors when sending Discord messages."""
     with pytest.raises(requests.exceptions.RequestException):
@@ -40,65 +57,222 @@ def test_discord_exception(mock_request, mock_logger, mock_url, mock_messages):
 
 
 @patch("logging.Logger.info")
-@patch("slack_sdk.WebClient.chat_postMessage")
+@patch("requests.Session.post", return_value=_build_slack_response({"ok": True}))
 def test_slack_success(mock_slack, mock_logger, mock_messages, mock_token, mock_channel):
     """Tests that we can send a Slack message."""
     send_slack_message(mock_messages, mock_token, mock_channel)
 
-    mock_slack.assert_called_once_with(channel="mock-channel", text=mock_messages[0])
+    mock_slack.assert_called_once_with(
+        "https://slack.com/api/chat.postMessage",
+        json={"channel": "mock-channel", "text": mock_messages[0]},
+        headers={"Authorization": f"Bearer {mock_token}"},
+        timeout=30,
+    )
     mock_logger.assert_called_once_with("Slack message sent!")
 
 
 @patch("logging.Logger.error")
-@patch(
-    "slack_sdk.WebClient.chat_postMessage",
-    side_effect=slack_sdk.errors.SlackApiError(
-        message="The request to the Slack API failed.", response={"ok": False, "error": "not_authed"}
-    ),
-)
+@patch("requests.Session.post", return_value=_build_slack_response({"ok": False, "error": "not_authed"}))
 def test_slack_exception(mock_slack, mock_logger, mock_messages, mock_token, mock_channel):
     """Tests that we log errors when sending Slack messages."""
     with pytest.raises(slack_sdk.errors.SlackApiError):
         send_slack_message(mock_messages, mock_token, mock_channel)
 
     mock_logger.assert_called_once_with(
-        "Could not send Slack message: The request to the Slack API failed.\nThe server responded with: {'ok': False, 'error': 'not_authed'}"  # noqa
+        "Could not send Slack message: The request to the Slack API failed. (url: https://slack.com/api/chat.postMessage)\nThe server responded with: {'ok': False, 'error': 'not_authed'}"  # noqa
     )
 
 
+@patch("logging.Logger.info")
+@patch("requests.Session.post")
+def test_discord_sender_packs_messages(mock_request, mock_logger, mock_url):
+    """Tests that Discord messages are packed into as few posts as fit, in order and without splitting any."""
+    discord_sender = DiscordSender(mock_url)
+
+    for message in ["a" * 1500, "b" * 400, "c" * 200, "d" * 1900]:
+        discord_sender.add(message)
+    discord_sender.close()
+
+    assert [call.kwargs["json"]["content"] for call in mock_request.call_args_list] == [
+        "a" * 1500 + "b" * 400,
+        "c" * 200,
+        "d" * 1900,
+    ]
+
+
+@patch("logging.Logger.warning")
+@patch("logging.Logger.info")
+@patch("requests.Session.post")
+def test_discord_sender_truncates_long_messages(mock_request, mock_logger, mock_warning, mock_url):
+    """Tests that a single message longer than Discord's limit is truncated rather than refused by Discord."""
+    discord_sender = DiscordSender(mock_url)
+
+    discord_sender.add("a" * 2500)
+    discord_sender.close()
+
+    assert mock_request.call_args.kwargs["json"]["content"] == "a" * 1997 + "..."
+
+
+@patch("logging.Logger.error")
+@patch("logging.Logger.info")
+@patch("requests.Session.post", side_effect=requests.exceptions.RequestException("mock-error"))
+def test_discord_sender_stops_after_error(mock_request, mock_logger, mock_error_logger, mock_url):
+    """Tests that no more posts are sent once one has failed, and that its error is raised by the next `add`."""
+    discord_sender = DiscordSender(mock_url)
+
+    discord_sender.add("a" * 1500)
+    discord_sender.add("b" * 1500)
+    discord_sender._executor.shutdown(wait=True)
+
+    with pytest.raises(requests.exceptions.RequestException):
+        discord_sender.add("c" * 1500)
+
+    assert mock_request.call_count == 1
+
+
+@patch("time.sleep")
+@patch("logging.Logger.info")
+@patch("requests.Session.post", return_value=_build_slack_response({"ok": True, "ts": "1700000000.000100"}))
+def test_slack_sender_threads_chunks(mock_slack, mock_logger, mock_sleep, mock_token, mock_channel):
+    """Tests that a digest too long for one Slack message is split into a headline and replies in its thread."""
+    slack_sender = SlackSender(mock_token, mock_channel)
+    message = "a" * (SLACK_MESSAGE_MAX_LENGTH // 2)
+
+    for _ in range(5):
+        slack_sender.add(message)
+    slack_sender.close()
+
+    payloads = [call.kwargs["json"] for call in mock_slack.call_args_list]
+    assert [payload["text"] for payload in payloads] == [message * 2, message * 2, message]
+    assert "thread_ts" not in payloads[0]
+    assert all(payload["thread_ts"] == "1700000000.000100" for payload in payloads[1:])
+
+
+@patch("time.sleep")
+@patch("logging.Logger.info")
+@patch("requests.Session.post", return_value=_build_slack_response({"ok": True, "ts": "1700000000.000100"}))
+def test_slack_sender_threads_each_digest(mock_slack, mock_logger, mock_sleep, mock_token, mock_channel):
+    """Tests that each digest sent by the same Slack sender gets its own headline post and thread."""
+    slack_sender = SlackSender(mock_token, mock_channel)
+
+    for digest in ("pulls", "issues"):
+        slack_sender.start_digest()
+        slack_sender.add(f"{digest}-headline")
+        slack_sender.add("a" * SLACK_MESSAGE_MAX_LENGTH)
+    slack_sender.close()
+
+    payloads = [call.kwargs["json"] for call in mock_slack.call_args_list]
+    assert [payload["text"] for payload in payloads[::2]] == ["pulls-headline", "issues-headline"]
+    assert ["thread_ts" in payload for payload in payloads] == [False, True, False, True]
+    assert slack_sender.posts_sent == 4
+
+
+@patch("time.sleep")
+@patch("logging.Logger.info")
+@patch("requests.Session.post", return_value=_build_slack_response({"ok": True, "ts": "1700000000.000100"}))
+def test_slack_sender_paces_posts_per_channel(mock_slack, mock_logger, mock_sleep, mock_token, mock_channel):
+    """Tests that Slack posts to the same channel are spaced out to Slack's rate, even across senders."""
+    transport = MessageTransport()
+    message = "a" * SLACK_MESSAGE_MAX_LENGTH
+
+    send_slack_message([message, message], mock_token, mock_channel, transport=transport)
+    send_slack_message([message], mock_token, mock_channel, transport=transport)
+    send_slack_message([message], mock_token, "other-channel", transport=transport)
+
+    assert mock_slack.call_count == 4
+    assert mock_sleep.call_count == 2
+    # Sleeping is mocked out, so the third post to the channel queues up behind the second's slot too
+    first_delay, second_delay = (call.args[0] for call in mock_sleep.call_args_list)
+    assert 0 < first_delay <= SLACK_CHANNEL_POST_INTERVAL < second_delay <= 2 * SLACK_CHANNEL_POST_INTERVAL
+
+
+@patch("logging.Logger.info")
+def test_senders_share_transport(mock_logger, mock_url, mock_token, mock_channel):
+    """Tests that every sender given the same transport delivers over the same pooled session."""
+    transport = MessageTransport()
+
+    with patch.object(transport.session, "post", return_value=_build_slack_response({"ok": True})) as mock_post:
+        send_discord_message(["discord-message"], mock_url, transport=transport)
+        send_slack_message(["slack-message"], mock_token, mock_channel, transport=transport)
+        send_discord_message(["discord-message"], mock_url, transport=transport)
+
+    assert mock_post.call_count == 3
+
+
+def test_transport_retries_unaccepted_messages():
+    """Tests that only responses meaning a message wasn't accepted are retried, and lost responses aren't."""
+    transport = MessageTransport(pool_size=2, retries=5)
+
+    adapter = transport.session.get_adapter("https://discord.com")
+
+    assert adapter._pool_maxsize == 2
+    assert adapter.max_retries.total == 5
+    assert adapter.max_retries.read == 0
+    assert 503 in adapter.max_retries.status_forcelist
+    assert 500 not in adapter.max_retries.status_forcelist
+    # The message may have been delivered before the gateway timed out
+    assert 504 not in adapter.max_retries.status_forcelist
+
+
+@patch("time.sleep")
+@patch("logging.Logger.warning")
+@patch("logging.Logger.info")
+def test_discord_sender_honours_retry_after(mock_logger, mock_warning, mock_sleep, mock_url):
+    """Tests that a rate limited Discord post is retried after Discord's `retry_after`."""
+    rate_limited_response = _build_slack_response({"retry_after": 1.5, "global": False})
+    rate_limited_response.status_code = 429
+    sent_response = _build_slack_response({})
+    sent_response.status_code = 204
+
+    with patch("requests.Session.post", side_effect=[rate_limited_response, sent_response]) as mock_post:
+        send_discord_message(["discord-message"], mock_url)
+
+    assert mock_post.call_count == 2
+    mock_sleep.assert_called_once_with(1.5)
+
+
+@patch("time.sleep")
+def test_rate_limit_bucket_waits_for_reset(mock_sleep):
+    """Tests that a request waits for its bucket to reset once the bucket has nothing remaining."""
+    bucket = RateLimitBucket()
+    response = requests.Response()
+    response.headers.update({"X-RateLimit-Remaining": "1", "X-RateLimit-Reset-After": "2"})
+
+    bucket.update(response)
+    bucket.wait()
+    mock_sleep.assert_not_called()
+
+    bucket.wait()
+    assert 1 < mock_sleep.call_args.args[0] <= 2
+
+
 def test_prepare_pulls_message(mock_pull_request, mock_user, mock_repo):
     """Tests that we build all user strings and messages correctly when present."""
-    reviewer = MagicMock(spec=NamedUser.NamedUser)
-    reviewer.login = "reviewer"
-    reviewer.html_url = f"https://github.com/{mock_user}"
+    reviewer = UserRecord(login="reviewer", html_url=f"https://github.com/{mock_user}")
 
-    team = MagicMock(spec=Team.Team)
-    team.name = "team"
+    team = TeamRecord(name="team", slug="team")
 
     reviewers = [reviewer, team]
 
-    approved_reviewer = MagicMock(spec=NamedUser.NamedUser)
-    approved_reviewer.login = "approved_reviewer"
-    approved_reviewer.html_url = f"https://github.com/{mock_user}"
+    approved_reviewer = UserRecord(login="approved_reviewer", html_url=f"https://github.com/{mock_user}")
     approved_reviewers = [approved_reviewer]
 
-    requested_changes_reviewer = MagicMock(spec=NamedUser.NamedUser)
-    requested_changes_reviewer.login = "requested_changes_reviewer"
-    requested_changes_reviewer.html_url = f"https://github.com/{mock_user}"
+    requested_changes_reviewer = UserRecord(
+        login="requested_changes_reviewer", html_url=f"https://github.com/{mock_user}"
+    )
     requested_changes_reviewers = [requested_changes_reviewer]
 
-    dismissed_reviewer = MagicMock(spec=NamedUser.NamedUser)
-    dismissed_reviewer.login = "dismissed_reviewer"
-    dismissed_reviewer.html_url = f"https://github.com/{mock_user}"
+    dismissed_reviewer = UserRecord(login="dismissed_reviewer", html_url=f"https://github.com/{mock_user}")
     dismissed_reviewers = [dismissed_reviewer]
 
-    slack_message, discord_message = prepare_pulls_message(
+    messages = prepare_pulls_message(
         pull_request=mock_pull_request,
         reviewers=reviewers,
         users_who_approved=approved_reviewers,
         users_who_requested_changes=requested_changes_reviewers,
         users_who_were_dismissed=dismissed_reviewers,
     )
+    slack_message, discord_message = messages["slack"], messages["discord"]
 
     # Slack message
     assert "Pull Request" in slack_message
@@ -123,18 +297,17 @@ def test_prepare_pulls_message(mock_pull_request, mock_user, mock_repo):
 
 def test_prepare_pulls_message_same_reviewer(mock_pull_request, mock_user, mock_repo):
     """Ensures that when a user has requested changes, been dismissed, then approved, we filter those correctly."""
-    reviewer = MagicMock(spec=NamedUser.NamedUser)
-    reviewer.login = "reviewer"
-    reviewer.html_url = f"https://github.com/{mock_user}"
+    reviewer = UserRecord(login="reviewer", html_url=f"https://github.com/{mock_user}")
     reviewers = [reviewer]
 
-    slack_message, discord_message = prepare_pulls_message(
+    messages = prepare_pulls_message(
         pull_request=mock_pull_request,
         reviewers=reviewers,
         users_who_approved=reviewers,
         users_who_requested_changes=reviewers,
         users_who_were_dismissed=reviewers,
     )
+    slack_message, discord_message = messages["slack"], messages["discord"]
 
     # Slack message
     assert "Pull Request" in slack_message
@@ -150,13 +323,14 @@ def test_prepare_pulls_message_same_reviewer(mock_pull_request, mock_user, mock_
 def test_prepare_pulls_message_no_reviewers(mock_pull_request):
     """Tests that no user strings are generated when there are no reviewers."""
     mock_pull_request.requested_reviewers = []
-    slack_message, discord_message = prepare_pulls_message(
+    messages = prepare_pulls_message(
         pull_request=mock_pull_request,
         reviewers=[],
         users_who_approved=[],
         users_who_requested_changes=[],
         users_who_were_dismissed=[],
     )
+    slack_message, discord_message = messages["slack"], messages["discord"]
 
     assert "*Reviewers:* NA" in slack_message
     assert "*Reviewers:* NA" in discord_message
@@ -164,31 +338,24 @@ def test_prepare_pulls_message_no_reviewers(mock_pull_request):
 
 def test_prepare_pulls_message_disabled_description(mock_pull_request, mock_user, mock_repo):
     """Tests that we build all user strings and messages correctly when descriptions are disabled."""
-    reviewer = MagicMock(spec=NamedUser.NamedUser)
-    reviewer.login = "reviewer"
-    reviewer.html_url = f"https://github.com/{mock_user}"
+    reviewer = UserRecord(login="reviewer", html_url=f"https://github.com/{mock_user}")
 
-    team = MagicMock(spec=Team.Team)
-    team.name = "team"
+    team = TeamRecord(name="team", slug="team")
 
     reviewers = [reviewer, team]
 
-    approved_reviewer = MagicMock(spec=NamedUser.NamedUser)
-    approved_reviewer.login = "approved_reviewer"
-    approved_reviewer.html_url = f"https://github.com/{mock_user}"
+    approved_reviewer = UserRecord(login="approved_reviewer", html_url=f"https://github.com/{mock_user}")
     approved_reviewers = [approved_reviewer]
 
-    requested_changes_reviewer = MagicMock(spec=NamedUser.NamedUser)
-    requested_changes_reviewer.login = "requested_changes_reviewer"
-    requested_changes_reviewer.html_url = f"https://github.com/{mock_user}"
+    requested_changes_reviewer = UserRecord(
+        login="requested_changes_reviewer", html_url=f"https://github.com/{mock_user}"
+    )
     requested_changes_reviewers = [requested_changes_reviewer]
 
-    dismissed_reviewer = MagicMock(spec=NamedUser.NamedUser)
-    dismissed_reviewer.login = "dismissed_reviewer"
-    dismissed_reviewer.html_url = f"https://github.com/{mock_user}"
+    dismissed_reviewer = UserRecord(login="dismissed_reviewer", html_url=f"https://github.com/{mock_user}")
     dismissed_reviewers = [dismissed_reviewer]
 
-    slack_message, discord_message = prepare_pulls_message(
+    messages = prepare_pulls_message(
         pull_request=mock_pull_request,
         reviewers=reviewers,
         users_who_approved=approved_reviewers,
@@ -196,6 +363,7 @@ def test_prepare_pulls_message_disabled_description(mock_pull_request, mock_user
         users_who_were_dismissed=dismissed_reviewers,
         disable_descriptions=True,
     )
+    slack_message, discord_message = messages["slack"], messages["discord"]
 
     # Slack message
     assert "Pull Request" in slack_message
@@ -220,7 +388,8 @@ def test_prepare_pulls_message_disabled_description(mock_pull_request, mock_user
 
 def test_prepare_issues_message(mock_issue, mock_user, mock_repo):
     """Tests that we build the issue message strings correctly when there is an assignee."""
-    slack_message, discord_message = prepare_issues_message(mock_issue)
+    messages = prepare_issues_message(mock_issue)
+    slack_message, discord_message = messages["slack"], messages["discord"]
 
     # Slack message
     assert "Issue" in slack_message
@@ -238,14 +407,15 @@ def test_prepare_issues_message(mock_issue, mock_user, mock_repo):
 def test_prepare_issues_message_no_assignee(mock_issue):
     """Tests that we build the issue message string correctly when there is no assignee."""
     mock_issue.assignees = []
-    slack_message, _ = prepare_issues_message(mock_issue)
+    slack_message = prepare_issues_message(mock_issue)["slack"]
 
     assert "*Assigned to:* NA" in slack_message
 
 
 def test_prepare_issues_message_disable_descriptions(mock_issue, mock_user, mock_repo):
     """Tests that we build the issue message strings correctly when descriptions are disabled."""
-    slack_message, discord_message = prepare_issues_message(issue=mock_issue, disable_descriptions=True)
+    messages = prepare_issues_message(issue=mock_issue, disable_descriptions=True)
+    slack_message, discord_message = messages["slack"], messages["discord"]
 
     # Slack message
     assert "Issue" in slack_message
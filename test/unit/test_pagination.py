@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from github import (
+    NamedUser,
+    PaginatedList,
+)
+
+from pullbug.pagination import iterate_pages
+
+USERS_URL = "https://api.github.com/users"
+
+
+def _serve_pages(requester, pages, link_last=True):
+    """Serve `pages` of users, linking to the next (and optionally last) page like GitHub."""
+
+    def request_json_and_check(method, url, parameters=None, headers=None):
+        page = int((parameters or {}).get("page", 1)) if url == USERS_URL else int(url.rsplit("=", 1)[1])
+        links = []
+        if page < pages:
+            links.append(f'<{USERS_URL}?page={page + 1}>; rel="next"')
+            if link_last:
+                links.append(f'<{USERS_URL}?page={pages}>; rel="last"')
+
+        return {"link": ", ".join(links)} if links else {}, [{"login": f"mock-user-{page}"}]
+
+    requester.requestJsonAndCheck.side_effect = request_json_and_check
+
+    return requester
+
+
+def _logins(users):
+    return [user.login for user in users]
+
+
+def test_iterate_pages_requests_remaining_pages_concurrently(mock_requester):
+    """Tests that every page after the first is submitted at once and yielded in order."""
+    requester = _serve_pages(mock_requester, 3)
+    users = PaginatedList.PaginatedList(NamedUser.NamedUser, requester, USERS_URL, None)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        submit = MagicMock(side_effect=executor.submit)
+        logins = _logins(iterate_pages(users, submit))
+
+    assert logins == ["mock-user-1", "mock-user-2", "mock-user-3"]
+    assert submit.call_count == 2
+    assert requester.requestJsonAndCheck.call_count == 3
+
+
+def test_iterate_pages_without_last_page(mock_requester):
+    """Tests that a list which doesn't link its last page has its next page requested one ahead."""
+    requester = _serve_pages(mock_requester, 3, link_last=False)
+    users = PaginatedList.PaginatedList(NamedUser.NamedUser, requester, USERS_URL, None)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        logins = _logins(iterate_pages(users, executor.submit))
+
+    assert logins == ["mock-user-1", "mock-user-2", "mock-user-3"]
+    assert requester.requestJsonAndCheck.call_count == 3
+
+
+def test_iterate_pages_single_page(mock_requester):
+    """Tests that a list of a single page, or items already in memory, never submit a request."""
+    requester = _serve_pages(mock_requester, 1)
+    users = PaginatedList.PaginatedList(NamedUser.NamedUser, requester, USERS_URL, None)
+    submit = MagicMock()
+
+    assert _logins(iterate_pages(users, submit)) == ["mock-user-1"]
+    assert list(iterate_pages(["mock-item"], submit)) == ["mock-item"]
+    submit.assert_not_called()
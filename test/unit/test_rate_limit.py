@@ -0,0 +1,182 @@
+import time
+from unittest.mock import (
+    MagicMock,
+    patch,
+)
+
+import requests
+
+from pullbug.rate_limit import (
+    CallBudget,
+    RateLimitAdapter,
+    RateLimiter,
+)
+
+
+def _rate_limit_headers(remaining, limit=5000, reset_in=3600):
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(int(time.time() + reset_in)),
+    }
+
+
+@patch("time.sleep")
+def test_rate_limiter_unknown_limit_does_not_wait(mock_sleep):
+    """Tests that requests aren't paced before GitHub has told us the rate limit."""
+    rate_limiter = RateLimiter()
+    rate_limiter.wait()
+
+    assert rate_limiter.calls_allowed() is None
+    mock_sleep.assert_not_called()
+
+
+@patch("time.sleep")
+def test_rate_limiter_plenty_remaining_does_not_wait(mock_sleep, build_response):
+    """Tests that requests run at full speed while the quota is healthy."""
+    rate_limiter = RateLimiter()
+    rate_limiter.update(build_response(headers=_rate_limit_headers(4000)))
+
+    for _ in range(10):
+        rate_limiter.wait()
+
+    assert rate_limiter.calls_allowed() == 3990
+    mock_sleep.assert_not_called()
+
+
+@patch("time.sleep")
+def test_rate_limiter_paces_when_running_low(mock_sleep, build_response):
+    """Tests that requests are spread out over the rest of the window once the quota runs low."""
+    rate_limiter = RateLimiter()
+    rate_limiter.update(build_response(headers=_rate_limit_headers(100, reset_in=1000)))
+
+    rate_limiter.wait()
+    rate_limiter.wait()
+
+    # The first request goes straight away, the second waits for its share of the window
+    mock_sleep.assert_called_once()
+    assert 9 < mock_sleep.call_args.args[0] <= 11
+
+
+@patch("time.sleep")
+def test_rate_limiter_used_up_waits_for_reset(mock_sleep, build_response):
+    """Tests that once the rate limit is used up we wait for it to reset rather than going over it."""
+    rate_limiter = RateLimiter()
+    rate_limiter.update(build_response(headers=_rate_limit_headers(2, limit=2, reset_in=600)))
+
+    rate_limiter.wait()
+    rate_limiter.wait()
+    rate_limiter.wait()
+
+    assert rate_limiter.total_calls == 3
+    assert 590 < mock_sleep.call_args.args[0] <= 601
+
+
+def test_rate_limiter_not_modified_is_free(build_response):
+    """Tests that `304` responses don't count against the rate limit."""
+    rate_limiter = RateLimiter()
+    rate_limiter.update(build_response(headers=_rate_limit_headers(10)))
+    rate_limiter.wait()
+    rate_limiter.update(build_response(status_code=304))
+
+    assert rate_limiter.calls_allowed() == 10
+
+
+@patch("logging.Logger.warning")
+def test_rate_limit_adapter_budget_waits_for_reset(mock_logger, build_response):
+    """Tests that a run waits for the rate limit to reset once it has used up its budget, and then carries on."""
+    inner_adapter = MagicMock()
+    inner_adapter.send.side_effect = lambda request, **kwargs: build_response(200, headers=_rate_limit_headers(4000))
+    budget = CallBudget(2)
+    rate_limiter = RateLimiter()
+    adapter = RateLimitAdapter(inner_adapter, rate_limiter, budget)
+    request = requests.Request("GET", "https://api.github.com/users/justintime50/repos").prepare()
+
+    adapter.send(request)
+    adapter.send(request)
+    # The rate limit resets right away, so the wait is only the second of leeway after it
+    rate_limiter.reset_time = time.time()
+    started_at = time.monotonic()
+    adapter.send(request)
+
+    assert time.monotonic() - started_at >= 0.9
+    assert inner_adapter.send.call_count == 3
+    assert budget.calls_left() == 1
+    mock_logger.assert_called_once()
+    assert "budget of 2 GitHub calls" in mock_logger.call_args.args[0]
+
+
+def test_call_budget_start_run():
+    """Tests that each run gets the whole budget again without waiting for the rate limit to reset."""
+    budget = CallBudget(1)
+    budget.spend(None)
+
+    assert budget.calls_left() == 0
+
+    budget.start_run()
+    budget.spend(None)
+
+    assert budget.calls_left() == 0
+
+
+def test_rate_limit_adapter_budget_not_modified_is_free(build_response):
+    """Tests that `304` responses don't count against the budget of the run."""
+    inner_adapter = MagicMock()
+    inner_adapter.send.return_value = build_response(304)
+    budget = CallBudget(1)
+    adapter = RateLimitAdapter(inner_adapter, RateLimiter(), budget)
+
+    adapter.send(requests.Request("GET", "https://api.github.com/users/justintime50/repos").prepare())
+
+    assert budget.calls_left() == 1
+
+
+def test_rate_limiter_retry_delay(build_response):
+    """Tests the waits used for each kind of rate limited response."""
+    rate_limiter = RateLimiter()
+
+    assert rate_limiter.retry_delay(build_response(), 0) is None
+    assert rate_limiter.retry_delay(build_response(403, body=b'{"message": "Forbidden"}'), 0) is None
+    assert 30 <= rate_limiter.retry_delay(build_response(429, headers={"Retry-After": "30"}), 0) <= 33
+    assert 120 <= rate_limiter.retry_delay(build_response(403, body=b"secondary rate limit"), 1) <= 180
+
+    primary_limited_response = build_response(403, headers=_rate_limit_headers(0, reset_in=100))
+    rate_limiter.update(primary_limited_response)
+    assert 95 < rate_limiter.retry_delay(primary_limited_response, 0) <= 106
+
+
+@patch("logging.Logger.warning")
+@patch("time.sleep")
+def test_rate_limit_adapter_retries(mock_sleep, mock_logger, build_response):
+    """Tests that rate limited requests are retried after waiting."""
+    inner_adapter = MagicMock()
+    inner_adapter.send.side_effect = [
+        build_response(403, headers={"Retry-After": "5"}),
+        build_response(200, headers=_rate_limit_headers(4999)),
+    ]
+    rate_limiter = RateLimiter()
+
+    response = RateLimitAdapter(inner_adapter, rate_limiter).send(
+        requests.Request("GET", "https://api.github.com/users/justintime50/repos").prepare()
+    )
+
+    assert response.status_code == 200
+    assert inner_adapter.send.call_count == 2
+    assert rate_limiter.total_calls == 2
+    assert 5 <= mock_sleep.call_args.args[0] <= 6
+    mock_logger.assert_called_once()
+
+
+@patch("logging.Logger.warning")
+@patch("time.sleep")
+def test_rate_limit_adapter_gives_up(mock_sleep, mock_logger, build_response):
+    """Tests that the rate limited response is returned once out of retries."""
+    inner_adapter = MagicMock()
+    inner_adapter.send.return_value = build_response(429, headers={"Retry-After": "1"})
+
+    response = RateLimitAdapter(inner_adapter, RateLimiter(max_retries=2)).send(
+        requests.Request("GET", "https://api.github.com/users/justintime50/repos").prepare()
+    )
+
+    assert response.status_code == 429
+    assert inner_adapter.send.call_count == 3
@@ -0,0 +1,103 @@
+from unittest.mock import MagicMock
+
+import pytest
+from github import (
+    Issue,
+    PullRequest,
+    Requester,
+)
+
+from pullbug import records
+
+REPO = {
+    "name": "mock-repo",
+    "full_name": "justintime50/mock-repo",
+    "html_url": "https://github.com/justintime50/mock-repo",
+}
+USER = {"login": "mock-user", "html_url": "https://github.com/mock-user"}
+
+
+def _listed(content_class, attributes):
+    """Build a PyGithub object the way it comes out of a list response, incomplete and able to load itself."""
+    requester = MagicMock(spec=Requester.Requester)
+    requester.base_url = "https://api.github.com"
+
+    return content_class(requester, {}, attributes, completed=False), requester
+
+
+def test_from_pull_request():
+    """Tests that a listed pull request is copied into a record without any requests."""
+    pull_request, requester = _listed(
+        PullRequest.PullRequest,
+        {
+            "number": 1,
+            "title": "mock-title",
+            "body": None,
+            "html_url": "https://github.com/justintime50/mock-repo/pull/1",
+            "url": "https://api.github.com/repos/justintime50/mock-repo/pulls/1",
+            "draft": False,
+            "state": "open",
+            "updated_at": "2024-01-01T00:00:00Z",
+            "user": USER,
+            "base": {"repo": REPO},
+            "labels": [{"name": "bug"}],
+        },
+    )
+
+    record = records.from_pull_request(pull_request)
+
+    requester.requestJsonAndCheck.assert_not_called()
+    assert record.repo == records.RepoRecord(**REPO)
+    assert record.user == records.UserRecord(**USER)
+    assert record.labels == ("bug",)
+    assert not hasattr(record, "__dict__")
+
+
+def test_from_issue():
+    """Tests that a listed issue gets its repo from its URLs rather than loading it."""
+    issue, requester = _listed(
+        Issue.Issue,
+        {
+            "number": 2,
+            "title": "mock-title",
+            "body": "mock-body",
+            "html_url": "https://github.com/justintime50/mock-repo/issues/2",
+            "url": "https://api.github.com/repos/justintime50/mock-repo/issues/2",
+            "state": "open",
+            "updated_at": "2024-01-01T00:00:00Z",
+            "user": USER,
+            "assignees": [USER],
+            "labels": [],
+        },
+    )
+
+    assert not records.is_pull_request(issue)
+    record = records.from_issue(issue)
+
+    requester.requestJsonAndCheck.assert_not_called()
+    assert record.repo == records.RepoRecord(**REPO)
+    assert record.assignees == (records.UserRecord(**USER),)
+    assert record.user == records.UserRecord(**USER)
+    assert record.labels == ()
+
+
+@pytest.mark.parametrize(
+    "raw_data, expected",
+    [
+        (
+            {
+                "html_url": "https://github.com/justintime50/mock-repo/pull/3",
+                "pull_request": {"url": "https://api.github.com/repos/justintime50/mock-repo/pulls/3"},
+            },
+            True,
+        ),
+        ({"html_url": "https://github.com/acme/pull/issues/7"}, False),
+        ({"html_url": "https://github.com/pull/widgets/issues/7"}, False),
+    ],
+)
+def test_is_pull_request(raw_data, expected):
+    """Tests that pull requests listed as issues are told apart without any requests, whatever their repo is named."""
+    issue, requester = _listed(Issue.Issue, raw_data)
+
+    assert records.is_pull_request(issue) is expected
+    requester.requestJsonAndCheck.assert_not_called()
@@ -0,0 +1,114 @@
+from unittest.mock import patch
+
+import pytest
+
+from pullbug import records
+from pullbug.routing import (
+    Route,
+    build_routes,
+)
+
+USER = records.UserRecord(login="mock-user", html_url="https://github.com/mock-user")
+REPO = records.RepoRecord(
+    name="api-server",
+    full_name="justintime50/api-server",
+    html_url="https://github.com/justintime50/api-server",
+)
+TEAM = records.TeamRecord(name="Security Team", slug="security-team")
+
+
+def _pull_request(labels=()):
+    return records.PullRequestRecord(
+        number=1,
+        title="mock-title",
+        body=None,
+        html_url="https://github.com/justintime50/api-server/pull/1",
+        url="https://api.github.com/repos/justintime50/api-server/pulls/1",
+        draft=False,
+        state="open",
+        updated_at=None,
+        user=USER,
+        repo=REPO,
+        labels=labels,
+    )
+
+
+def _issue(labels=()):
+    return records.IssueRecord(
+        number=2,
+        title="mock-title",
+        body=None,
+        html_url="https://github.com/justintime50/api-server/issues/2",
+        url="https://api.github.com/repos/justintime50/api-server/issues/2",
+        state="open",
+        updated_at=None,
+        assignees=(),
+        repo=REPO,
+        user=USER,
+        labels=labels,
+    )
+
+
+@pytest.mark.parametrize(
+    "route, expected_match",
+    [
+        (Route(name="everything"), True),
+        (Route(name="repo", repos=("API-*",)), True),
+        (Route(name="full-name", repos=("justintime50/*",)), True),
+        (Route(name="other-repo", repos=("website",)), False),
+        (Route(name="label", labels=("docs", "Bug")), True),
+        (Route(name="other-label", labels=("docs",)), False),
+        (Route(name="author", authors=("MOCK-USER",)), True),
+        (Route(name="team-slug", team_reviewers=("security-team",)), True),
+        (Route(name="team-name", team_reviewers=("security team",)), True),
+        (Route(name="all-rules", repos=("api-*",), labels=("bug",), team_reviewers=("backend",)), False),
+    ],
+)
+def test_route_matches_pull_request(route, expected_match):
+    """Tests that a pull request matches a route when it matches any value of each of the route's rules."""
+    assert route.matches_pull_request(_pull_request(labels=("bug",)), [USER, TEAM]) is expected_match
+
+
+@pytest.mark.parametrize(
+    "route, expected_match",
+    [
+        (Route(name="repo", repos=("api-server",)), True),
+        (Route(name="label", labels=("bug",)), False),
+        (Route(name="author", authors=("mock-user",)), True),
+        (Route(name="team", team_reviewers=("security-team",)), False),
+    ],
+)
+def test_route_matches_issue(route, expected_match):
+    """Tests that issues are matched by repo, label, and author, and never by team reviewers."""
+    assert route.matches_issue(_issue()) is expected_match
+
+
+def test_build_routes():
+    """Tests that routes are built from their config, rules given as a list or a comma separated string."""
+    routes = build_routes(
+        [
+            {"name": "api", "slack_channel": "#api", "repos": ["api-*", "worker"]},
+            {"name": "docs", "discord_url": "mock-url", "labels": "documentation, docs"},
+        ]
+    )
+
+    assert routes == [
+        Route(name="api", slack_channel="#api", repos=("api-*", "worker")),
+        Route(name="docs", discord_url="mock-url", labels=("documentation", "docs")),
+    ]
+
+
+@pytest.mark.parametrize(
+    "configs",
+    [
+        [{"slack_channel": "#api"}],
+        [{"name": "api", "slack_channel": "#api", "teams": ["backend"]}],
+        [{"name": "api", "slack_channel": "#api"}] * 2,
+        [{"name": "api", "repos": ["api-*"]}],
+    ],
+)
+@patch("logging.Logger.critical")
+def test_build_routes_invalid_config(mock_logger, configs):
+    """Tests that routes without a name or destination, with unknown settings, or with duplicate names are refused."""
+    with pytest.raises(ValueError):
+        build_routes(configs)
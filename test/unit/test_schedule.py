@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+from pullbug.schedule import CronSchedule
+
+
+@pytest.mark.parametrize(
+    "expression, after, expected_next_run",
+    [
+        ("*/15 * * * *", datetime(2024, 1, 1, 10, 7, 30), datetime(2024, 1, 1, 10, 15)),
+        ("*/15 * * * *", datetime(2024, 1, 1, 10, 45), datetime(2024, 1, 1, 11, 0)),
+        ("0 9 * * 1-5", datetime(2024, 1, 5, 9, 0), datetime(2024, 1, 8, 9, 0)),  # Friday to Monday
+        ("30 8,17 * * *", datetime(2024, 1, 1, 9, 0), datetime(2024, 1, 1, 17, 30)),
+        ("0 0 1 */3 *", datetime(2024, 2, 10, 0, 0), datetime(2024, 4, 1, 0, 0)),
+        ("0 0 29 2 *", datetime(2024, 3, 1, 0, 0), datetime(2028, 2, 29, 0, 0)),
+        # Restricting both the day of month and day of week runs on either
+        ("0 12 13 * 5", datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 5, 12, 0)),
+        ("0 0 * * 7", datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 7, 0, 0)),
+    ],
+)
+def test_cron_schedule_next_run(expression, after, expected_next_run):
+    """Tests that the next run of a schedule is found for each kind of field."""
+    assert CronSchedule(expression).next_run(after) == expected_next_run
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "* * * *",
+        "60 * * * *",
+        "*/0 * * * *",
+        "a * * * *",
+        "5-1 * * * *",
+    ],
+)
+def test_cron_schedule_invalid(expression):
+    """Tests that invalid schedules are rejected up front."""
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_cron_schedule_never_runs():
+    """Tests that a schedule that can never run raises rather than looping forever."""
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_run(datetime(2024, 1, 1))
@@ -0,0 +1,109 @@
+from unittest.mock import (
+    patch,
+)
+
+import pytest
+
+from pullbug.search import (
+    build_query,
+    get_issues,
+    get_pull_requests,
+)
+
+
+def _serve_search_results(requester, items, total_count=None):
+    requester.requestJsonAndCheck.return_value = (
+        {},
+        {"total_count": len(items) if total_count is None else total_count, "items": items},
+    )
+
+    return requester
+
+
+def _search_item(number, kind):
+    item = {
+        "number": number,
+        "title": f"mock-{kind}-{number}",
+        "body": "Mock body.",
+        "url": f"https://api.github.com/repos/justintime50/mock-repo/issues/{number}",
+        "repository_url": "https://api.github.com/repos/justintime50/mock-repo",
+        "html_url": f"https://github.com/justintime50/mock-repo/{kind}/{number}",
+        "state": "open",
+        "updated_at": "2026-01-01T00:00:00Z",
+        "user": {"login": "mock-user", "html_url": "https://github.com/mock-user"},
+        "assignees": [],
+        "labels": [],
+    }
+    if kind == "pull":
+        item["draft"] = False
+        item["pull_request"] = {"url": f"https://api.github.com/repos/justintime50/mock-repo/pulls/{number}"}
+
+    return item
+
+
+@pytest.mark.parametrize(
+    "github_context, kind, github_state, drafts, repos, include_archived, expected_query",
+    [
+        ("users", "pr", "open", False, [""], False, "user:justintime50 is:pr is:open draft:false archived:false"),
+        ("orgs", "pr", "all", True, [], True, "org:justintime50 is:pr"),
+        (
+            "orgs",
+            "issue",
+            "closed",
+            False,
+            ["pullbug", "harvey"],
+            False,
+            "org:justintime50 is:issue is:closed archived:false repo:justintime50/pullbug repo:justintime50/harvey",
+        ),
+    ],
+)
+def test_build_query(github_context, kind, github_state, drafts, repos, include_archived, expected_query):
+    """Tests that the owner, kind, state, draft, archived, and repo qualifiers are built correctly."""
+    query = build_query("justintime50", github_context, kind, github_state, drafts, repos, include_archived)
+
+    assert query == expected_query
+
+
+@patch("logging.Logger.warning")
+def test_get_pull_requests(mock_logger, mock_requester):
+    """Tests that search results are converted into pull requests without any further requests."""
+    requester = _serve_search_results(mock_requester, [_search_item(1, "pull"), _search_item(2, "pull")])
+
+    pull_requests = get_pull_requests(requester, "user:justintime50 is:pr")
+
+    requester.requestJsonAndCheck.assert_called_once_with(
+        "GET",
+        "/search/issues",
+        parameters={"q": "user:justintime50 is:pr", "per_page": 100},
+        headers=None,
+    )
+    assert [pull_request.number for pull_request in pull_requests] == [1, 2]
+    assert pull_requests[0].url == "https://api.github.com/repos/justintime50/mock-repo/pulls/1"
+    assert pull_requests[0].repo.name == "mock-repo"
+    assert pull_requests[0].repo.html_url == "https://github.com/justintime50/mock-repo"
+    assert pull_requests[0].user.login == "mock-user"
+    assert pull_requests[0].draft is False
+    requester.requestJsonAndCheck.assert_called_once()
+    mock_logger.assert_not_called()
+
+
+def test_get_issues(mock_requester):
+    """Tests that issue search results get their repository without any further requests."""
+    requester = _serve_search_results(mock_requester, [_search_item(3, "issues")])
+
+    issues = get_issues(requester, "user:justintime50 is:issue")
+
+    assert issues[0].repo.name == "mock-repo"
+    assert issues[0].repo.full_name == "justintime50/mock-repo"
+    assert issues[0].repo.html_url == "https://github.com/justintime50/mock-repo"
+    requester.requestJsonAndCheck.assert_called_once()
+
+
+@patch("logging.Logger.warning")
+def test_get_pull_requests_over_search_limit(mock_logger, mock_requester):
+    """Tests that we warn when GitHub cuts off the search results."""
+    requester = _serve_search_results(mock_requester, [_search_item(1, "pull")], total_count=1500)
+
+    get_pull_requests(requester, "org:justintime50 is:pr")
+
+    mock_logger.assert_called_once()
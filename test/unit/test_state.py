@@ -0,0 +1,60 @@
+import json
+import os
+from datetime import (
+    datetime,
+    timezone,
+)
+
+from pullbug.state import (
+    STATE_FILENAME,
+    SyncState,
+    advance_watermark,
+    is_newer,
+)
+
+
+def test_sync_state_round_trip(tmp_path):
+    """Tests that saved sections are loaded again on the next run."""
+    sync_state = SyncState(str(tmp_path))
+    sync_state.set_section("justintime50/pullbug", "pulls", {"watermark": "2024-01-01T00:00:00+00:00"})
+    sync_state.save()
+
+    loaded_sync_state = SyncState(str(tmp_path))
+
+    assert loaded_sync_state.get_section("justintime50/pullbug", "pulls") == {"watermark": "2024-01-01T00:00:00+00:00"}
+    assert loaded_sync_state.get_section("justintime50/pullbug", "issues") is None
+
+
+def test_sync_state_save_drops_unseen_repos(tmp_path):
+    """Tests that repos which weren't part of a run are dropped from the state."""
+    sync_state = SyncState(str(tmp_path))
+    sync_state.set_section("justintime50/pullbug", "pulls", {})
+    sync_state.set_section("justintime50/harvey", "pulls", {})
+    sync_state.save()
+
+    next_sync_state = SyncState(str(tmp_path))
+    next_sync_state.get_section("justintime50/pullbug", "pulls")
+    next_sync_state.save()
+
+    with open(os.path.join(tmp_path, STATE_FILENAME)) as state_file:
+        assert list(json.load(state_file)["repos"]) == ["justintime50/pullbug"]
+
+
+def test_sync_state_ignores_unusable_state(tmp_path):
+    """Tests that a corrupt state file means starting over rather than failing."""
+    with open(os.path.join(tmp_path, STATE_FILENAME), "w") as state_file:
+        state_file.write("{not json")
+
+    assert SyncState(str(tmp_path)).get_section("justintime50/pullbug", "pulls") is None
+
+
+def test_advance_watermark():
+    """Tests that the watermark only ever moves forward."""
+    older = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    newer = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+    assert advance_watermark(None, older) == older.isoformat()
+    assert advance_watermark(older.isoformat(), newer) == newer.isoformat()
+    assert advance_watermark(newer.isoformat(), older) == newer.isoformat()
+    assert is_newer(newer, older.isoformat())
+    assert not is_newer(older, older.isoformat())
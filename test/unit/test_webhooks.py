@@ -0,0 +1,214 @@
+import hashlib
+import hmac
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+from datetime import (
+    datetime,
+    timezone,
+)
+
+import pytest
+
+from pullbug.webhooks import (
+    MAX_PAYLOAD_SIZE,
+    WebhookIndex,
+    WebhookServer,
+    verify_signature,
+)
+
+REPOSITORY = {
+    "name": "pullbug",
+    "full_name": "justintime50/pullbug",
+    "html_url": "https://github.com/justintime50/pullbug",
+}
+
+
+def _user(login):
+    return {"login": login, "html_url": f"https://github.com/{login}"}
+
+
+def _pull_request_payload(
+    action, state="open", updated_at="2024-01-02T00:00:00Z", requested_reviewers=None, review=None
+):
+    payload = {
+        "action": action,
+        "repository": REPOSITORY,
+        "pull_request": {
+            "number": 1,
+            "title": "mock-title",
+            "body": "mock-body",
+            "html_url": "https://github.com/justintime50/pullbug/pull/1",
+            "url": "https://api.github.com/repos/justintime50/pullbug/pulls/1",
+            "draft": False,
+            "state": state,
+            "updated_at": updated_at,
+            "user": _user("justintime50"),
+            "base": {"repo": REPOSITORY},
+            "requested_reviewers": requested_reviewers or [],
+            "requested_teams": [],
+        },
+    }
+    if review:
+        payload["review"] = review
+
+    return payload
+
+
+def _issue_payload(action, state="open"):
+    return {
+        "action": action,
+        "repository": REPOSITORY,
+        "issue": {
+            "number": 2,
+            "title": "mock-title",
+            "body": "mock-body",
+            "html_url": "https://github.com/justintime50/pullbug/issues/2",
+            "url": "https://api.github.com/repos/justintime50/pullbug/issues/2",
+            "state": state,
+            "updated_at": "2024-01-02T00:00:00Z",
+            "assignees": [_user("octocat")],
+        },
+    }
+
+
+def _sign(secret, body):
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def test_webhook_index_pull_request_lifecycle():
+    """Tests that replayed pull request deliveries keep the index and its review data current."""
+    index = WebhookIndex()
+
+    assert index.handle_event("pull_request", _pull_request_payload("opened", requested_reviewers=[_user("octocat")]))
+    [indexed_pull_request] = index.pull_requests()
+    assert indexed_pull_request.pull_request.title == "mock-title"
+    assert indexed_pull_request.pull_request.repo.full_name == "justintime50/pullbug"
+    assert [reviewer.login for reviewer in indexed_pull_request.reviewers] == ["octocat"]
+
+    index.handle_event(
+        "pull_request_review",
+        _pull_request_payload("submitted", review={"state": "approved", "user": _user("octocat")}),
+    )
+    [indexed_pull_request] = index.pull_requests()
+    assert indexed_pull_request.reviewers == []
+    assert [user.login for user in indexed_pull_request.reviews_by_category["users_who_approved"]] == ["octocat"]
+
+    index.handle_event("pull_request", _pull_request_payload("closed", state="closed"))
+    assert index.pull_requests() == []
+
+
+def test_webhook_index_issue_lifecycle():
+    """Tests that replayed issue deliveries keep the index current."""
+    index = WebhookIndex()
+
+    index.handle_event("issues", _issue_payload("opened"))
+    [issue] = index.issues()
+    assert issue.title == "mock-title"
+    assert issue.repo.full_name == "justintime50/pullbug"
+    assert [assignee.login for assignee in issue.assignees] == ["octocat"]
+
+    index.handle_event("issues", _issue_payload("closed", state="closed"))
+    assert index.issues() == []
+
+
+def test_webhook_index_ignores_other_repos_and_events():
+    """Tests that deliveries for repos or events Pullbug doesn't bug about are ignored."""
+    index = WebhookIndex(accepts_repo=lambda repository: repository["full_name"] == "justintime50/harvey")
+
+    assert not index.handle_event("pull_request", _pull_request_payload("opened"))
+    assert not index.handle_event("push", {"repository": REPOSITORY})
+    assert index.pull_requests() == []
+
+
+def test_webhook_index_reconcile():
+    """Tests that reconciling replaces the index but keeps deliveries newer than the run."""
+    index = WebhookIndex()
+    index.handle_event("pull_request", _pull_request_payload("opened", updated_at="2024-01-01T00:00:00Z"))
+    index.handle_event("issues", _issue_payload("opened"))
+
+    # The run found nothing, the pull request delivery came before the run started so it was missed/closed
+    index.reconcile([], None, datetime(2024, 1, 1, 12, tzinfo=timezone.utc))
+
+    assert index.reconciled
+    assert index.pull_requests() == []
+    assert len(index.issues()) == 1
+
+    # A delivery during the run is newer than anything the run found
+    index.handle_event("pull_request", _pull_request_payload("reopened", updated_at="2024-01-03T00:00:00Z"))
+    index.reconcile([], [], datetime(2024, 1, 2, tzinfo=timezone.utc))
+
+    assert len(index.pull_requests()) == 1
+    assert index.issues() == []
+
+
+@pytest.mark.parametrize(
+    "signature, expected",
+    [
+        (_sign("mock-secret", b"{}"), True),
+        (_sign("wrong-secret", b"{}"), False),
+        (None, False),
+    ],
+)
+def test_verify_signature(signature, expected):
+    assert verify_signature("mock-secret", b"{}", signature) is expected
+
+
+def test_webhook_server():
+    """Tests that signed deliveries sent to the server are applied to the index and others are rejected."""
+    index = WebhookIndex()
+    server = WebhookServer(("127.0.0.1", 0), index, "mock-secret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def deliver(signature):
+        body = json.dumps(_issue_payload("opened")).encode()
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_port}",
+            data=body,
+            headers={"X-GitHub-Event": "issues", "X-Hub-Signature-256": signature or _sign("mock-secret", body)},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    try:
+        assert deliver("sha256=invalid") == 401
+        assert index.issues() == []
+        assert deliver(None) == 200
+        assert len(index.issues()) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize(
+    "content_length, expected",
+    [
+        ("not-a-number", 400),
+        ("-1", 400),
+        (str(MAX_PAYLOAD_SIZE + 1), 413),
+    ],
+)
+def test_webhook_server_invalid_content_length(content_length, expected):
+    """Tests that deliveries with an invalid or too large Content-Length are refused without reading their body."""
+    index = WebhookIndex()
+    server = WebhookServer(("127.0.0.1", 0), index, "mock-secret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+    try:
+        connection.putrequest("POST", "/")
+        connection.putheader("Content-Length", content_length)
+        connection.putheader("X-GitHub-Event", "issues")
+        connection.endheaders()
+
+        assert connection.getresponse().status == expected
+        assert index.issues() == []
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()